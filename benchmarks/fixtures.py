@@ -0,0 +1,208 @@
+"""
+Deterministic fixture corpus for the benchmark suite.
+
+The real landing HTML lives under data_staging/ and is not checked in, so the
+benchmarks generate pages that mirror the salesforceventures.com markup the
+extractors target (list grids, profile sections, info blocks, portfolio grid),
+wrapped in realistic page chrome (nav, footer, inline scripts).
+
+Everything is seeded, so a given size always produces byte-identical pages.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Dict, List
+
+SEED = 20251117
+
+# Corpus sizes: number of detail pages per kind and cards per list page.
+SIZES: Dict[str, Dict[str, int]] = {
+    "small": {"detail_pages": 20, "list_cards": 100},
+    "medium": {"detail_pages": 80, "list_cards": 500},
+    "large": {"detail_pages": 240, "list_cards": 2000},
+}
+
+_WORDS = (
+    "platform cloud data security developer workflow enterprise customer teams "
+    "analytics automation identity commerce infrastructure open source secure "
+    "collaboration intelligence payments marketing api network modern global"
+).split()
+
+_FUNDS = ["slack-fund", "ai-fund", "impact-fund", "trailblazer-fund"]
+_THEMES = ["security", "spotlight", "fintech", "ai", "devtools", "health", "climate"]
+_STATUS_DETAIL = ["Private", "Acquired", "Public", "IPO"]
+_ROLES = ["CEO", "CTO", "Co-Founder & CEO", "COO", "Chief Product Officer"]
+_TITLES = ["Partner", "Managing Partner", "Principal", "Associate", "Platform Lead"]
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    words = [rng.choice(_WORDS) for _ in range(n)]
+    return " ".join(words).capitalize() + "."
+
+
+def _chrome_head(title: str) -> str:
+    nav = "".join(
+        f'<li class="menu-item"><a href="https://salesforceventures.com/{p}/">{p.title()}</a></li>'
+        for p in ("companies", "people", "perspectives", "about", "contact")
+    )
+    return (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        f"<title>{title} | Salesforce Ventures</title>"
+        '<link rel="stylesheet" href="/wp-content/themes/sfv/style.css">'
+        "<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}"
+        "gtag('js',new Date());gtag('config','G-XXXX');</script>"
+        "</head><body class=\"page\">"
+        f'<header class="site-header"><nav class="main-nav"><ul>{nav}</ul></nav></header>'
+    )
+
+
+def _chrome_tail(rng: random.Random) -> str:
+    links = "".join(
+        f'<li><a href="https://salesforceventures.com/legal/{i}/">{_sentence(rng, 3)}</a></li>'
+        for i in range(12)
+    )
+    return (
+        f'<footer class="site-footer"><ul class="footer-links">{links}</ul>'
+        f"<p>{_sentence(rng, 30)}</p></footer>"
+        "<script src=\"/wp-includes/js/jquery.min.js\"></script>"
+        "<script>(function(){var s=document.createElement('script');s.async=true;})();</script>"
+        "</body></html>"
+    )
+
+
+def _company_classes(rng: random.Random) -> List[str]:
+    classes = ["company-logo", rng.choice(["active", "exited"])]
+    classes += rng.sample(_FUNDS, rng.randint(0, 2))
+    classes += rng.sample(_THEMES, rng.randint(0, 3))
+    return classes
+
+
+def company_list_page(n_cards: int, seed: int = SEED) -> str:
+    rng = random.Random(seed)
+    cards = []
+    for i in range(n_cards):
+        slug = f"company-{i:05d}"
+        name = f"Company {i}"
+        cards.append(
+            f'<li class="{" ".join(_company_classes(rng))}">'
+            f'<a class="companies" href="https://salesforceventures.com/companies/{slug}/" '
+            f'data-slug="{slug}" data-which="companies">'
+            f'<img src="https://salesforceventures.com/wp-content/uploads/{slug}.png" alt="{name} logo">'
+            "</a></li>"
+        )
+    return (
+        _chrome_head("Companies")
+        + '<main><ul id="companies-grid" class="companies-grid">'
+        + "".join(cards)
+        + "</ul></main>"
+        + _chrome_tail(rng)
+    )
+
+
+def people_list_page(n_cards: int, seed: int = SEED) -> str:
+    rng = random.Random(seed + 1)
+    cards = []
+    for i in range(n_cards):
+        slug = f"person-{i:05d}"
+        cards.append(
+            '<li class="person-card team">'
+            f'<a href="https://salesforceventures.com/people/{slug}/" data-slug="{slug}">'
+            f'<img src="https://salesforceventures.com/wp-content/uploads/{slug}.jpg" alt="Person {i}">'
+            f"<h4>Person {i}</h4><p>{rng.choice(_TITLES)}</p></a></li>"
+        )
+    return (
+        _chrome_head("People")
+        + '<main><ul id="person-grid" class="person-grid">'
+        + "".join(cards)
+        + "</ul></main>"
+        + _chrome_tail(rng)
+    )
+
+
+def company_detail_page(i: int, seed: int = SEED) -> str:
+    rng = random.Random(seed * 31 + i)
+    name = f"Company {i}"
+    paragraphs = "".join(f"<p>{_sentence(rng, rng.randint(25, 60))}</p>" for _ in range(rng.randint(1, 4)))
+    leaders = "<br>".join(
+        f"Leader {i}-{j}, {rng.choice(_ROLES)}" for j in range(rng.randint(1, 3))
+    )
+    blocks = (
+        '<h3 class="profile-more-info-subtitle">Leadership</h3>'
+        f'<div class="profile-more-info">{leaders}</div>'
+        '<h3 class="profile-more-info-subtitle">Status</h3>'
+        f'<div class="profile-more-info">{rng.choice(_STATUS_DETAIL)}</div>'
+    )
+    if rng.random() < 0.3:
+        blocks += (
+            '<h3 class="profile-more-info-subtitle">Acquired By</h3>'
+            f'<div class="profile-more-info">Acquirer {i}</div>'
+        )
+    return (
+        _chrome_head(name)
+        + '<div class="profile">'
+        + '<section class="profile-info">'
+        + f'<h1 class="profile-title"><img src="/logos/company-{i}.svg" alt="{name}"></h1>'
+        + paragraphs
+        + f'<a class="profile__link" href="https://company-{i}.example.com">Website</a>'
+        + '<div class="social-list profile-social-list">'
+        + f'<a class="social-icon social-icon__twitter" href="https://twitter.com/company{i}"></a>'
+        + f'<a class="social-icon social-icon__linkedin" href="https://www.linkedin.com/company/company{i}"></a>'
+        + "</div></section>"
+        + '<section class="profile-image profile-image--company">'
+        + f'<img src="https://salesforceventures.com/wp-content/uploads/hero-{i}.jpg" alt="">'
+        + f'<div class="profile-image__info">{blocks}</div>'
+        + "</section></div>"
+        + _chrome_tail(rng)
+    )
+
+
+def person_detail_page(i: int, seed: int = SEED) -> str:
+    rng = random.Random(seed * 37 + i)
+    paragraphs = "".join(f"<p>{_sentence(rng, rng.randint(30, 80))}</p>" for _ in range(rng.randint(1, 3)))
+    portfolio = ""
+    if rng.random() < 0.6:
+        cards = "".join(
+            f'<li class="{" ".join(_company_classes(rng))}">'
+            f'<a class="companies" href="/companies/company-{j:05d}/" data-slug="company-{j:05d}">'
+            f'<img src="/logos/company-{j}.png" alt="Company {j} logo"></a></li>'
+            for j in rng.sample(range(1000), rng.randint(3, 25))
+        )
+        portfolio = (
+            '<section class="companies-grid-wrapper companies-grid-wrapper--one-row">'
+            f'<ul id="companies-grid">{cards}</ul></section>'
+        )
+    return (
+        _chrome_head(f"Person {i}")
+        + '<div class="profile">'
+        + '<section class="profile-info">'
+        + f'<h1 class="profile-title">Person {i}</h1>'
+        + f'<h2 class="profile-subtitle">{rng.choice(_TITLES)}</h2>'
+        + paragraphs
+        + "<small>Based in San Francisco, CA</small>"
+        + '<div class="social-list profile-social-list">'
+        + f'<a class="social-icon social-icon__twitter" href="https://x.com/person{i}"></a>'
+        + f'<a class="social-icon social-icon__linkedin" href="https://www.linkedin.com/in/person{i}"></a>'
+        + f'<a class="social-icon social-icon__email" href="mailto:person{i}@example.com"></a>'
+        + "</div></section>"
+        + '<section class="profile-image">'
+        + f'<img src="https://salesforceventures.com/wp-content/uploads/person-{i}.jpg" alt="">'
+        + "</section></div>"
+        + portfolio
+        + _chrome_tail(rng)
+    )
+
+
+def build_corpus(size: str) -> Dict[str, object]:
+    """
+    Build the fixture corpus for one of SIZES.
+    """
+    spec = SIZES[size]
+    n_pages = spec["detail_pages"]
+    n_cards = spec["list_cards"]
+    return {
+        "company_pages": [company_detail_page(i) for i in range(n_pages)],
+        "person_pages": [person_detail_page(i) for i in range(n_pages)],
+        "companies_list_page": company_list_page(n_cards),
+        "people_list_page": people_list_page(n_cards),
+    }
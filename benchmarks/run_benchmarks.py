@@ -0,0 +1,502 @@
+"""
+Benchmark harness for the parse and serialization hot paths.
+
+Each case is timed over the fixed fixture corpus (see benchmarks/fixtures.py)
+at one or more sizes, in a fresh child process so peak RSS is per case.
+
+For every case we report:
+  - median / min seconds over N repeats (after one warmup)
+  - items/sec (pages, cards or tag lists) and MB/sec of input (or output, for
+    serialization)
+  - peak RSS of the child process and peak traced Python allocations
+
+Results can be saved as JSON baselines under benchmarks/baselines/ and later
+runs are compared against them; a case whose median time regresses by more
+than --threshold fails the run (exit code 1).
+
+Usage (from the repo root):
+  python -m benchmarks.run_benchmarks --size small
+  python -m benchmarks.run_benchmarks --size small,medium --save-baseline
+  python -m benchmarks.run_benchmarks --verify-parse --cases company_detail,company_detail_full
+  python -m benchmarks.run_benchmarks --verify-codec --cases bronze_serialize,bronze_serialize_codec
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fixtures import SIZES, build_corpus
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+BASELINE_DIR = BASE_DIR / "benchmarks" / "baselines"
+
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.15  # fail when median time grows by more than 15%
+
+# (callable, item count, byte count, unit)
+CaseSetup = Tuple[Callable[[], Any], int, int, str]
+
+
+# --- Cases ---
+#
+# Each case takes the corpus and returns the zero-arg callable to time, the
+# number of items it processes and the number of bytes it reads (or writes).
+
+def case_company_detail(corpus: Dict[str, Any], restricted: bool = True) -> CaseSetup:
+    from ingestion.extract.extract_company_pages import parse_company_detail_html
+
+    pages: List[str] = corpus["company_pages"]
+
+    def run():
+        for html in pages:
+            parse_company_detail_html(html, restricted=restricted)
+
+    return run, len(pages), sum(len(p.encode("utf-8")) for p in pages), "pages"
+
+
+def case_person_detail(corpus: Dict[str, Any], restricted: bool = True) -> CaseSetup:
+    from ingestion.extract.extract_person_pages import parse_person_detail_html
+
+    pages: List[str] = corpus["person_pages"]
+
+    def run():
+        for html in pages:
+            parse_person_detail_html(html, restricted=restricted)
+
+    return run, len(pages), sum(len(p.encode("utf-8")) for p in pages), "pages"
+
+
+def case_companies_list(corpus: Dict[str, Any], restricted: bool = True) -> CaseSetup:
+    from ingestion.extract.extract_companies_list import parse_companies_list_html
+
+    html: str = corpus["companies_list_page"]
+
+    def run():
+        parse_companies_list_html(html, restricted=restricted)
+
+    n_cards = html.count('class="company-logo')
+    return run, n_cards, len(html.encode("utf-8")), "cards"
+
+
+def case_people_list(corpus: Dict[str, Any], restricted: bool = True) -> CaseSetup:
+    from ingestion.extract.extract_people_list import parse_people_list_html
+
+    html: str = corpus["people_list_page"]
+
+    def run():
+        parse_people_list_html(html, restricted=restricted)
+
+    n_cards = html.count('class="person-card')
+    return run, n_cards, len(html.encode("utf-8")), "cards"
+
+
+def _text_chunks(text: str) -> List[str]:
+    from ingestion.raw_html import STREAM_CHUNK_CHARS
+
+    return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+
+
+def case_companies_list_stream(corpus: Dict[str, Any]) -> CaseSetup:
+    from ingestion.extract.extract_companies_list import iter_companies_list
+
+    html: str = corpus["companies_list_page"]
+    chunks = _text_chunks(html)
+
+    def run():
+        for _ in iter_companies_list(chunks):
+            pass
+
+    n_cards = html.count('class="company-logo')
+    return run, n_cards, len(html.encode("utf-8")), "cards"
+
+
+def case_people_list_stream(corpus: Dict[str, Any]) -> CaseSetup:
+    from ingestion.extract.extract_people_list import iter_people_list
+
+    html: str = corpus["people_list_page"]
+    chunks = _text_chunks(html)
+
+    def run():
+        for _ in iter_people_list(chunks):
+            pass
+
+    n_cards = html.count('class="person-card')
+    return run, n_cards, len(html.encode("utf-8")), "cards"
+
+
+def case_classify_tags(corpus: Dict[str, Any]) -> CaseSetup:
+    from ingestion.extract.extract_companies_list import classify_tags, parse_companies_list_html
+
+    # classify_tags is cheap per call, so run it over the class lists many times
+    class_lists = [rec["raw_classes"] for rec in parse_companies_list_html(corpus["companies_list_page"])] * 50
+
+    def run():
+        for classes in class_lists:
+            classify_tags(classes)
+
+    n_bytes = sum(len(c) for classes in class_lists for c in classes)
+    return run, len(class_lists), n_bytes, "tag lists"
+
+
+def _enriched_records(corpus: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    from ingestion.extract.extract_companies_list import parse_companies_list_html
+    from ingestion.extract.extract_company_pages import parse_company_detail_html
+    from ingestion.extract.extract_people_list import parse_people_list_html
+    from ingestion.extract.extract_person_pages import parse_person_detail_html
+
+    companies = parse_companies_list_html(corpus["companies_list_page"])
+    people = parse_people_list_html(corpus["people_list_page"])
+    company_details = [parse_company_detail_html(h) for h in corpus["company_pages"]]
+    person_details = [parse_person_detail_html(h) for h in corpus["person_pages"]]
+
+    # Cycle detail payloads across every list record so the output is full size
+    companies = [{**rec, **company_details[i % len(company_details)]} for i, rec in enumerate(companies)]
+    people = [{**rec, **person_details[i % len(person_details)]} for i, rec in enumerate(people)]
+    return companies, people
+
+
+def _stdlib_dumps(value: Any) -> bytes:
+    return json.dumps(value, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def case_bronze_serialize(corpus: Dict[str, Any], codec: bool = False) -> CaseSetup:
+    from vceamless import jsoncodec
+
+    companies, people = _enriched_records(corpus)
+    dumps = partial(jsoncodec.dumps, indent=True) if codec else _stdlib_dumps
+
+    def run():
+        dumps(companies)
+        dumps(people)
+
+    n_bytes = len(dumps(companies)) + len(dumps(people))
+    return run, len(companies) + len(people), n_bytes, "records"
+
+
+def case_query_engine(corpus: Dict[str, Any]) -> CaseSetup:
+    from serving.query_engine import QueryEngine
+
+    companies, people = _enriched_records(corpus)
+    # Point portfolio links at companies that exist in the corpus
+    slugs = [rec["slug"] for rec in companies]
+    for i, person in enumerate(people):
+        person["portfolio_companies"] = [
+            {**link, "slug": slugs[(i * 7 + j) % len(slugs)]} for j, link in enumerate(person["portfolio_companies"])
+        ]
+    engine = QueryEngine(companies, people)
+    partners = [rec["slug"] for rec in people]
+
+    def run():
+        for slug in partners:
+            engine.find_companies(status="active", theme_tags="security", partner=slug)
+        engine.top_partners(10, status="active")
+
+    return run, len(partners) + 1, 0, "queries"
+
+
+CASES: Dict[str, Callable[[Dict[str, Any]], CaseSetup]] = {
+    "company_detail": case_company_detail,
+    "person_detail": case_person_detail,
+    "companies_list": case_companies_list,
+    "people_list": case_people_list,
+    "classify_tags": case_classify_tags,
+    "bronze_serialize": case_bronze_serialize,
+    "query_engine": case_query_engine,
+    # Full-DOM parses, for comparison with the restricted (default) cases above
+    "company_detail_full": partial(case_company_detail, restricted=False),
+    "person_detail_full": partial(case_person_detail, restricted=False),
+    "companies_list_full": partial(case_companies_list, restricted=False),
+    "people_list_full": partial(case_people_list, restricted=False),
+    # Event-parser list extraction, as the extract_*_list scripts run it
+    "companies_list_stream": case_companies_list_stream,
+    "people_list_stream": case_people_list_stream,
+    # vceamless.jsoncodec (orjson when installed), as the bronze writers run it
+    "bronze_serialize_codec": partial(case_bronze_serialize, codec=True),
+}
+
+
+def verify_restricted_parse(size: str) -> List[str]:
+    """
+    Parse every fixture page both ways; return a message per page whose
+    restricted-parse (or, for list pages, streamed) output differs from the
+    full parse.
+    """
+    from ingestion.extract.extract_companies_list import iter_companies_list, parse_companies_list_html
+    from ingestion.extract.extract_company_pages import parse_company_detail_html
+    from ingestion.extract.extract_people_list import iter_people_list, parse_people_list_html
+    from ingestion.extract.extract_person_pages import parse_person_detail_html
+
+    corpus = build_corpus(size)
+    checks = [(parse_companies_list_html, "companies_list_page", corpus["companies_list_page"]),
+              (parse_people_list_html, "people_list_page", corpus["people_list_page"])]
+    checks += [(parse_company_detail_html, f"company_pages[{i}]", html) for i, html in enumerate(corpus["company_pages"])]
+    checks += [(parse_person_detail_html, f"person_pages[{i}]", html) for i, html in enumerate(corpus["person_pages"])]
+
+    mismatches = []
+    for parse, label, html in checks:
+        if parse(html, restricted=True) != parse(html, restricted=False):
+            mismatches.append(f"{size}: {parse.__name__} differs on {label}")
+    for stream, parse, label in ((iter_companies_list, parse_companies_list_html, "companies_list_page"),
+                                 (iter_people_list, parse_people_list_html, "people_list_page")):
+        html = corpus[label]
+        if list(stream(_text_chunks(html))) != parse(html, restricted=False):
+            mismatches.append(f"{size}: {stream.__name__} differs on {label}")
+    return mismatches
+
+
+def verify_codec(size: str) -> List[str]:
+    """
+    Round-trip the enriched fixture records (and a few awkward values)
+    through vceamless.jsoncodec; return a message per value that does not
+    come back equal, or whose bytes differ from the stdlib encoding.
+    """
+    from vceamless import jsoncodec
+
+    companies, people = _enriched_records(build_corpus(size))
+    values = [("companies", companies), ("people", people)]
+    values += [("unicode", {"name": "Zoë \u2603 \U0001f680", "quote": "\"\\/\n\t\u2028"}),
+               ("numbers", {"int": 2 ** 63 - 1, "big": 2 ** 70, "neg": -0.5, "float": 0.1 + 0.2}),
+               ("empty", {"list": [], "dict": {}, "none": None, "bools": [True, False]}),
+               ("int_keys", {1: "one", 2: "two"})]
+
+    mismatches = []
+    for label, value in values:
+        for indent in (False, True):
+            body = jsoncodec.dumps(value, indent=indent)
+            expected = _stdlib_dumps(value) if indent else json.dumps(
+                value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if body != expected:
+                mismatches.append(f"{size}: {label} (indent={indent}) encodes differently from json.dumps")
+            if jsoncodec.loads(body) != json.loads(expected):
+                mismatches.append(f"{size}: {label} (indent={indent}) does not round-trip")
+    return mismatches
+
+
+# --- Measurement ---
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def measure_case(case: str, size: str, repeats: int) -> Dict[str, Any]:
+    """
+    Build the corpus, run one case and return its measurements.
+
+    Runs in a child process (see run_cases) so the RSS figure is per case.
+    """
+    corpus = build_corpus(size)
+    fn, n_items, n_bytes, unit = CASES[case](corpus)
+
+    fn()  # warmup
+
+    times: List[float] = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(times)
+    return {
+        "case": case,
+        "size": size,
+        "unit": unit,
+        "items": n_items,
+        "bytes": n_bytes,
+        "repeats": repeats,
+        "median_s": median,
+        "min_s": min(times),
+        "items_per_s": n_items / median if median else None,
+        "mb_per_s": (n_bytes / (1024 * 1024)) / median if median else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "alloc_peak_bytes": alloc_peak,
+    }
+
+
+def run_cases(cases: List[str], sizes: List[str], repeats: int, in_process: bool = False) -> List[Dict[str, Any]]:
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for size in sizes:
+        for case in cases:
+            if in_process:
+                res = measure_case(case, size, repeats)
+            else:
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    res = pool.submit(measure_case, case, size, repeats).result()
+            print(
+                f"  {size:<7} {case:<23} median={res['median_s'] * 1000:9.2f} ms  "
+                f"{res['items_per_s']:10.1f} {res['unit']}/s  {res['mb_per_s']:7.2f} MB/s  "
+                f"rss={res['peak_rss_mb']:.1f} MB  alloc_peak={res['alloc_peak_bytes'] / 1024:.0f} KiB"
+            )
+            results.append(res)
+    return results
+
+
+# --- Baselines ---
+
+def baseline_path(size: str, baseline_dir: Path = BASELINE_DIR) -> Path:
+    return baseline_dir / f"{size}.json"
+
+
+def save_baselines(results: List[Dict[str, Any]], baseline_dir: Path = BASELINE_DIR) -> None:
+    baseline_dir.mkdir(parents=True, exist_ok=True)
+    by_size: Dict[str, Dict[str, Any]] = {}
+    for res in results:
+        by_size.setdefault(res["size"], {})[res["case"]] = res
+
+    for size, cases in by_size.items():
+        path = baseline_path(size, baseline_dir)
+        existing: Dict[str, Any] = {}
+        if path.exists():
+            existing = json.loads(path.read_text(encoding="utf-8")).get("results", {})
+        existing.update(cases)
+        payload = {
+            "meta": {
+                "saved_at": int(time.time()),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "results": existing,
+        }
+        path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"Saved baseline: {path}")
+
+
+def compare_to_baselines(
+    results: List[Dict[str, Any]],
+    threshold: float,
+    baseline_dir: Path = BASELINE_DIR,
+) -> List[str]:
+    """
+    Compare median times against saved baselines.
+
+    Returns a list of human-readable regression messages (empty when clean).
+    """
+    regressions: List[str] = []
+    loaded: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    for res in results:
+        size = res["size"]
+        if size not in loaded:
+            path = baseline_path(size, baseline_dir)
+            loaded[size] = json.loads(path.read_text(encoding="utf-8")).get("results") if path.exists() else None
+        base = (loaded[size] or {}).get(res["case"])
+        if not base:
+            print(f"  [INFO] No baseline for {size}/{res['case']}")
+            continue
+
+        change = (res["median_s"] - base["median_s"]) / base["median_s"]
+        marker = "REGRESSION" if change > threshold else "ok"
+        print(f"  {size:<7} {res['case']:<17} {change * 100:+7.1f}%  {marker}")
+        if change > threshold:
+            regressions.append(
+                f"{size}/{res['case']}: median {res['median_s'] * 1000:.2f} ms vs "
+                f"baseline {base['median_s'] * 1000:.2f} ms ({change * 100:+.1f}%)"
+            )
+    return regressions
+
+
+# --- Main ---
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the parse and serialization hot paths.")
+    parser.add_argument("--size", default="small", help=f"Comma-separated sizes: {', '.join(SIZES)}")
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated case names")
+    parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed fractional slowdown vs baseline before failing")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--no-compare", action="store_true", help="Skip the baseline comparison")
+    parser.add_argument("--baseline-dir", type=Path, default=BASELINE_DIR)
+    parser.add_argument("--json-out", type=Path, help="Also write raw results to this path")
+    parser.add_argument("--verify-parse", action="store_true",
+                        help="First check restricted and streamed parse output against a full parse")
+    parser.add_argument("--verify-codec", action="store_true",
+                        help="First check jsoncodec output against the json module")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run cases in this process (faster, but RSS is cumulative)")
+    args = parser.parse_args(argv)
+
+    sizes = _split(args.size)
+    cases = _split(args.cases)
+    for s in sizes:
+        if s not in SIZES:
+            parser.error(f"Unknown size {s!r}")
+    for c in cases:
+        if c not in CASES:
+            parser.error(f"Unknown case {c!r}")
+
+    if args.verify_parse:
+        mismatches = [msg for size in sizes for msg in verify_restricted_parse(size)]
+        if mismatches:
+            print("[FAIL] Restricted or streamed parse differs from full parse:")
+            for msg in mismatches:
+                print(f"  - {msg}")
+            return 1
+        print(f"Restricted and streamed parses match full parse for size(s): {', '.join(sizes)}")
+
+    if args.verify_codec:
+        from vceamless.jsoncodec import BACKEND
+        mismatches = [msg for size in sizes for msg in verify_codec(size)]
+        if mismatches:
+            print("[FAIL] jsoncodec output differs from the json module:")
+            for msg in mismatches:
+                print(f"  - {msg}")
+            return 1
+        print(f"jsoncodec ({BACKEND}) matches the json module for size(s): {', '.join(sizes)}")
+
+    print(f"Running {len(cases)} case(s) x {len(sizes)} size(s), repeats={args.repeats}")
+    results = run_cases(cases, sizes, args.repeats, in_process=args.in_process)
+
+    if args.json_out:
+        args.json_out.parent.mkdir(parents=True, exist_ok=True)
+        args.json_out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Wrote results to {args.json_out}")
+
+    regressions: List[str] = []
+    if not args.no_compare:
+        print(f"\nComparing against baselines (threshold={args.threshold * 100:.0f}%)")
+        regressions = compare_to_baselines(results, args.threshold, args.baseline_dir)
+
+    if args.save_baseline:
+        save_baselines(results, args.baseline_dir)
+
+    if regressions:
+        print("\n[FAIL] Benchmark regressions:")
+        for msg in regressions:
+            print(f"  - {msg}")
+        return 1
+
+    print("\nDone.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,15 @@
-from bs4 import BeautifulSoup
+import argparse
 import os
 from pathlib import Path
 
+from bs4 import BeautifulSoup
+
+from vceamless import metrics, profiling
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 HTML_PATH = os.path.join(BASE_DIR, "data_staging", "raw_landing", "companies_list_page.html")
 
-def main():
+def run():
     with open(HTML_PATH, "r", encoding="utf-8") as f:
         html = f.read()
 
@@ -34,5 +38,13 @@ def main():
         print(f"classes:    {classes}")
         print(f"img.alt:    {alt}")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the company-logo cards on the companies list page.")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with metrics.run_report("explore_companies_dom", upload=False) as m, profiling.profile_from_args(m, args):
+        run()
+
 if __name__ == "__main__":
     main()
@@ -1,8 +1,11 @@
+import argparse
 from pathlib import Path
 import json
 
 from bs4 import BeautifulSoup
 
+from vceamless import metrics, profiling
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 
 BRONZE_COMPANIES_LIST = BASE_DIR / "data_staging" / "bronze" / "companies_list.json"
@@ -117,7 +120,7 @@ def summarize_company(slug: str, list_name: str):
             print(f"  - {blk['label']}: {blk['text']!r}")
 
 
-def main():
+def run():
     if not BRONZE_COMPANIES_LIST.exists():
         raise FileNotFoundError(f"Missing bronze companies list at {BRONZE_COMPANIES_LIST}")
 
@@ -136,5 +139,14 @@ def main():
         summarize_company(slug, list_name)
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize selectors on a sample of company detail pages.")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with metrics.run_report("explore_company_pages_dom", upload=False) as m, profiling.profile_from_args(m, args):
+        run()
+
+
 if __name__ == "__main__":
     main()
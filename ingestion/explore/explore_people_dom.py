@@ -1,11 +1,15 @@
-from bs4 import BeautifulSoup
+import argparse
 import os
 from pathlib import Path
 
+from bs4 import BeautifulSoup
+
+from vceamless import metrics, profiling
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 HTML_PATH = os.path.join(BASE_DIR, "data_staging", "raw_landing", "people_list_page.html")
 
-def main():
+def run():
     with open(HTML_PATH, "r", encoding="utf-8") as f:
         html = f.read()
 
@@ -37,5 +41,13 @@ def main():
         print(f"name:       {name}")
         print(f"role:       {role}")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the person-card elements on the people list page.")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with metrics.run_report("explore_people_dom", upload=False) as m, profiling.profile_from_args(m, args):
+        run()
+
 if __name__ == "__main__":
     main()
@@ -1,8 +1,11 @@
+import argparse
 from pathlib import Path
 import json
 
 from bs4 import BeautifulSoup
 
+from vceamless import metrics, profiling
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 
 BRONZE_PEOPLE_LIST = BASE_DIR / "data_staging" / "bronze" / "people_list.json"
@@ -149,7 +152,7 @@ def summarize_person(slug: str, list_name: str, list_title: str):
                 print(f"    - slug={pc['slug']!r}, name={pc['name']!r}, tags={pc['tags']}")
 
 
-def main():
+def run():
     if not BRONZE_PEOPLE_LIST.exists():
         raise FileNotFoundError(f"Missing bronze people list at {BRONZE_PEOPLE_LIST}")
 
@@ -168,5 +171,14 @@ def main():
         summarize_person(slug, list_name, list_title)
 
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize selectors on a sample of person detail pages.")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with metrics.run_report("explore_person_pages_dom", upload=False) as m, profiling.profile_from_args(m, args):
+        run()
+
+
 if __name__ == "__main__":
     main()
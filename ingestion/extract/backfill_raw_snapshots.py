@@ -0,0 +1,533 @@
+"""
+Rebuild bronze history from every timestamped raw snapshot in S3.
+
+S3 keeps every landed page:
+
+  sf_ventures/raw_landing/companies_<ts>.html
+  sf_ventures/raw_landing/people_<ts>.html
+  sf_ventures/raw_landing/company_pages/<slug>_<ts>.html
+  sf_ventures/raw_landing/person_pages/<slug>_<ts>.html
+
+A snapshot is one list-page run (ts of companies_/people_<ts>.html). For each
+slug on that run's list pages, the detail page used is the newest one landed
+before the *next* list snapshot. That is the page the extractors would have
+seen. It also carries unchanged pages forward across --only-changed crawls.
+
+Pipeline per snapshot:
+
+  list    paginated ListObjectsV2, fanned out over key prefixes on a thread pool
+          (one per common leading slug character, plus catch-all key ranges
+          for slugs starting with anything else)
+  fetch   objects downloaded on a thread pool, a bounded number in flight;
+          large objects as parallel ranged GETs
+  parse   parse functions of the extract scripts on a process pool, each batch
+          submitted as soon as its downloads complete, so only a few batches
+          of bodies are held in memory at a time
+  write   data_staging/bronze/history/<ts>/{companies_list,people_list,
+          companies_enriched,people_enriched}.json + _SUCCESS
+
+Snapshots with a _SUCCESS marker are skipped, so an interrupted backfill
+resumes where it stopped (--force redoes them). Parsed detail pages are
+reused across snapshots that share them, from an LRU of --cache-size pages. Throughput (pages/s, MB/s) is logged
+per snapshot and recorded in the run report.
+"""
+
+import argparse
+import os
+import re
+import string
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import boto3
+
+from vceamless import jsoncodec, logs, metrics, profiling
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+HISTORY_DIR = BASE_DIR / "data_staging" / "bronze" / "history"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+RAW_PREFIX = "sf_ventures/raw_landing"
+
+# Objects larger than this are downloaded as parallel ranged GETs
+RANGE_CHUNK_BYTES = 8 * 1024 * 1024
+
+DEFAULT_DOWNLOAD_WORKERS = 16
+PARSE_BATCH_SIZE = 25
+# Bounds on the bodies held in memory while a snapshot is fetched and parsed
+MAX_DOWNLOADS_IN_FLIGHT = 64
+MAX_PARSE_BATCHES_IN_FLIGHT = 2 * (os.cpu_count() or 1)
+
+# Detail page keys are listed in parallel, one listing per leading slug
+# character; keys starting with any other character are picked up by
+# catch-all listings of the key ranges in between
+SLUG_LEADING_CHARS = string.digits + string.ascii_lowercase
+
+# Parsed pages kept for reuse by later snapshots
+DEFAULT_PARSED_CACHE_SIZE = 20000
+
+_KEY_RE = re.compile(r"^(?P<stem>.+)_(?P<ts>\d+)\.html$")
+
+s3 = boto3.client("s3")
+log = logs.get_logger("backfill_raw_snapshots")
+
+
+class RawObject(NamedTuple):
+    key: str
+    size: int
+    kind: str   # companies_list, people_list, company_page, person_page
+    slug: Optional[str]
+    ts: int
+
+
+class Snapshot(NamedTuple):
+    ts: int
+    companies_list: Optional[RawObject]
+    people_list: Optional[RawObject]
+    company_pages: Dict[str, RawObject]
+    person_pages: Dict[str, RawObject]
+
+
+# --- list ---
+
+def classify_key(key: str, size: int) -> Optional[RawObject]:
+    rel = key[len(RAW_PREFIX) + 1:]
+    folder, _, name = rel.rpartition("/")
+    match = _KEY_RE.match(name)
+    if not match:
+        return None
+    stem, ts = match.group("stem"), int(match.group("ts"))
+    if folder == "" and stem in ("companies", "people"):
+        return RawObject(key, size, f"{stem}_list", None, ts)
+    if folder == "company_pages":
+        return RawObject(key, size, "company_page", stem, ts)
+    if folder == "person_pages":
+        return RawObject(key, size, "person_page", stem, ts)
+    return None
+
+
+def _list_prefix(
+    prefix: str,
+    delimiter: Optional[str] = None,
+    start_after: Optional[str] = None,
+    stop_before: Optional[str] = None,
+) -> List[Tuple[str, int]]:
+    paginator = s3.get_paginator("list_objects_v2")
+    kwargs = {"Bucket": BUCKET, "Prefix": prefix}
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+    if start_after:
+        kwargs["StartAfter"] = start_after
+    found = []
+    for page in paginator.paginate(**kwargs):
+        for obj in page.get("Contents", []):
+            # Keys come back in ascending order
+            if stop_before is not None and obj["Key"] >= stop_before:
+                return found
+            found.append((obj["Key"], obj["Size"]))
+    return found
+
+
+def _catch_all_ranges(prefix: str) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    (start_after, stop_before) key ranges under `prefix` that hold the keys
+    whose first character after the prefix is not in SLUG_LEADING_CHARS.
+    """
+    codes = sorted(set(map(ord, SLUG_LEADING_CHARS)))
+    ranges: List[Tuple[Optional[str], Optional[str]]] = []
+    start_after, run_start = None, codes[0]
+    for code, following in zip(codes, codes[1:] + [None]):
+        if following == code + 1:
+            continue
+        # Keys below the run [run_start, code], then skip past it
+        ranges.append((start_after, prefix + chr(run_start)))
+        start_after, run_start = prefix + chr(code + 1), following
+    ranges.append((start_after, None))
+    return ranges
+
+
+def list_raw_objects(workers: int = DEFAULT_DOWNLOAD_WORKERS) -> List[RawObject]:
+    """
+    List every raw landing object, one paginated listing per key prefix in
+    parallel.
+    """
+    listings = [(f"{RAW_PREFIX}/", "/", None, None)]
+    for folder in ("company_pages", "person_pages"):
+        prefix = f"{RAW_PREFIX}/{folder}/"
+        listings.extend((prefix + c, None, None, None) for c in SLUG_LEADING_CHARS)
+        listings.extend((prefix, None, start_after, stop_before)
+                        for start_after, stop_before in _catch_all_ranges(prefix))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(lambda args: _list_prefix(*args), listings)
+        objects = [obj for found in results for key, size in found if (obj := classify_key(key, size))]
+    log.info(f"Listed {len(objects)} raw objects under s3://{BUCKET}/{RAW_PREFIX}/", extra={"listings": len(listings)})
+    return objects
+
+
+# --- plan ---
+
+def plan_snapshots(objects: List[RawObject]) -> List[Snapshot]:
+    """
+    Group objects into snapshots keyed by list-page run ts, attaching to each
+    the newest detail page per slug landed before the next snapshot.
+    """
+    lists: Dict[int, Dict[str, RawObject]] = defaultdict(dict)
+    details: Dict[str, List[RawObject]] = {"company_page": [], "person_page": []}
+    for obj in objects:
+        if obj.slug is None:
+            lists[obj.ts][obj.kind] = obj
+        else:
+            details[obj.kind].append(obj)
+    for versions in details.values():
+        versions.sort(key=lambda o: o.ts)
+
+    # One pass over snapshots and versions together: each snapshot takes the
+    # previous one's pages plus the versions landed before the next snapshot
+    current: Dict[str, Dict[str, RawObject]] = {kind: {} for kind in details}
+    cursor = {kind: 0 for kind in details}
+
+    def advance(kind: str, before: Optional[int]) -> Dict[str, RawObject]:
+        versions, i = details[kind], cursor[kind]
+        while i < len(versions) and (before is None or versions[i].ts < before):
+            current[kind][versions[i].slug] = versions[i]
+            i += 1
+        cursor[kind] = i
+        return dict(current[kind])
+
+    list_ts = sorted(lists)
+    snapshots = []
+    for i, ts in enumerate(list_ts):
+        next_ts = list_ts[i + 1] if i + 1 < len(list_ts) else None
+        snapshots.append(Snapshot(
+            ts=ts,
+            companies_list=lists[ts].get("companies_list"),
+            people_list=lists[ts].get("people_list"),
+            company_pages=advance("company_page", next_ts),
+            person_pages=advance("person_page", next_ts),
+        ))
+    return snapshots
+
+
+# --- fetch ---
+
+def _get_range(key: str, start: int, end: int) -> bytes:
+    resp = s3.get_object(Bucket=BUCKET, Key=key, Range=f"bytes={start}-{end}")
+    return resp["Body"].read()
+
+
+def fetch_object(obj: RawObject, range_pool: ThreadPoolExecutor) -> bytes:
+    m = metrics.current()
+    if obj.size <= RANGE_CHUNK_BYTES:
+        body = s3.get_object(Bucket=BUCKET, Key=obj.key)["Body"].read()
+    else:
+        ranges = [(start, min(start + RANGE_CHUNK_BYTES, obj.size) - 1)
+                  for start in range(0, obj.size, RANGE_CHUNK_BYTES)]
+        body = b"".join(range_pool.map(lambda r: _get_range(obj.key, *r), ranges))
+    m.incr("bytes_fetched", len(body))
+    return body
+
+
+# --- parse (runs in worker processes) ---
+
+def _parse_batch(kind: str, batch: List[Tuple[str, bytes]]) -> List[Tuple[str, Any, Optional[str]]]:
+    if kind == "company_page":
+        from ingestion.extract.extract_company_pages import parse_company_detail_html as parse
+    elif kind == "person_page":
+        from ingestion.extract.extract_person_pages import parse_person_detail_html as parse
+    elif kind == "companies_list":
+        from ingestion.extract.extract_companies_list import parse_companies_list_html as parse
+    else:
+        from ingestion.extract.extract_people_list import parse_people_list_html as parse
+
+    out = []
+    for key, body in batch:
+        try:
+            out.append((key, parse(body), None))
+        except Exception as e:
+            out.append((key, None, f"{type(e).__name__}: {e}"))
+    return out
+
+
+# --- per snapshot ---
+
+class ParsedCache:
+    """
+    Parsed pages by S3 key, least recently used evicted past `size`.
+    """
+
+    def __init__(self, size: int = DEFAULT_PARSED_CACHE_SIZE) -> None:
+        self.size = size
+        self.entries: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, parsed: Any) -> None:
+        self.entries[key] = parsed
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+def _snapshot_dir(ts: int) -> Path:
+    return HISTORY_DIR / str(ts)
+
+
+def _write_json(path: Path, payload: Any) -> int:
+    return len(jsoncodec.write_path(path, payload))
+
+
+def backfill_snapshot(
+    snap: Snapshot,
+    download_pool: ThreadPoolExecutor,
+    range_pool: ThreadPoolExecutor,
+    parse_pool: ProcessPoolExecutor,
+    parsed_cache: ParsedCache,
+) -> Dict[str, Any]:
+    m = metrics.current()
+    started = time.perf_counter()
+    fetched_bytes = 0
+    errors: Dict[str, str] = {}
+    # This snapshot's pages; the LRU may evict them before enrich runs
+    parsed: Dict[str, Any] = {}
+
+    def download_and_parse(kind: str, objs: List[RawObject]) -> None:
+        nonlocal fetched_bytes
+        todo = []
+        for o in objs:
+            cached = parsed_cache.get(o.key)
+            if cached is None:
+                todo.append(o)
+            else:
+                parsed[o.key] = cached
+        if not todo:
+            return
+
+        def collect(future) -> None:
+            with m.stage("parse"):
+                results = future.result()
+            for key, result, error in results:
+                if error:
+                    errors[key] = error
+                    m.incr("errors")
+                else:
+                    parsed[key] = result
+                    parsed_cache.put(key, result)
+
+        pending = iter(todo)
+        downloads: Dict[Any, RawObject] = {}
+        parses: deque = deque()
+        batch: List[Tuple[str, bytes]] = []
+
+        def submit_parse() -> None:
+            nonlocal batch
+            parses.append(parse_pool.submit(_parse_batch, kind, batch))
+            batch = []
+            while len(parses) > MAX_PARSE_BATCHES_IN_FLIGHT:
+                collect(parses.popleft())
+
+        try:
+            while True:
+                for obj in islice(pending, MAX_DOWNLOADS_IN_FLIGHT - len(downloads)):
+                    downloads[download_pool.submit(fetch_object, obj, range_pool)] = obj
+                if not downloads:
+                    break
+                with m.stage("fetch"):
+                    done, _ = wait(downloads, return_when=FIRST_COMPLETED)
+                for future in done:
+                    body = future.result()
+                    fetched_bytes += len(body)
+                    batch.append((downloads.pop(future).key, body))
+                    if len(batch) >= PARSE_BATCH_SIZE:
+                        submit_parse()
+            if batch:
+                submit_parse()
+            while parses:
+                collect(parses.popleft())
+        except BaseException:
+            for future in downloads:
+                future.cancel()
+            raise
+
+    list_objs = [o for o in (snap.companies_list, snap.people_list) if o is not None]
+    for obj in list_objs:
+        download_and_parse(obj.kind, [obj])
+        if obj.key in errors:
+            # Without its list page the snapshot cannot be rebuilt; leave it without _SUCCESS
+            raise RuntimeError(f"Failed to parse {obj.key}: {errors[obj.key]}")
+
+    companies = parsed.get(snap.companies_list.key, []) if snap.companies_list else []
+    people = parsed.get(snap.people_list.key, []) if snap.people_list else []
+
+    # Only the detail pages of slugs on this snapshot's list pages are needed
+    company_objs = [snap.company_pages[r["slug"]] for r in companies if r.get("slug") in snap.company_pages]
+    person_objs = [snap.person_pages[r["slug"]] for r in people if r.get("slug") in snap.person_pages]
+    download_and_parse("company_page", company_objs)
+    download_and_parse("person_page", person_objs)
+
+    def enrich(records: List[Dict[str, Any]], pages: Dict[str, RawObject]) -> Tuple[List[Dict[str, Any]], int]:
+        out, missing = [], 0
+        for rec in records:
+            obj = pages.get(rec.get("slug"))
+            detail = parsed.get(obj.key) if obj else None
+            if detail is None:
+                missing += 1
+                out.append(rec)
+            else:
+                out.append({**rec, **detail})
+        return out, missing
+
+    companies_enriched, companies_missing = enrich(companies, snap.company_pages)
+    people_enriched, people_missing = enrich(people, snap.person_pages)
+
+    out_dir = _snapshot_dir(snap.ts)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with m.stage("write"):
+        written = 0
+        written += _write_json(out_dir / "companies_list.json", companies)
+        written += _write_json(out_dir / "people_list.json", people)
+        written += _write_json(out_dir / "companies_enriched.json", companies_enriched)
+        written += _write_json(out_dir / "people_enriched.json", people_enriched)
+    m.incr("bytes_written", written)
+
+    elapsed = time.perf_counter() - started
+    pages = len(list_objs) + len(company_objs) + len(person_objs)
+    stats = {
+        "ts": snap.ts,
+        "companies": len(companies),
+        "people": len(people),
+        "companies_missing_detail": companies_missing,
+        "people_missing_detail": people_missing,
+        "pages": pages,
+        "fetched_bytes": fetched_bytes,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(pages / elapsed, 1) if elapsed > 0 else None,
+        "mb_per_s": round(fetched_bytes / elapsed / 1e6, 2) if elapsed > 0 else None,
+        "parse_errors": errors,
+        "finished_at": int(time.time()),
+    }
+    # Written last: its presence marks the snapshot complete for resumption
+    _write_json(out_dir / "_SUCCESS", stats)
+    m.incr("items", len(companies) + len(people))
+    return stats
+
+
+# --- Main ---
+
+def run(
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    limit: Optional[int] = None,
+    force: bool = False,
+    dry_run: bool = False,
+    download_workers: int = DEFAULT_DOWNLOAD_WORKERS,
+    parse_workers: Optional[int] = None,
+    cache_size: int = DEFAULT_PARSED_CACHE_SIZE,
+):
+    m = metrics.current()
+
+    with m.stage("list"):
+        objects = list_raw_objects(workers=download_workers)
+    snapshots = [
+        s for s in plan_snapshots(objects)
+        if (since is None or s.ts >= since) and (until is None or s.ts <= until)
+    ]
+
+    todo = [s for s in snapshots if force or not (_snapshot_dir(s.ts) / "_SUCCESS").exists()]
+    if limit:
+        todo = todo[:limit]
+    log.info(
+        f"{len(snapshots)} snapshot(s) found, {len(snapshots) - len(todo)} already done, {len(todo)} to backfill",
+        extra={"first_ts": snapshots[0].ts if snapshots else None, "last_ts": snapshots[-1].ts if snapshots else None},
+    )
+    if dry_run:
+        for s in todo:
+            log.info(
+                f"would backfill {s.ts}",
+                extra={"company_pages": len(s.company_pages), "person_pages": len(s.person_pages), "_no_rate_limit": True},
+            )
+        return
+
+    progress = logs.Progress(log, "backfill", total=len(todo))
+    parsed_cache = ParsedCache(cache_size)
+    done_stats = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=download_workers, thread_name_prefix="download") as download_pool, \
+            ThreadPoolExecutor(max_workers=4, thread_name_prefix="range") as range_pool, \
+            ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+        for snap in todo:
+            try:
+                stats = backfill_snapshot(snap, download_pool, range_pool, parse_pool, parsed_cache)
+            except Exception as e:
+                m.incr("errors")
+                log.warning("Snapshot failed; rerun to retry it", extra={"ts": snap.ts, "error": str(e)})
+                progress.update(outcome="failed")
+                continue
+            done_stats.append(stats)
+            log.info(
+                f"Backfilled snapshot {snap.ts}",
+                extra={k: stats[k] for k in ("companies", "people", "pages", "pages_per_s", "mb_per_s")},
+            )
+            progress.update(outcome="backfilled")
+    progress.finish()
+
+    elapsed = time.perf_counter() - started
+    pages = sum(s["pages"] for s in done_stats)
+    fetched = sum(s["fetched_bytes"] for s in done_stats)
+    m.extra["backfill"] = {
+        "snapshots_found": len(snapshots),
+        "snapshots_backfilled": len(done_stats),
+        "pages": pages,
+        "pages_per_s": round(pages / elapsed, 1) if elapsed > 0 else None,
+        "mb_per_s": round(fetched / elapsed / 1e6, 2) if elapsed > 0 else None,
+        "parsed_cache": {"hits": parsed_cache.hits, "misses": parsed_cache.misses},
+        "output_dir": str(HISTORY_DIR),
+    }
+    log.info(f"Backfill done: {len(done_stats)} snapshot(s) into {HISTORY_DIR}", extra=m.extra["backfill"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-extract bronze history from every raw snapshot in S3.")
+    parser.add_argument("--since", type=int, default=None, metavar="TS", help="Only snapshots at or after TS")
+    parser.add_argument("--until", type=int, default=None, metavar="TS", help="Only snapshots at or before TS")
+    parser.add_argument("--limit", type=int, default=None, metavar="N", help="Backfill at most N snapshots")
+    parser.add_argument("--force", action="store_true", help="Redo snapshots that already have _SUCCESS")
+    parser.add_argument("--dry-run", action="store_true", help="List the snapshots that would be backfilled")
+    parser.add_argument("--download-workers", type=int, default=DEFAULT_DOWNLOAD_WORKERS, metavar="N")
+    parser.add_argument("--parse-workers", type=int, default=None, metavar="N",
+                        help="Parser processes (default: CPU count)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_PARSED_CACHE_SIZE, metavar="N",
+                        help="Parsed pages kept for reuse across snapshots (LRU)")
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    with metrics.run_report("backfill_raw_snapshots") as m, profiling.profile_from_args(m, args):
+        run(
+            since=args.since,
+            until=args.until,
+            limit=args.limit,
+            force=args.force,
+            dry_run=args.dry_run,
+            download_workers=args.download_workers,
+            parse_workers=args.parse_workers,
+            cache_size=args.cache_size,
+        )
+
+
+if __name__ == "__main__":
+    main()
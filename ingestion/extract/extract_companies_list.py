@@ -1,11 +1,21 @@
+import argparse
 import os
 import json
-from bs4 import BeautifulSoup
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+from ingestion.raw_html import Markup, SubtreeFilter, iter_cards, iter_html_chunks, make_soup
+from ingestion.transform.snapshots import write_json_array
+from vceamless import logs, metrics, profiling
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 HTML_PATH = os.path.join(BASE_DIR, "data_staging", "raw_landing", "companies_list_page.html")
 OUT_PATH = os.path.join(BASE_DIR, "data_staging", "bronze", "companies_list.json")
+GRID = "ul#companies-grid"
+CARD = "li.company-logo"
+# The cards are the only part of the page the parser reads
+LIST_SUBTREES = SubtreeFilter(GRID)
+log = logs.get_logger("extract_companies_list")
 
 def classify_tags(classes):
     status = None
@@ -22,54 +32,88 @@ def classify_tags(classes):
 
     return status, fund_tags, theme_tags
 
-def main():
-    with open(HTML_PATH, "r", encoding="utf-8") as f:
-        html = f.read()
-
-    soup = BeautifulSoup(html, "html.parser")
-    cards = soup.select("ul#companies-grid li.company-logo")
-    print(f"Found {len(cards)} company-logo elements")
-
-    data = []
-    for li in cards:
-        a = li.find("a", class_="companies")
-        img = li.find("img")
-
-        href = a.get("href") if a else None
-        slug = a.get("data-slug") if a else None
-        classes = li.get("class", [])
-
-        logo_url = img.get("src") if img else None
-        logo_alt = img.get("alt") if img else None
-
-        name = None
-        if logo_alt:
-            name = logo_alt.replace(" logo", "").strip()
-
-        status, fund_tags, theme_tags = classify_tags(classes)
-
-        record = {
-            "slug": slug,
-            "name": name,
-            "detail_url": href,
-            "logo_url": logo_url,
-            "logo_alt": logo_alt,
-            "status": status,
-            "fund_tags": fund_tags,
-            "theme_tags": theme_tags,
-            "raw_classes": classes,
-        }
-        data.append(record)
-
+def company_record(li) -> Dict[str, Any]:
+    """
+    Record for one card; `li` is a bs4 Tag or a streamed CardElement.
+    """
+    a = li.find("a", class_="companies")
+    img = li.find("img")
+
+    href = a.get("href") if a else None
+    slug = a.get("data-slug") if a else None
+    classes = li.get("class", [])
+
+    logo_url = img.get("src") if img else None
+    logo_alt = img.get("alt") if img else None
+
+    name = None
+    if logo_alt:
+        name = logo_alt.replace(" logo", "").strip()
+
+    status, fund_tags, theme_tags = classify_tags(classes)
+
+    return {
+        "slug": slug,
+        "name": name,
+        "detail_url": href,
+        "logo_url": logo_url,
+        "logo_alt": logo_alt,
+        "status": status,
+        "fund_tags": fund_tags,
+        "theme_tags": theme_tags,
+        "raw_classes": classes,
+    }
+
+def parse_companies_list_html(html: Markup, restricted: bool = True) -> List[Dict[str, Any]]:
+    """
+    Parse the companies list page into one record per <li class="company-logo">.
+    """
+    soup = make_soup(html, LIST_SUBTREES if restricted else None)
+    return [company_record(li) for li in soup.select(f"{GRID} {CARD}")]
+
+def iter_companies_list(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Same records as parse_companies_list_html, streamed from the page text
+    one card at a time.
+    """
+    for li in iter_cards(chunks, GRID, CARD):
+        yield company_record(li)
+
+def run():
+    m = metrics.current()
+    m.incr("bytes_read", os.path.getsize(HTML_PATH))
+
+    samples = []
+
+    def counted(records):
+        for rec in records:
+            m.incr("items")
+            if len(samples) < 3:
+                samples.append(rec)
+            yield rec
+
+    # Read, parse and write are interleaved, one card at a time
     os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    with open(OUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    print(f"Wrote {len(data)} companies to {OUT_PATH}")
-
-    print("\nSample first 3 records:")
-    for rec in data[:3]:
-        print(json.dumps(rec, indent=2, ensure_ascii=False))
+    with m.stage("extract"):
+        count, size = write_json_array(Path(OUT_PATH), counted(iter_companies_list(iter_html_chunks(Path(HTML_PATH)))))
+    m.incr("bytes_written", size)
+
+    log.info(f"Wrote {count} companies to {OUT_PATH}")
+
+    if logs.show_samples():
+        log.info("Sample first 3 records:")
+        for rec in samples:
+            log.info(json.dumps(rec, indent=2, ensure_ascii=False))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract bronze companies_list.json from the companies list page.")
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    with metrics.run_report("extract_companies_list") as m, profiling.profile_from_args(m, args):
+        run()
 
 if __name__ == "__main__":
     main()
@@ -1,56 +1,100 @@
+import argparse
 import os
 import json
-from bs4 import BeautifulSoup
 from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+from ingestion.raw_html import Markup, SubtreeFilter, iter_cards, iter_html_chunks, make_soup
+from ingestion.transform.snapshots import write_json_array
+from vceamless import logs, metrics, profiling
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 HTML_PATH = os.path.join(BASE_DIR, "data_staging", "raw_landing", "people_list_page.html")
 OUT_PATH = os.path.join(BASE_DIR, "data_staging", "bronze", "people_list.json")
+GRID = "ul#person-grid"
+CARD = "li.person-card"
+# The cards are the only part of the page the parser reads
+LIST_SUBTREES = SubtreeFilter(GRID)
+log = logs.get_logger("extract_people_list")
+
+def person_record(li) -> Dict[str, Any]:
+    """
+    Record for one card; `li` is a bs4 Tag or a streamed CardElement.
+    """
+    a = li.find("a")
+    img = li.find("img")
+    name_el = li.find("h4")
+    role_el = li.find("p")
+
+    href = a.get("href") if a else None
+    slug = a.get("data-slug") if a else None
+    classes = li.get("class", [])
+    photo_url = img.get("src") if img else None
+    photo_alt = img.get("alt") if img else None
+    name = name_el.get_text(strip=True) if name_el else None
+    role = role_el.get_text(strip=True) if role_el else None
+
+    return {
+        "slug": slug,
+        "name": name,
+        "title": role,
+        "detail_url": href,
+        "photo_url": photo_url,
+        "photo_alt": photo_alt,
+        "card_tags": [c for c in classes if c != "person-card"],
+        "raw_classes": classes,
+    }
+
+def parse_people_list_html(html: Markup, restricted: bool = True) -> List[Dict[str, Any]]:
+    """
+    Parse the people list page into one record per <li class="person-card">.
+    """
+    soup = make_soup(html, LIST_SUBTREES if restricted else None)
+    return [person_record(li) for li in soup.select(f"{GRID} {CARD}")]
 
-def main():
-    with open(HTML_PATH, "r", encoding="utf-8") as f:
-        html = f.read()
-
-    soup = BeautifulSoup(html, "html.parser")
-    cards = soup.select("ul#person-grid li.person-card")
-    print(f"Found {len(cards)} person-card elements")
-
-    data = []
-    for li in cards:
-        a = li.find("a")
-        img = li.find("img")
-        name_el = li.find("h4")
-        role_el = li.find("p")
-
-        href = a.get("href") if a else None
-        slug = a.get("data-slug") if a else None
-        classes = li.get("class", [])
-        photo_url = img.get("src") if img else None
-        photo_alt = img.get("alt") if img else None
-        name = name_el.get_text(strip=True) if name_el else None
-        role = role_el.get_text(strip=True) if role_el else None
-
-        record = {
-            "slug": slug,
-            "name": name,
-            "title": role,
-            "detail_url": href,
-            "photo_url": photo_url,
-            "photo_alt": photo_alt,
-            "card_tags": [c for c in classes if c != "person-card"],
-            "raw_classes": classes,
-        }
-        data.append(record)
+def iter_people_list(chunks: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Same records as parse_people_list_html, streamed from the page text one
+    card at a time.
+    """
+    for li in iter_cards(chunks, GRID, CARD):
+        yield person_record(li)
 
+def run():
+    m = metrics.current()
+    m.incr("bytes_read", os.path.getsize(HTML_PATH))
+
+    samples = []
+
+    def counted(records):
+        for rec in records:
+            m.incr("items")
+            if len(samples) < 3:
+                samples.append(rec)
+            yield rec
+
+    # Read, parse and write are interleaved, one card at a time
     os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-    with open(OUT_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with m.stage("extract"):
+        count, size = write_json_array(Path(OUT_PATH), counted(iter_people_list(iter_html_chunks(Path(HTML_PATH)))))
+    m.incr("bytes_written", size)
+
+    log.info(f"Wrote {count} people to {OUT_PATH}")
+
+    if logs.show_samples():
+        log.info("Sample first 3 records:")
+        for rec in samples:
+            log.info(json.dumps(rec, indent=2, ensure_ascii=False))
 
-    print(f"Wrote {len(data)} people to {OUT_PATH}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract bronze people_list.json from the people list page.")
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
 
-    print("\nSample first 3 records:")
-    for rec in data[:3]:
-        print(json.dumps(rec, indent=2, ensure_ascii=False))
+    with metrics.run_report("extract_people_list") as m, profiling.profile_from_args(m, args):
+        run()
 
 if __name__ == "__main__":
     main()
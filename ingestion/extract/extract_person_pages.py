@@ -1,3 +1,4 @@
+import argparse
 from pathlib import Path
 import os
 import json
@@ -6,6 +7,11 @@ from typing import Dict, Any, List, Optional
 import boto3
 from bs4 import BeautifulSoup
 
+from ingestion.raw_archive import PageSource
+from ingestion.raw_html import Markup, SubtreeFilter, make_soup
+from serving import search_index
+from vceamless import jsoncodec, logs, metrics, profiling
+
 BASE_DIR = Path(__file__).resolve().parents[2]
 
 BRONZE_PEOPLE_LIST = BASE_DIR / "data_staging" / "bronze" / "people_list.json"
@@ -17,6 +23,10 @@ BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
 BRONZE_S3_KEY = "sf_ventures/bronze/people_enriched.json"
 
 s3 = boto3.client("s3")
+log = logs.get_logger("extract_person_pages")
+
+# Everything parse_person_detail_html reads lives under these two subtrees
+DETAIL_SUBTREES = SubtreeFilter("div.profile", "section.companies-grid-wrapper")
 
 
 def parse_social_links(info_section) -> Dict[str, Any]:
@@ -93,13 +103,18 @@ def parse_portfolio_companies(soup: BeautifulSoup) -> List[Dict[str, Any]]:
     return results
 
 
-def parse_person_detail_html(html: str) -> Dict[str, Any]:
+def parse_person_detail_html(html: Markup, restricted: bool = True) -> Dict[str, Any]:
     """
     Given the HTML for a single person page, extract detail-level fields.
-    """
-    soup = BeautifulSoup(html, "html.parser")
 
-    profile = soup.select_one("div.profile") or soup
+    restricted=True builds only the profile and portfolio subtrees, and falls
+    back to a full parse for pages without a div.profile.
+    """
+    soup = make_soup(html, DETAIL_SUBTREES if restricted else None)
+    profile = soup.select_one("div.profile")
+    if profile is None:
+        soup = make_soup(html) if restricted else soup
+        profile = soup
     info_section = profile.select_one("section.profile-info")
     image_section = profile.select_one("section.profile-image")
 
@@ -155,62 +170,109 @@ def parse_person_detail_html(html: str) -> Dict[str, Any]:
     return data
 
 
-def main():
+def run(archive: Optional[str] = None, index: bool = True):
+    m = metrics.current()
+
     if not BRONZE_PEOPLE_LIST.exists():
         raise FileNotFoundError(f"Missing bronze people list at {BRONZE_PEOPLE_LIST}")
 
-    with BRONZE_PEOPLE_LIST.open("r", encoding="utf-8") as f:
-        people = json.load(f)
+    with m.stage("load_input"):
+        people = jsoncodec.load_path(BRONZE_PEOPLE_LIST)
 
-    print(f"Loaded {len(people)} people from {BRONZE_PEOPLE_LIST}")
+    log.info(f"Loaded {len(people)} people from {BRONZE_PEOPLE_LIST}")
 
     enriched: List[Dict[str, Any]] = []
     missing_html = 0
 
+    progress = logs.Progress(log, "parse", total=len(people))
+
+    source = PageSource.open(PERSON_PAGES_DIR, archive, "person_pages")
+
     for rec in people:
         slug = rec.get("slug")
         if not slug:
-            print(f"[WARN] Skipping record with no slug: {rec}")
+            log.warning("Skipping record with no slug", extra={"record": rec})
+            progress.update(outcome="invalid")
             continue
 
-        html_path = PERSON_PAGES_DIR / f"{slug}.html"
-        if not html_path.exists():
-            print(f"[WARN] No detail HTML found for slug={slug} at {html_path}")
+        with m.stage("read"):
+            page = source.read(slug)
+        if page is None:
+            log.warning("No detail HTML found", extra={"slug": slug, "path": source.location(slug)})
             # keep base record so we don't lose it from the dataset
             enriched.append(rec)
             missing_html += 1
+            m.incr("missing_html")
+            progress.update(outcome="missing_html")
             continue
 
-        html = html_path.read_text(encoding="utf-8")
-        detail_data = parse_person_detail_html(html)
+        html, size = page
+        m.incr("bytes_read", size)
+        with m.stage("parse"):
+            detail_data = parse_person_detail_html(html)
+        m.incr("items")
+        log.debug("Parsed detail page", extra={"slug": slug, "fields": len(detail_data)})
+        progress.update(outcome="parsed")
 
         # Merge base list-level record with detail-level fields
         merged = {**rec, **detail_data}
         enriched.append(merged)
 
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUT_PATH.write_text(json.dumps(enriched, indent=2, ensure_ascii=False), encoding="utf-8")
+    progress.finish()
+    source.close()
 
-    print(f"\nWrote {len(enriched)} enriched people to {OUT_PATH}")
+    # Serialized once; the same buffer goes to disk and to S3
+    with m.stage("write"):
+        body = jsoncodec.write_path(OUT_PATH, enriched)
+    m.incr("bytes_written", len(body))
+
+    log.info(f"Wrote {len(enriched)} enriched people to {OUT_PATH}")
     if missing_html:
-        print(f"[INFO] {missing_html} people had no detail HTML and were left un-enriched.")
+        log.info(f"{missing_html} people had no detail HTML and were left un-enriched.")
 
     # Optional: mirror to S3 bronze
     try:
-        s3.put_object(
-            Bucket=BUCKET,
-            Key=BRONZE_S3_KEY,
-            Body=json.dumps(enriched, indent=2, ensure_ascii=False).encode("utf-8"),
-            ContentType="application/json",
-        )
-        print(f"Uploaded enriched JSON to s3://{BUCKET}/{BRONZE_S3_KEY}")
+        with m.stage("upload"):
+            s3.put_object(
+                Bucket=BUCKET,
+                Key=BRONZE_S3_KEY,
+                Body=body,
+                ContentType="application/json",
+            )
+        m.incr("bytes_uploaded", len(body))
+        log.info(f"Uploaded enriched JSON to s3://{BUCKET}/{BRONZE_S3_KEY}")
     except Exception as e:
-        print(f"[WARN] Failed to upload enriched JSON to S3: {e}")
+        m.incr("errors")
+        log.warning(f"Failed to upload enriched JSON to S3: {e}")
+
+    # Keep the search index in step; only changed text is re-tokenized
+    if index:
+        try:
+            with m.stage("index"):
+                search_index.update_documents("person", enriched)
+        except Exception as e:
+            m.incr("errors")
+            log.warning(f"Failed to update the search index: {e}")
 
     # Print a small sample
-    print("\nSample of first 2 enriched records:")
-    for rec in enriched[:2]:
-        print(json.dumps(rec, indent=2, ensure_ascii=False))
+    if logs.show_samples():
+        log.info("Sample of first 2 enriched records:")
+        for rec in enriched[:2]:
+            log.info(json.dumps(rec, indent=2, ensure_ascii=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich bronze people with fields from their detail pages.")
+    parser.add_argument("--archive", default=None, metavar="PATH|s3://...|latest",
+                        help="Read detail pages from a packed raw archive instead of per-page files")
+    parser.add_argument("--no-index", action="store_true", help="Do not update the search index")
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    with metrics.run_report("extract_person_pages") as m, profiling.profile_from_args(m, args):
+        run(archive=args.archive, index=not args.no_index)
 
 
 if __name__ == "__main__":
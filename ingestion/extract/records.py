@@ -0,0 +1,392 @@
+"""
+Compact in-memory form of the bronze company and person records.
+
+The extractors emit plain dicts, and the bronze files are JSON arrays of
+those dicts. Holding a large snapshot that way costs a dict per record plus
+a list and a string per tag, and the same tags ("active", "slack-fund",
+"security") are repeated on thousands of records. The classes here are for
+stages that keep a whole snapshot in memory:
+
+  - fields live in __slots__ (no per-record dict);
+  - tag lists (raw_classes, fund_tags, theme_tags, card_tags and
+    portfolio_companies[].tags) are tuples of small int codes from a shared
+    TagVocabulary, and identical tuples are shared between records;
+  - low-cardinality strings such as status are interned;
+  - each tag list has a bitmask, and a RecordTable keeps a row bitset per
+    tag, so tag filters are bitwise operations.
+
+from_dict() and to_dict() round-trip the JSON shape exactly. That covers
+key order, missing keys vs None, and fields these classes do not know
+about, which are kept in an overflow dict.
+
+  companies = RecordTable(load_records(BRONZE_DIR / "companies_enriched.json", CompanyRecord))
+  hits = companies.where("theme_tags", all_of=["security"], any_of=["ai", "fintech"])
+"""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type, TypeVar
+
+from ingestion.transform.snapshots import iter_json_array, write_json_array
+
+Codes = Tuple[int, ...]
+R = TypeVar("R", bound="Record")
+
+
+class TagVocabulary:
+    """
+    Tag string <-> small int code, with shared code tuples and cached bitmasks
+    (bit i set for code i). Codes are only meaningful within one process.
+    """
+
+    def __init__(self) -> None:
+        self.names: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self._tuples: Dict[Codes, Codes] = {}
+        self._masks: Dict[Codes, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def code(self, name: str) -> int:
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(sys.intern(name))
+        return code
+
+    def encode(self, names: Iterable[str]) -> Codes:
+        """
+        Order-preserving code tuple; equal tag lists share one tuple.
+        """
+        codes = tuple(self.code(n) for n in names)
+        return self._tuples.setdefault(codes, codes)
+
+    def decode(self, codes: Codes) -> List[str]:
+        return [self.names[c] for c in codes]
+
+    def mask(self, names: Iterable[str]) -> int:
+        """
+        Bitmask of tag names. A tag never seen gets a fresh bit, so it
+        matches no record rather than raising.
+        """
+        mask = 0
+        for name in names:
+            mask |= 1 << self.code(name)
+        return mask
+
+    def mask_of(self, codes: Codes) -> int:
+        mask = self._masks.get(codes)
+        if mask is None:
+            mask = 0
+            for c in codes:
+                mask |= 1 << c
+            self._masks[codes] = mask
+        return mask
+
+
+# Key layouts (field names in their original order) are shared by every
+# record with the same shape
+_LAYOUTS: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _is_tag_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+class Record:
+    """
+    Base for the slotted record types. Subclasses list their known fields in
+    FIELDS (which are also their __slots__). TAG_FIELDS, INTERNED_FIELDS and
+    KEYED_FIELDS (small dicts whose keys repeat across records) are subsets
+    of FIELDS. NESTED maps a field holding a list of dicts to the Record
+    type of its items.
+    """
+
+    __slots__ = ("_layout", "_extra")
+
+    FIELDS: Tuple[str, ...] = ()
+    TAG_FIELDS: Tuple[str, ...] = ()
+    INTERNED_FIELDS: Tuple[str, ...] = ()
+    KEYED_FIELDS: Tuple[str, ...] = ()
+    NESTED: Dict[str, Type["Record"]] = {}
+
+    vocab = TagVocabulary()
+
+    @classmethod
+    def from_dict(cls: Type[R], data: Dict[str, Any]) -> R:
+        rec = cls.__new__(cls)
+        layout = tuple(data)
+        rec._layout = _LAYOUTS.setdefault(layout, layout)
+        rec._extra = None
+        for name, convert in cls._plan():
+            value = data.get(name)
+            if convert is not None and value is not None:
+                value = convert(value)
+            setattr(rec, name, value)
+        known = cls._known()
+        if not known.issuperset(layout):
+            rec._extra = {k: v for k, v in data.items() if k not in known} or None
+        return rec
+
+    @classmethod
+    def _plan(cls) -> List[Tuple[str, Optional[Callable[[Any], Any]]]]:
+        """
+        (field, converter) per known field, built once per class.
+        """
+        plan = cls.__dict__.get("_conversion_plan")
+        if plan is None:
+            vocab = cls.vocab
+
+            def tags(value):
+                return vocab.encode(value) if _is_tag_list(value) else value
+
+            def interned(value):
+                return sys.intern(value) if isinstance(value, str) else value
+
+            def keyed(value):
+                return {sys.intern(k): v for k, v in value.items()} if isinstance(value, dict) else value
+
+            def nested(item_cls):
+                def convert(value):
+                    if isinstance(value, list) and all(isinstance(v, dict) for v in value):
+                        return tuple(item_cls.from_dict(v) for v in value)
+                    return value
+                return convert
+
+            plan = []
+            for name in cls.FIELDS:
+                if name in cls.TAG_FIELDS:
+                    plan.append((name, tags))
+                elif name in cls.INTERNED_FIELDS:
+                    plan.append((name, interned))
+                elif name in cls.KEYED_FIELDS:
+                    plan.append((name, keyed))
+                elif name in cls.NESTED:
+                    plan.append((name, nested(cls.NESTED[name])))
+                else:
+                    plan.append((name, None))
+            setattr(cls, "_conversion_plan", plan)
+        return plan
+
+    @classmethod
+    def _known(cls) -> frozenset:
+        known = cls.__dict__.get("_known_fields")
+        if known is None:
+            known = frozenset(cls.FIELDS)
+            setattr(cls, "_known_fields", known)
+        return known
+
+    def _value(self, name: str) -> Any:
+        if name in self._known():
+            value = getattr(self, name)
+            if isinstance(value, tuple):
+                if name in self.NESTED:
+                    return [item.to_dict() for item in value]
+                return self.vocab.decode(value)
+            return value
+        return self._extra[name]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: self._value(name) for name in self._layout}
+
+    # --- dict-style reads ---
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """
+        Field value in its JSON shape (tag lists as names), or `default` when
+        the source dict had no such key.
+        """
+        if name not in self._layout:
+            return default
+        return self._value(name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._layout
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._layout
+
+    # --- tags ---
+
+    def tag_codes(self, field: str) -> Codes:
+        value = getattr(self, field)
+        return value if isinstance(value, tuple) else ()
+
+    def tag_mask(self, field: str) -> int:
+        return self.vocab.mask_of(self.tag_codes(field))
+
+    def has_tags(self, field: str, mask: int) -> bool:
+        """
+        True when the field carries every tag in `mask` (see TagVocabulary.mask).
+        """
+        return self.tag_mask(field) & mask == mask
+
+    def has_any_tag(self, field: str, mask: int) -> bool:
+        return bool(self.tag_mask(field) & mask)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Record):
+            return NotImplemented
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    __hash__ = None  # mutable, like the dicts they replace
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(slug={getattr(self, 'slug', None)!r})"
+
+
+class PortfolioLink(Record):
+    """
+    One people_enriched.portfolio_companies entry. The same company is linked
+    from many people, so its slug and name are interned.
+    """
+
+    FIELDS = ("slug", "name", "tags")
+    TAG_FIELDS = ("tags",)
+    INTERNED_FIELDS = ("slug", "name")
+    __slots__ = FIELDS
+
+
+class Leader(Record):
+    """
+    One companies_enriched.leadership entry.
+    """
+
+    FIELDS = ("name", "role")
+    INTERNED_FIELDS = ("role",)
+    __slots__ = FIELDS
+
+
+class CompanyRecord(Record):
+    """
+    companies_list.json / companies_enriched.json record.
+    """
+
+    FIELDS = (
+        "slug", "name", "detail_url", "logo_url", "logo_alt", "status", "fund_tags", "theme_tags",
+        "raw_classes", "detail_name", "description", "website_url", "social_links", "hero_image_url",
+        "leadership", "status_detail", "acquired_by", "asset_mirrors",
+    )
+    TAG_FIELDS = ("fund_tags", "theme_tags", "raw_classes")
+    INTERNED_FIELDS = ("status", "status_detail")
+    KEYED_FIELDS = ("social_links", "asset_mirrors")
+    NESTED = {"leadership": Leader}
+    __slots__ = FIELDS
+
+
+class PersonRecord(Record):
+    """
+    people_list.json / people_enriched.json record.
+    """
+
+    FIELDS = (
+        "slug", "name", "title", "detail_url", "photo_url", "photo_alt", "card_tags", "raw_classes",
+        "detail_name", "detail_title", "bio", "location", "social_links", "detail_photo_url",
+        "portfolio_companies", "asset_mirrors",
+    )
+    TAG_FIELDS = ("card_tags", "raw_classes")
+    INTERNED_FIELDS = ("title", "detail_title", "location")
+    KEYED_FIELDS = ("social_links", "asset_mirrors")
+    NESTED = {"portfolio_companies": PortfolioLink}
+    __slots__ = FIELDS
+
+
+def load_records(path: Path, cls: Type[R]) -> List[R]:
+    """
+    Stream a bronze JSON array straight into records (no list of dicts in
+    between).
+    """
+    return [cls.from_dict(rec) for rec in iter_json_array(path)]
+
+
+def iter_dicts(records: Iterable[Record]) -> Iterator[Dict[str, Any]]:
+    for rec in records:
+        yield rec.to_dict()
+
+
+def write_records(path: Path, records: Iterable[Record]) -> Tuple[int, int]:
+    """
+    Write records back as the bronze JSON shape; returns (records, bytes).
+    """
+    return write_json_array(path, iter_dicts(records))
+
+
+def iter_rows(rows: int) -> Iterator[int]:
+    """
+    Indexes of the set bits of a row bitset, ascending.
+    """
+    for byte_index, byte in enumerate(rows.to_bytes((rows.bit_length() + 7) // 8, "little")):
+        base = byte_index << 3
+        while byte:
+            low = byte & -byte
+            yield base + low.bit_length() - 1
+            byte ^= low
+
+
+def rows_of(ids: Iterable[int], n: int) -> int:
+    """
+    Row bitset of n rows with the given indexes set.
+    """
+    buf = bytearray((n + 7) // 8)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+class RecordTable:
+    """
+    Records plus row bitsets per tag: bit i of the bitset for (field, tag) is
+    set when records[i] carries that tag. A tag filter over the whole table
+    is then a few big-int ANDs/ORs, and only the matching rows are touched.
+    The bitsets are built on first use of a field.
+    """
+
+    def __init__(self, records: Iterable[R]) -> None:
+        self.records: List[R] = list(records)
+        self._bits: Dict[str, Dict[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _field_bits(self, field: str) -> Dict[int, int]:
+        bits = self._bits.get(field)
+        if bits is None:
+            n_bytes = (len(self.records) + 7) // 8
+            buffers: Dict[int, bytearray] = defaultdict(lambda: bytearray(n_bytes))
+            for i, rec in enumerate(self.records):
+                byte, bit = i >> 3, 1 << (i & 7)
+                for code in rec.tag_codes(field):
+                    buffers[code][byte] |= bit
+            bits = self._bits[field] = {code: int.from_bytes(buf, "little") for code, buf in buffers.items()}
+        return bits
+
+    def mask(self, field: str, all_of: Iterable[str] = (), any_of: Optional[Iterable[str]] = None) -> int:
+        """
+        Row bitset of records whose `field` has every tag in all_of and, when
+        given, at least one of any_of.
+        """
+        bits = self._field_bits(field)
+        codes = Record.vocab.codes
+        rows = (1 << len(self.records)) - 1
+        for tag in all_of:
+            rows &= bits.get(codes.get(tag, -1), 0)
+        if any_of is not None:
+            either = 0
+            for tag in any_of:
+                either |= bits.get(codes.get(tag, -1), 0)
+            rows &= either
+        return rows
+
+    def counts(self, field: str) -> Dict[str, int]:
+        """
+        Records per tag of `field`.
+        """
+        names = Record.vocab.names
+        return {names[code]: rows.bit_count() for code, rows in self._field_bits(field).items()}
+
+    def where(self, field: str, all_of: Iterable[str] = (), any_of: Optional[Iterable[str]] = None) -> List[R]:
+        return [self.records[i] for i in iter_rows(self.mask(field, all_of, any_of))]
@@ -0,0 +1,230 @@
+"""
+AIMD (additive-increase / multiplicative-decrease) concurrency control for
+the landing fetch path.
+
+The controller behaves like a semaphore whose limit (the "window") moves with
+what the site tells us:
+
+  - every `window` healthy completions grow the window by `increase` (so it
+    grows by about one slot per round of requests, like TCP congestion
+    avoidance), up to `max_window`;
+  - a 429 / 5xx response, an error rate above `max_error_rate`, or a p95
+    latency above `latency_spike_factor` x the baseline p50 cuts the window by
+    `decrease_factor` (at most once per cooldown), down to `min_window`;
+  - a Retry-After header on a throttled response pauses new requests.
+
+A fixed worker count is the same controller with min_window == max_window.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+import requests
+
+DEFAULT_MAX_WINDOW = 8
+DEFAULT_INITIAL_WINDOW = 1
+
+# Recent fetches considered for p95 / error rate
+SAMPLE_SIZE = 40
+MIN_SAMPLES = 8
+
+MAX_ERROR_RATE = 0.10
+LATENCY_SPIKE_FACTOR = 3.0
+DECREASE_FACTOR = 0.5
+DECREASE_COOLDOWN_S = 2.0
+# Weight of each new p50 when it is above the baseline, so the baseline
+# recovers within tens of samples after an unusually fast stretch
+BASELINE_DRIFT = 0.1
+
+# Throttled fetches are retried in-run this many times before dead-lettering
+THROTTLE_RETRIES = 2
+DEFAULT_BACKOFF_S = 5.0
+MAX_BACKOFF_S = 60.0
+
+
+def classify_exception(exc: BaseException) -> str:
+    """
+    Map a fetch exception to 'throttled' (429 / 5xx) or 'error'.
+    """
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        if status == 429 or status >= 500:
+            return "throttled"
+    return "error"
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        value = exc.response.headers.get("Retry-After")
+        if value:
+            try:
+                return min(float(value), MAX_BACKOFF_S)
+            except ValueError:
+                return None
+    return None
+
+
+class AIMDController:
+    """
+    Dynamic-limit semaphore driven by observed latency and errors. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        min_window: int = 1,
+        max_window: int = DEFAULT_MAX_WINDOW,
+        initial_window: int = DEFAULT_INITIAL_WINDOW,
+        increase: float = 1.0,
+        decrease_factor: float = DECREASE_FACTOR,
+        max_error_rate: float = MAX_ERROR_RATE,
+        latency_spike_factor: float = LATENCY_SPIKE_FACTOR,
+    ) -> None:
+        self.min_window = max(1, min_window)
+        self.max_window = max(self.min_window, max_window)
+        self.window = float(min(max(initial_window, self.min_window), self.max_window))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.max_error_rate = max_error_rate
+        self.latency_spike_factor = latency_spike_factor
+
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.peak_window = self.limit
+        self.history: List[Dict[str, Any]] = []
+
+        self._latencies: Deque[float] = deque(maxlen=SAMPLE_SIZE)
+        self._outcomes: Deque[bool] = deque(maxlen=SAMPLE_SIZE)
+        self._baseline_p50: Optional[float] = None
+        self._healthy_since_change = 0
+        self._last_decrease = 0.0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def fixed(cls, workers: int) -> "AIMDController":
+        return cls(min_window=workers, max_window=workers, initial_window=workers)
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_window, int(math.floor(self.window)))
+
+    # --- semaphore ---
+
+    def acquire(self) -> None:
+        with self._cond:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                self._cond.wait()
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    # --- feedback ---
+
+    def record(self, latency_s: Optional[float], outcome: str = "ok", retry_after: Optional[float] = None) -> None:
+        """
+        Feed one fetch result: outcome is 'ok', 'error' or 'throttled'.
+        """
+        with self._cond:
+            ok = outcome == "ok"
+            self._outcomes.append(ok)
+            if ok and latency_s is not None:
+                self._latencies.append(latency_s)
+                self._update_baseline()
+
+            if outcome == "throttled":
+                self._decrease("throttled")
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            elif self._error_rate() > self.max_error_rate:
+                self._decrease("error_rate")
+            elif self._latency_spike():
+                self._decrease("latency")
+            elif ok:
+                self._healthy_since_change += 1
+                if self._healthy_since_change >= self.limit and self.window < self.max_window:
+                    self.window = min(self.max_window, self.window + self.increase)
+                    self._healthy_since_change = 0
+                    self.increases += 1
+                    self.peak_window = max(self.peak_window, self.limit)
+                    self._note("increase")
+            self._cond.notify_all()
+
+    def p95(self) -> Optional[float]:
+        with self._cond:
+            return self._quantile(0.95)
+
+    def _quantile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _update_baseline(self) -> None:
+        if len(self._latencies) < MIN_SAMPLES:
+            return
+        p50 = self._quantile(0.5)
+        # Track the best p50 seen, drifting upward so a slower site (or a
+        # baseline set by a burst of unusually fast responses) does not look
+        # like a spike forever.
+        if self._baseline_p50 is None or p50 < self._baseline_p50:
+            self._baseline_p50 = p50
+        else:
+            self._baseline_p50 += BASELINE_DRIFT * (p50 - self._baseline_p50)
+
+    def _error_rate(self) -> float:
+        if len(self._outcomes) < MIN_SAMPLES:
+            return 0.0
+        return 1.0 - (sum(self._outcomes) / len(self._outcomes))
+
+    def _latency_spike(self) -> bool:
+        if self._baseline_p50 is None or len(self._latencies) < MIN_SAMPLES:
+            return False
+        p95 = self._quantile(0.95)
+        return p95 is not None and p95 > self.latency_spike_factor * self._baseline_p50
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN_S:
+            return
+        self._last_decrease = now
+        self.window = max(float(self.min_window), self.window * self.decrease_factor)
+        self._healthy_since_change = 0
+        self.decreases += 1
+        # Start fresh so the samples that triggered the cut do not trigger it again
+        self._latencies.clear()
+        self._outcomes.clear()
+        self._note(f"decrease:{reason}")
+
+    def _note(self, event: str) -> None:
+        if len(self.history) < 500:
+            self.history.append({"t": round(time.time(), 3), "event": event, "window": self.limit})
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "window": self.limit,
+                "min_window": self.min_window,
+                "max_window": self.max_window,
+                "peak_window": self.peak_window,
+                "in_flight": self.in_flight,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "p95_s": self._quantile(0.95),
+                "baseline_p50_s": self._baseline_p50,
+                "error_rate": round(self._error_rate(), 4),
+            }
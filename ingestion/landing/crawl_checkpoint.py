@@ -0,0 +1,203 @@
+"""
+Durable progress tracking for the detail-page crawls.
+
+Each crawl run keeps two files under data_staging/_runs/crawl_state/:
+
+  <kind>_<ts>.progress.json     slugs completed so far, and the S3 keys this
+                                run uploaded (rewritten atomically every
+                                `every` slugs and at the end)
+  <kind>_<ts>.dead_letter.json  slugs that failed, with url, error class,
+                                message and attempt count
+
+plus <kind>_latest.json pointing at the most recent run, so `--resume` can
+reopen it: completed slugs are skipped, dead-lettered slugs are retried (up
+to MAX_ATTEMPTS), and the run keeps its original timestamp so S3 keys line
+up with what was already uploaded.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Set
+
+from vceamless import jsoncodec
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+STATE_DIR = BASE_DIR / "data_staging" / "_runs" / "crawl_state"
+
+# Persist progress after this many completed or failed slugs
+CHECKPOINT_EVERY = 10
+
+# Stop retrying a dead-lettered slug after this many failed attempts
+MAX_ATTEMPTS = 3
+
+
+def atomic_write_json(path: Path, payload: Any) -> bytes:
+    """
+    Write JSON via a temp file in the same directory + os.replace, so a crash
+    never leaves a truncated checkpoint behind. Returns the encoded body.
+    """
+    body = jsoncodec.dumps(payload, indent=True)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return body
+
+
+class CrawlCheckpoint:
+    """
+    Progress log + dead-letter list for one crawl run. Thread-safe.
+    """
+
+    def __init__(self, kind: str, ts: int, state_dir: Path = STATE_DIR, every: int = CHECKPOINT_EVERY) -> None:
+        self.kind = kind
+        self.ts = ts
+        self.state_dir = state_dir
+        self.every = max(1, every)
+
+        self.done: Set[str] = set()
+        # slug -> S3 key, only for pages uploaded under this run's ts (a slug
+        # skipped because its local file exists is done but not uploaded)
+        self.s3_keys: Dict[str, str] = {}
+        self.dead_letter: Dict[str, Dict[str, Any]] = {}
+        self.resumed = False
+        # Set by the caller (sharded crawls: "lease lost") to end the crawl early
+        self.stop_when: Optional[Callable[[], bool]] = None
+
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    # --- paths ---
+
+    @property
+    def progress_path(self) -> Path:
+        return self.state_dir / f"{self.kind}_{self.ts}.progress.json"
+
+    @property
+    def dead_letter_path(self) -> Path:
+        return self.state_dir / f"{self.kind}_{self.ts}.dead_letter.json"
+
+    @property
+    def latest_path(self) -> Path:
+        return self.state_dir / f"{self.kind}_latest.json"
+
+    # --- lifecycle ---
+
+    @classmethod
+    def start(cls, kind: str, ts: int, resume: bool = False, state_dir: Path = STATE_DIR,
+              every: int = CHECKPOINT_EVERY) -> "CrawlCheckpoint":
+        """
+        Open a new run at `ts`, or reopen the latest run for `kind` when
+        `resume` is set and one exists.
+        """
+        if resume:
+            latest = state_dir / f"{kind}_latest.json"
+            if latest.exists():
+                prev_ts = jsoncodec.load_path(latest)["ts"]
+                cp = cls(kind, prev_ts, state_dir=state_dir, every=every)
+                cp._load()
+                cp.resumed = True
+                return cp
+
+        cp = cls(kind, ts, state_dir=state_dir, every=every)
+        atomic_write_json(cp.latest_path, {"kind": kind, "ts": ts})
+        cp.flush()
+        return cp
+
+    @classmethod
+    def open(cls, kind: str, ts: int, state_dir: Path = STATE_DIR,
+             every: int = CHECKPOINT_EVERY) -> "CrawlCheckpoint":
+        """
+        Open the run at exactly `ts`, picking up any state already on disk
+        (used by sharded crawls, where every worker shares the run ts).
+        """
+        cp = cls(kind, ts, state_dir=state_dir, every=every)
+        cp.resumed = cp.progress_path.exists()
+        cp._load()
+        cp.flush()
+        return cp
+
+    def _load(self) -> None:
+        if self.progress_path.exists():
+            data = jsoncodec.load_path(self.progress_path)
+            self.done = set(data.get("done", []))
+            self.s3_keys = dict(data.get("s3_keys", {}))
+        if self.dead_letter_path.exists():
+            self.dead_letter = jsoncodec.load_path(self.dead_letter_path)
+
+    def flush(self) -> None:
+        with self._lock:
+            progress = {
+                "kind": self.kind,
+                "ts": self.ts,
+                "updated_at": int(time.time()),
+                "done_count": len(self.done),
+                "dead_letter_count": len(self.dead_letter),
+                "done": sorted(self.done),
+                "s3_keys": dict(sorted(self.s3_keys.items())),
+            }
+            dead_letter = dict(self.dead_letter)
+            self._pending = 0
+        atomic_write_json(self.progress_path, progress)
+        atomic_write_json(self.dead_letter_path, dead_letter)
+
+    # --- per-slug bookkeeping ---
+
+    def should_stop(self) -> bool:
+        return self.stop_when is not None and self.stop_when()
+
+    def should_process(self, slug: str) -> bool:
+        """
+        False for slugs already done, or dead-lettered MAX_ATTEMPTS times.
+        """
+        with self._lock:
+            if slug in self.done:
+                return False
+            entry = self.dead_letter.get(slug)
+            return not entry or entry.get("attempts", 0) < MAX_ATTEMPTS
+
+    def attempts(self, slug: str) -> int:
+        with self._lock:
+            return self.dead_letter.get(slug, {}).get("attempts", 0)
+
+    def mark_done(self, slug: str, s3_key: Optional[str] = None) -> None:
+        with self._lock:
+            self.done.add(slug)
+            if s3_key is not None:
+                self.s3_keys[slug] = s3_key
+            self.dead_letter.pop(slug, None)
+            self._pending += 1
+            due = self._pending >= self.every
+        if due:
+            self.flush()
+
+    def mark_failed(self, slug: str, url: Optional[str], exc: BaseException) -> Dict[str, Any]:
+        with self._lock:
+            entry = self.dead_letter.get(slug, {"attempts": 0})
+            entry = {
+                "slug": slug,
+                "url": url,
+                "error_class": type(exc).__name__,
+                "error": str(exc)[:500],
+                "attempts": entry.get("attempts", 0) + 1,
+                "last_attempt_at": int(time.time()),
+            }
+            self.dead_letter[slug] = entry
+            self._pending += 1
+            due = self._pending >= self.every
+        if due:
+            self.flush()
+        return entry
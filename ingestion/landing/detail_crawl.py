@@ -0,0 +1,223 @@
+"""
+Shared fetch -> save -> upload loop for the company and person detail scrapers.
+
+The scrapers keep their own fetch/save/upload helpers and config; this module
+owns the per-slug control flow: local-file skip, metrics stages, progress,
+and checkpointing. A failing slug is dead-lettered and the crawl moves on
+instead of aborting the whole run.
+
+Slugs are crawled on a thread pool whose effective size is set by an
+AIMDController (see adaptive_concurrency.py): it widens while the site stays
+fast and healthy and backs off on 429/5xx or latency spikes. The current
+window is exported as the `concurrency_window` gauge.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+from ingestion.landing.adaptive_concurrency import (
+    DEFAULT_BACKOFF_S,
+    MAX_BACKOFF_S,
+    THROTTLE_RETRIES,
+    AIMDController,
+    classify_exception,
+    retry_after_seconds,
+)
+from ingestion.landing.crawl_checkpoint import CrawlCheckpoint
+from vceamless import logs, metrics
+
+
+def parse_workers(value: str) -> Optional[int]:
+    """
+    argparse type for --workers: 'adaptive' (None) or a fixed positive count.
+    """
+    if value == "adaptive":
+        return None
+    n = int(value)
+    if n < 1:
+        raise ValueError("--workers must be 'adaptive' or a positive integer")
+    return n
+
+
+def make_controller(workers: Optional[int], max_workers: int) -> AIMDController:
+    if workers is None:
+        return AIMDController(max_window=max_workers)
+    return AIMDController.fixed(workers)
+
+
+def _served_from_cache(result: Any) -> bool:
+    return bool(getattr(result, "from_cache", False))
+
+
+def fetch_with_feedback(fetch: Callable[[str], Any], url: str, controller: AIMDController,
+                        log: logging.Logger, slug: str,
+                        from_cache: Callable[[Any], bool] = _served_from_cache) -> Any:
+    """
+    fetch(url), feeding latency and outcome to the controller. Throttled
+    responses (429/5xx) are retried up to THROTTLE_RETRIES times with backoff;
+    anything else is raised. Results replayed from the HTTP cache (per
+    `from_cache`) say nothing about the site and are not fed back.
+    """
+    m = metrics.current()
+    for attempt in range(THROTTLE_RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            with m.stage("fetch"):
+                result = fetch(url)
+        except Exception as e:
+            outcome = classify_exception(e)
+            retry_after = retry_after_seconds(e)
+            controller.record(None, outcome, retry_after=retry_after)
+            if outcome != "throttled" or attempt == THROTTLE_RETRIES:
+                raise
+            delay = retry_after or min(MAX_BACKOFF_S, DEFAULT_BACKOFF_S * 2 ** attempt)
+            log.warning(
+                "Throttled, backing off",
+                extra={"slug": slug, "delay_s": delay, "window": controller.limit},
+            )
+            m.incr("retries")
+            time.sleep(delay)
+            continue
+        if not from_cache(result):
+            controller.record(time.perf_counter() - start, "ok")
+        return result
+
+
+def crawl_detail_pages(
+    records: Iterable[Dict[str, Any]],
+    *,
+    pages_dir: Path,
+    fetch_html: Callable[[str], Any],
+    save_local: Callable[[str, Any], Path],
+    upload_s3: Callable[[str, Any, int], str],
+    checkpoint: CrawlCheckpoint,
+    log: logging.Logger,
+    bucket: str,
+    total: Optional[int],
+    controller: Optional[AIMDController] = None,
+    refetch: Optional[Set[str]] = None,
+) -> int:
+    """
+    Crawl the detail page of every record with a slug and detail_url.
+
+    Without a controller the crawl is serial. Slugs in `refetch` (known to have
+    changed) are fetched even when a local copy exists. Stops submitting new
+    slugs once `checkpoint.should_stop()` is true. Returns the number of pages
+    fetched in this run.
+    """
+    refetch = refetch or set()
+    m = metrics.current()
+    ts = checkpoint.ts
+    controller = controller or AIMDController.fixed(1)
+    progress = logs.Progress(log, "fetch", total=total)
+    count = 0
+    count_lock = threading.Lock()
+
+    def crawl_one(slug: str, url: str) -> None:
+        nonlocal count
+        try:
+            log.debug("Fetching", extra={"slug": slug, "url": url})
+            try:
+                html = fetch_with_feedback(fetch_html, url, controller, log, slug)
+                with m.stage("save_local"):
+                    saved_path = save_local(slug, html)
+                with m.stage("upload"):
+                    s3_key = upload_s3(slug, html, ts)
+            except Exception as e:
+                m.incr("errors")
+                entry = checkpoint.mark_failed(slug, url, e)
+                log.warning(
+                    "Fetch failed, dead-lettered",
+                    extra={"slug": slug, "error_class": entry["error_class"], "attempts": entry["attempts"]},
+                )
+                progress.update(outcome="failed")
+                return
+
+            log.debug("Saved", extra={"slug": slug, "path": str(saved_path), "s3_uri": f"s3://{bucket}/{s3_key}"})
+            checkpoint.mark_done(slug, s3_key=s3_key)
+            with count_lock:
+                count += 1
+            m.incr("items")
+            progress.update(outcome="fetched")
+        finally:
+            controller.release()
+            m.set_gauge("concurrency_window", controller.limit)
+
+    def crawl_done(slug: str, future: Future) -> None:
+        # crawl_one dead-letters fetch failures itself; anything that gets
+        # here (e.g. an OSError from a checkpoint flush in mark_done) would
+        # otherwise vanish with the discarded future.
+        if future.cancelled() or future.exception() is None:
+            return
+        m.incr("errors")
+        log.error("Crawl worker failed", exc_info=future.exception(), extra={"slug": slug})
+        progress.update(outcome="error")
+
+    pool = ThreadPoolExecutor(max_workers=controller.max_window, thread_name_prefix="crawl")
+    try:
+        for rec in records:
+            if checkpoint.should_stop():
+                log.warning("Stopping crawl early; in-flight fetches will finish", extra={"done": len(checkpoint.done)})
+                break
+
+            slug = rec.get("slug")
+            url = rec.get("detail_url")
+
+            if not slug or not url:
+                log.warning("Skipping record with missing slug or detail_url", extra={"record": rec})
+                progress.update(outcome="invalid")
+                continue
+
+            if not checkpoint.should_process(slug):
+                progress.update(outcome="checkpointed")
+                continue
+
+            local_path = pages_dir / f"{slug}.html"
+            if local_path.exists() and slug not in checkpoint.dead_letter and slug not in refetch:
+                log.debug("Local file already exists, skipping", extra={"slug": slug, "path": str(local_path)})
+                m.incr("cache_hits")
+                checkpoint.mark_done(slug)
+                progress.update(outcome="skipped")
+                continue
+
+            if checkpoint.attempts(slug):
+                m.incr("retries")
+
+            # Blocks until the controller's window has room
+            controller.acquire()
+            m.set_gauge("concurrency_window", controller.limit)
+            pool.submit(crawl_one, slug, url).add_done_callback(partial(crawl_done, slug))
+        pool.shutdown(wait=True)
+    except BaseException:
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        # Persist progress even on Ctrl-C, so --resume picks up from here
+        checkpoint.flush()
+
+    progress.finish()
+    concurrency = controller.snapshot()
+    m.set_gauge("concurrency_window", concurrency["window"])
+    m.set_gauge("concurrency_peak_window", concurrency["peak_window"])
+    m.extra["concurrency"] = dict(concurrency, history=controller.history)
+    m.extra["checkpoint"] = {
+        "ts": ts,
+        "resumed": checkpoint.resumed,
+        "done": len(checkpoint.done),
+        "dead_letter": len(checkpoint.dead_letter),
+        "progress_path": str(checkpoint.progress_path),
+        "dead_letter_path": str(checkpoint.dead_letter_path),
+    }
+    if checkpoint.dead_letter:
+        log.warning(
+            f"{len(checkpoint.dead_letter)} slug(s) dead-lettered; rerun with --resume to retry",
+            extra={"dead_letter_path": str(checkpoint.dead_letter_path)},
+        )
+    return count
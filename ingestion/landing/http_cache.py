@@ -0,0 +1,381 @@
+"""
+On-disk HTTP response cache for development crawls.
+
+The landing scripts fetch through session(), a shared requests.Session.
+With the cache turned on (--http-cache or VCEAMLESS_HTTP_CACHE=1), the
+session's transport adapter answers GETs from data_staging/_http_cache/
+and only goes to the network for misses and stale entries:
+
+  - the key is the method, the URL and the request headers in KEY_HEADERS;
+  - an entry is one file, <aa>/<sha256>.resp, holding a JSON header line
+    (url, status, reason, response headers, stored_at) and then the decoded
+    body, written atomically;
+  - entries younger than the TTL are served without a request. Older ones
+    are revalidated with If-None-Match / If-Modified-Since, and a 304 just
+    renews them. If the revalidation cannot reach the site, the stale entry
+    is served anyway;
+  - a conditional request from the caller (the asset mirror sends one) is
+    answered with a 304 when the entry's validators match;
+  - once the cache holds more than max_bytes, the least recently used
+    entries are deleted until it is down to EVICT_TO of that. Recency is
+    the file mtime, which is touched on every hit, so it carries across
+    runs;
+  - --cache-only never touches the network: every entry is served
+    regardless of age, and a miss raises CacheMiss (a ConnectionError, so
+    the crawl dead-letters the slug like any other failed fetch).
+
+This is a development tool. Server Cache-Control is ignored in favour of
+the TTL, and the cache is off unless asked for.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ingestion.landing.adaptive_concurrency import DEFAULT_MAX_WINDOW
+from vceamless import jsoncodec, logs, metrics
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+DEFAULT_CACHE_DIR = Path(os.getenv("VCEAMLESS_HTTP_CACHE_DIR", BASE_DIR / "data_staging" / "_http_cache"))
+DEFAULT_TTL_S = float(os.getenv("VCEAMLESS_HTTP_CACHE_TTL", 24 * 3600))
+DEFAULT_MAX_MB = 1024
+CACHE_BY_DEFAULT = os.getenv("VCEAMLESS_HTTP_CACHE", "").lower() in ("1", "true", "yes", "on")
+
+# Evictions stop once the cache is down to this fraction of max_bytes
+EVICT_TO = 0.9
+
+# Request headers that select a different representation of the same URL
+KEY_HEADERS = ("Accept", "Accept-Language", "Range")
+
+# Statuses stored (the heuristically cacheable ones, RFC 9110 15.1)
+CACHEABLE_STATUSES = frozenset({200, 203, 300, 301, 308, 404, 410})
+
+# Not replayed: the body is stored decoded, and these describe one connection
+DROPPED_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"})
+
+# Headers a 304 may update on the stored entry
+REVALIDATED_HEADERS = ("Cache-Control", "Date", "ETag", "Expires", "Last-Modified")
+
+POOL_MAXSIZE = DEFAULT_MAX_WINDOW * 2
+
+log = logs.get_logger("http_cache")
+
+
+class CacheMiss(requests.ConnectionError):
+    """
+    A --cache-only request for something the cache does not hold.
+    """
+
+
+class ResponseCache:
+    """
+    Entry files plus an in-memory LRU index (key -> size) built from a
+    directory scan on first use. Thread-safe; several processes may share a
+    directory, and each then only evicts what it has seen.
+    """
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_MB << 20) -> None:
+        self.dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self.total_bytes = 0
+
+    def path(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.resp"
+
+    def _scan(self) -> "OrderedDict[str, int]":
+        found = []
+        for path in self.dir.glob("*/*.resp"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            found.append((st.st_mtime, path.stem, st.st_size))
+        found.sort()
+        index = OrderedDict((key, size) for _, key, size in found)
+        self.total_bytes = sum(index.values())
+        return index
+
+    def _ensure_index(self) -> "OrderedDict[str, int]":
+        # Callers hold self._lock
+        if self._index is None:
+            self._index = self._scan()
+        return self._index
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        The stored entry (its header fields plus "body"), or None. "headers"
+        is a CaseInsensitiveDict.
+        """
+        path = self.path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        head, sep, body = data.partition(b"\n")
+        try:
+            entry = jsoncodec.loads(head) if sep else None
+        except jsoncodec.JSONDecodeError:
+            entry = None
+        if entry is None:
+            log.warning("Dropping unreadable cache entry", extra={"path": str(path)})
+            self.delete(key)
+            return None
+        # Servers differ in header case (ETag vs etag); look them up case-insensitively
+        entry["headers"] = CaseInsensitiveDict(entry.get("headers") or {})
+        entry["body"] = body
+        with self._lock:
+            index = self._ensure_index()
+            if key in index:
+                index.move_to_end(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any], body: bytes) -> None:
+        head = jsoncodec.dumps({k: dict(v) if k == "headers" else v for k, v in entry.items() if k != "body"})
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(head)
+                f.write(b"\n")
+                f.write(body)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        size = len(head) + 1 + len(body)
+        with self._lock:
+            index = self._ensure_index()
+            self.total_bytes += size - index.pop(key, 0)
+            index[key] = size
+            self._evict(index)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self.total_bytes -= self._ensure_index().pop(key, 0)
+        try:
+            self.path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, index: "OrderedDict[str, int]") -> None:
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TO
+        evicted = 0
+        while index and self.total_bytes > target:
+            key, size = index.popitem(last=False)
+            self.total_bytes -= size
+            evicted += 1
+            try:
+                self.path(key).unlink()
+            except FileNotFoundError:
+                pass
+        metrics.current().incr("http_cache_evicted", evicted)
+
+
+def cache_key(request: requests.PreparedRequest) -> str:
+    parts = [request.method or "GET", request.url or ""]
+    parts += [f"{name}: {request.headers.get(name, '')}" for name in KEY_HEADERS]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _http_date(value: Optional[str]):
+    try:
+        return parsedate_to_datetime(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def not_modified(request_headers, entry_headers) -> bool:
+    """
+    True when the request's own validators match the stored response.
+    """
+    inm = request_headers.get("If-None-Match")
+    if inm:
+        etag = entry_headers.get("ETag")
+        return bool(etag) and (inm.strip() == "*" or etag in (t.strip() for t in inm.split(",")))
+    since = _http_date(request_headers.get("If-Modified-Since"))
+    modified = _http_date(entry_headers.get("Last-Modified"))
+    return since is not None and modified is not None and modified <= since
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter that answers GETs from a ResponseCache (see the
+    module docstring for the policy). Other methods, and streamed GETs, go
+    straight to the network.
+    """
+
+    def __init__(self, cache: ResponseCache, ttl: float = DEFAULT_TTL_S, offline: bool = False, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.ttl = ttl
+        self.offline = offline
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if request.method != "GET" or stream:
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        m = metrics.current()
+        key = cache_key(request)
+        entry = self.cache.get(key)
+        if entry is not None and (self.offline or time.time() - entry["stored_at"] < self.ttl):
+            m.incr("http_cache_hits")
+            return self._replay(request, entry)
+        if self.offline:
+            m.incr("http_cache_misses")
+            raise CacheMiss(f"Not in the HTTP cache (--cache-only): {request.url}", request=request)
+
+        sent = request
+        if entry is not None and not _is_conditional(request.headers):
+            sent = request.copy()
+            if entry["headers"].get("ETag"):
+                sent.headers["If-None-Match"] = entry["headers"]["ETag"]
+            if entry["headers"].get("Last-Modified"):
+                sent.headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        try:
+            resp = super().send(sent, stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if entry is None:
+                raise
+            log.warning("Serving a stale cache entry", extra={"url": request.url, "error_class": type(e).__name__})
+            m.incr("http_cache_stale")
+            return self._replay(request, entry)
+
+        if resp.status_code == 304 and entry is not None and (sent is not request or
+                                                              not_modified(request.headers, entry["headers"])):
+            validators = entry["headers"]
+            for name in REVALIDATED_HEADERS:
+                if name in resp.headers:
+                    validators[name] = resp.headers[name]
+            entry["stored_at"] = time.time()
+            body = entry.pop("body")
+            self.cache.put(key, entry, body)
+            entry["body"] = body
+            m.incr("http_cache_revalidated")
+            return self._replay(request, entry)
+
+        m.incr("http_cache_misses")
+        if resp.status_code in CACHEABLE_STATUSES:
+            headers = {k: v for k, v in resp.headers.items() if k.lower() not in DROPPED_HEADERS}
+            entry = {"url": request.url, "status": resp.status_code, "reason": resp.reason,
+                     "headers": headers, "stored_at": time.time()}
+            self.cache.put(key, entry, resp.content)
+        resp.from_cache = False
+        return resp
+
+    def _replay(self, request, entry: Dict[str, Any]) -> requests.Response:
+        resp = requests.Response()
+        resp.headers = CaseInsensitiveDict(entry["headers"])
+        if entry["status"] == 200 and not_modified(request.headers, resp.headers):
+            resp.status_code, resp.reason, body = 304, "Not Modified", b""
+        else:
+            resp.status_code, resp.reason, body = entry["status"], entry["reason"], entry["body"]
+        resp.headers["Content-Length"] = str(len(body))
+        resp._content = body
+        resp._content_consumed = True
+        resp.encoding = get_encoding_from_headers(resp.headers)
+        resp.url = request.url
+        resp.request = request
+        resp.connection = self
+        resp.from_cache = True
+        metrics.current().incr("http_cache_hit_bytes", len(body))
+        return resp
+
+
+def _is_conditional(headers) -> bool:
+    return "If-None-Match" in headers or "If-Modified-Since" in headers
+
+
+# --- Shared session ---
+
+_config: Dict[str, Any] = {"enabled": CACHE_BY_DEFAULT, "offline": False, "ttl": DEFAULT_TTL_S,
+                           "max_bytes": DEFAULT_MAX_MB << 20, "cache_dir": DEFAULT_CACHE_DIR}
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def make_session(cache: Optional[ResponseCache] = None, ttl: float = DEFAULT_TTL_S,
+                 offline: bool = False) -> requests.Session:
+    """
+    A requests.Session whose http(s) adapter goes through `cache`, or a plain
+    pooled session when cache is None.
+    """
+    if cache is not None:
+        adapter = CachingAdapter(cache, ttl=ttl, offline=offline, pool_maxsize=POOL_MAXSIZE)
+    else:
+        adapter = HTTPAdapter(pool_maxsize=POOL_MAXSIZE)
+    sess = requests.Session()
+    sess.mount("https://", adapter)
+    sess.mount("http://", adapter)
+    return sess
+
+
+def session() -> requests.Session:
+    """
+    The landing HTTP client, built from the current configure() settings.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            cache = None
+            if _config["enabled"] or _config["offline"]:
+                cache = ResponseCache(_config["cache_dir"], _config["max_bytes"])
+            _session = make_session(cache, ttl=_config["ttl"], offline=_config["offline"])
+        return _session
+
+
+def configure(enabled: bool = CACHE_BY_DEFAULT, offline: bool = False, ttl: float = DEFAULT_TTL_S,
+              max_bytes: int = DEFAULT_MAX_MB << 20, cache_dir: Path = DEFAULT_CACHE_DIR) -> None:
+    """
+    Set the cache policy for session(). offline implies enabled.
+    """
+    global _session
+    with _session_lock:
+        _config.update(enabled=enabled or offline, offline=offline, ttl=ttl, max_bytes=max_bytes,
+                       cache_dir=Path(cache_dir))
+        _session = None
+    if enabled or offline:
+        log.info("HTTP cache enabled", extra={"dir": str(cache_dir), "ttl_s": ttl, "max_mb": max_bytes >> 20,
+                                              "cache_only": offline})
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("http cache")
+    group.add_argument("--http-cache", action="store_true", default=CACHE_BY_DEFAULT,
+                       help="Serve repeated fetches from the on-disk response cache (env VCEAMLESS_HTTP_CACHE=1)")
+    group.add_argument("--cache-only", action="store_true",
+                       help="Never touch the network: serve every fetch from the cache, failing on a miss")
+    group.add_argument("--http-cache-ttl", type=float, default=DEFAULT_TTL_S, metavar="SECONDS",
+                       help="Age after which a cached response is revalidated")
+    group.add_argument("--http-cache-max-mb", type=int, default=DEFAULT_MAX_MB, metavar="MB",
+                       help="Evict least recently used responses beyond this size")
+    group.add_argument("--http-cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+
+
+def configure_from_args(args: argparse.Namespace) -> None:
+    configure(enabled=args.http_cache, offline=args.cache_only, ttl=args.http_cache_ttl,
+              max_bytes=args.http_cache_max_mb << 20, cache_dir=args.http_cache_dir)
@@ -0,0 +1,322 @@
+"""
+Discovery stage: work out which detail pages actually need fetching.
+
+Runs after the list pages are landed and extracted (bronze companies_list.json
+/ people_list.json) and before the detail scrapers. For each kind it compares
+the current list snapshot, plus <lastmod> from the site's sitemap when one is
+available, with the state saved by the previous discovery run:
+
+  added     slug is on the list page now but was not last time
+  removed   slug was on the list page last time but is gone now
+  changed   slug's list card changed (name, logo, status, tags...) or its
+            sitemap lastmod moved forward
+
+The result is written as a worklist that the detail scrapers pick up with
+`--only-changed`, so a typical daily run only fetches the handful of slugs in
+added + changed. The first run (no previous state) reports everything as
+added. A detail crawl marks the worklist it consumed and keeps the slugs it did
+not finish (dead-lettered, cut off by --limit, interrupted) in its "pending"
+list; the next discovery run carries those over, or the whole work set when no
+crawl consumed the worklist at all.
+
+  data_staging/_runs/discovery/<kind>_state.json     per-slug fingerprint, lastmod, first/last seen
+  data_staging/_runs/discovery/<kind>_worklist.json  latest worklist
+
+Both are mirrored (best effort) to s3://<RAW_BUCKET>/sf_ventures/_discovery/,
+and the state is read back from there when there is no local copy (fresh
+container).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import boto3
+
+from ingestion.landing import http_cache
+from ingestion.landing.crawl_checkpoint import atomic_write_json
+from vceamless import jsoncodec, logs, metrics, profiling
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+DISCOVERY_DIR = BASE_DIR / "data_staging" / "_runs" / "discovery"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+S3_DISCOVERY_PREFIX = "sf_ventures/_discovery"
+
+SITEMAP_URL = "https://salesforceventures.com/sitemap_index.xml"
+
+# Guard against sitemap indexes that fan out to many unrelated sitemaps
+MAX_SITEMAPS = 50
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+# Detail crawl kind -> bronze list snapshot it is driven by
+LIST_SNAPSHOTS = {
+    "company_pages": BASE_DIR / "data_staging" / "bronze" / "companies_list.json",
+    "person_pages": BASE_DIR / "data_staging" / "bronze" / "people_list.json",
+}
+
+s3 = boto3.client("s3")
+log = logs.get_logger("sf_ventures_discover_changes")
+
+
+def state_path(kind: str) -> Path:
+    return DISCOVERY_DIR / f"{kind}_state.json"
+
+
+def worklist_path(kind: str) -> Path:
+    return DISCOVERY_DIR / f"{kind}_worklist.json"
+
+
+# --- sitemap ---
+
+def _url_path(url: str) -> str:
+    return urlparse(url).path.rstrip("/") + "/"
+
+def fetch_sitemap_lastmods(url: str = SITEMAP_URL) -> Dict[str, str]:
+    """
+    Map url path -> lastmod for every <url> reachable from `url`, following
+    sitemap indexes. Entries without a lastmod are left out.
+    """
+    lastmods: Dict[str, str] = {}
+    queue = [url]
+    seen = set()
+    while queue and len(seen) < MAX_SITEMAPS:
+        sitemap_url = queue.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+
+        resp = http_cache.session().get(sitemap_url, timeout=20)
+        resp.raise_for_status()
+        metrics.current().incr("bytes_fetched", len(resp.content))
+        root = ET.fromstring(resp.content)
+
+        if root.tag == f"{SITEMAP_NS}sitemapindex":
+            for loc in root.iter(f"{SITEMAP_NS}loc"):
+                if loc.text:
+                    queue.append(loc.text.strip())
+            continue
+
+        for entry in root.iter(f"{SITEMAP_NS}url"):
+            loc = entry.findtext(f"{SITEMAP_NS}loc")
+            lastmod = entry.findtext(f"{SITEMAP_NS}lastmod")
+            if loc and lastmod:
+                lastmods[_url_path(loc.strip())] = lastmod.strip()
+
+    log.info(f"Read {len(lastmods)} lastmod entries from {len(seen)} sitemap(s)")
+    return lastmods
+
+
+# --- state ---
+
+def card_fingerprint(rec: Dict[str, Any]) -> str:
+    """
+    Hash of the list card; any change on the card suggests the detail page
+    changed too.
+    """
+    canonical = json.dumps(rec, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+def load(path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Read a discovery file locally, falling back to its S3 mirror.
+    """
+    if path.exists():
+        return jsoncodec.load_path(path)
+    try:
+        obj = s3.get_object(Bucket=BUCKET, Key=f"{S3_DISCOVERY_PREFIX}/{path.name}")
+    except Exception as e:
+        log.debug("No discovery file", extra={"path": str(path), "error_class": type(e).__name__})
+        return None
+    return jsoncodec.loads(obj["Body"].read())
+
+def save(path: Path, payload: Dict[str, Any]) -> None:
+    body = atomic_write_json(path, payload)
+    key = f"{S3_DISCOVERY_PREFIX}/{path.name}"
+    try:
+        s3.put_object(Bucket=BUCKET, Key=key, Body=body, ContentType="application/json")
+        metrics.current().incr("bytes_uploaded", len(body))
+    except Exception as e:
+        log.warning("Failed to mirror discovery file to S3", extra={"key": key, "error": str(e)})
+
+
+# --- diff ---
+
+def discover(
+    kind: str,
+    records: List[Dict[str, Any]],
+    previous: Optional[Dict[str, Dict[str, Any]]],
+    lastmods: Dict[str, str],
+    ts: int,
+    pending: Optional[List[str]] = None,
+):
+    """
+    Diff the current list snapshot against the previous state.
+
+    `pending` lists the slugs of a previous worklist that no detail crawl has
+    finished yet; those slugs are carried over so they are not lost.
+    Returns (worklist, new_state).
+    """
+    previous = previous or {}
+    pending_set = set(pending or ())
+    state: Dict[str, Dict[str, Any]] = {}
+    added: List[str] = []
+    changed: List[Dict[str, Any]] = []
+
+    for rec in records:
+        slug = rec.get("slug")
+        if not slug:
+            continue
+        fingerprint = card_fingerprint(rec)
+        lastmod = lastmods.get(_url_path(rec["detail_url"])) if rec.get("detail_url") else None
+        prev = previous.get(slug)
+
+        state[slug] = {
+            "fingerprint": fingerprint,
+            # Keep the old lastmod when the sitemap was unavailable this run
+            "lastmod": lastmod or (prev or {}).get("lastmod"),
+            "first_seen": prev["first_seen"] if prev else ts,
+            "last_seen": ts,
+        }
+
+        if prev is None:
+            added.append(slug)
+            continue
+        reasons = []
+        if prev.get("fingerprint") != fingerprint:
+            reasons.append("card")
+        # ISO 8601 timestamps from the same sitemap compare correctly as strings
+        if lastmod and prev.get("lastmod") and lastmod > prev["lastmod"]:
+            reasons.append("lastmod")
+        if slug in pending_set:
+            reasons.append("pending")
+        if reasons:
+            changed.append({"slug": slug, "reasons": reasons})
+
+    removed = sorted(slug for slug in previous if slug not in state)
+
+    worklist = {
+        "kind": kind,
+        "ts": ts,
+        "first_run": not previous,
+        "total": len(state),
+        "added": sorted(added),
+        "removed": removed,
+        "changed": sorted(changed, key=lambda c: c["slug"]),
+        "unchanged_count": len(state) - len(added) - len(changed),
+        "work_set": sorted(added + [c["slug"] for c in changed]),
+    }
+    return worklist, {"kind": kind, "ts": ts, "slugs": state}
+
+
+def load_worklist(kind: str) -> Dict[str, Any]:
+    """
+    Latest worklist for `kind`, for the detail scrapers' --only-changed.
+    """
+    worklist = load(worklist_path(kind))
+    if worklist is None:
+        raise FileNotFoundError(
+            f"No discovery worklist at {worklist_path(kind)}; "
+            f"run ingestion.landing.sf_ventures_discover_changes first"
+        )
+    return worklist
+
+def mark_worklist_crawled(worklist: Dict[str, Any], crawl_ts: int, done) -> None:
+    """
+    Record that a detail crawl consumed this worklist. Only slugs in `done`
+    count as fetched; the rest stay pending for the next discovery run.
+    """
+    done = set(done)
+    worklist["crawled_ts"] = crawl_ts
+    worklist["pending"] = [slug for slug in worklist["work_set"] if slug not in done]
+    save(worklist_path(worklist["kind"]), worklist)
+
+
+def unfinished_slugs(worklist: Dict[str, Any]) -> List[str]:
+    """
+    Slugs of a worklist that no detail crawl has finished: the whole work set
+    until a crawl consumed it, then whatever that crawl left pending.
+    """
+    if "crawled_ts" not in worklist:
+        return worklist["work_set"]
+    return worklist.get("pending", [])
+
+
+# --- Main ---
+
+def run(use_sitemap: bool = True, sitemap_url: str = SITEMAP_URL):
+    m = metrics.current()
+
+    lastmods: Dict[str, str] = {}
+    if use_sitemap:
+        try:
+            with m.stage("sitemap"):
+                lastmods = fetch_sitemap_lastmods(sitemap_url)
+        except Exception as e:
+            # The list snapshots alone still catch added/removed slugs and card changes
+            m.incr("errors")
+            log.warning("Sitemap unavailable; diffing list snapshots only", extra={"url": sitemap_url, "error": str(e)})
+
+    summary = {}
+    for kind, list_path in LIST_SNAPSHOTS.items():
+        if not list_path.exists():
+            log.warning(f"Missing list snapshot {list_path}; skipping {kind}")
+            continue
+
+        with m.stage("load_input"):
+            records = jsoncodec.load_path(list_path)
+            previous_state = load(state_path(kind))
+            previous_worklist = load(worklist_path(kind))
+
+        if previous_state is None:
+            log.info(f"No previous discovery state for {kind}; treating every slug as added")
+        pending = unfinished_slugs(previous_worklist) if previous_worklist else None
+        if pending:
+            log.info(f"Carrying over {len(pending)} unfinished slug(s) from the previous worklist", extra={"kind": kind})
+
+        with m.stage("diff"):
+            worklist, state = discover(
+                kind,
+                records,
+                previous_state["slugs"] if previous_state else None,
+                lastmods,
+                m.ts,
+                pending=pending,
+            )
+
+        with m.stage("write"):
+            save(worklist_path(kind), worklist)
+            save(state_path(kind), state)
+
+        m.incr("items", worklist["total"])
+        summary[kind] = {k: len(worklist[k]) for k in ("added", "removed", "changed", "work_set")}
+        log.info(
+            f"{kind}: {len(worklist['work_set'])} of {worklist['total']} slugs to fetch",
+            extra=dict(summary[kind], first_run=worklist["first_run"]),
+        )
+
+    m.extra["discovery"] = summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute the detail pages that are new or changed since the last run.")
+    parser.add_argument("--no-sitemap", action="store_true", help="Diff the list snapshots only")
+    parser.add_argument("--sitemap-url", default=SITEMAP_URL)
+    http_cache.add_cache_arguments(parser)
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+    http_cache.configure_from_args(args)
+
+    with metrics.run_report("sf_ventures_discover_changes") as m, profiling.profile_from_args(m, args):
+        run(use_sitemap=not args.no_sitemap, sitemap_url=args.sitemap_url)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Mirror the logo, hero and headshot images that the bronze records link to.
+
+  python -m ingestion.landing.sf_ventures_mirror_assets [--workers adaptive|N] [--no-upload]
+
+Run this after extract_company_pages / extract_person_pages. It collects
+every image URL in companies_enriched.json (logo_url, hero_image_url) and
+people_enriched.json (photo_url, detail_photo_url). Each URL is fetched
+once per run, however many records use it. The fetches run on a thread
+pool sized by an AIMDController, as in the detail crawls.
+
+Assets are content-addressed, named by the SHA-256 of the body:
+
+  data_staging/raw_landing/assets/<sha256><ext>
+  s3://<RAW_BUCKET>/sf_ventures/assets/<sha256[:2]>/<sha256><ext>
+
+So an image served under several URLs is stored and uploaded once. The
+usual case is the list-page and detail-page copies of the same logo.
+
+data_staging/_runs/assets/asset_state.json keeps each URL's ETag,
+Last-Modified and object, plus the objects already uploaded. The state is
+mirrored to S3 and read back from there on a fresh container. The next run
+sends the saved validators as If-None-Match / If-Modified-Since, and a 304
+reuses the existing object without a download. A URL that fails keeps its
+previous mirror.
+
+Finally each bronze record gets an `asset_mirrors` field, {source field:
+mirror URL}. The URL -> object map is written to
+data_staging/bronze/asset_map.json. A mirror URL is ASSET_BASE_URL + the
+object key, and only uploaded objects are linked.
+"""
+
+import argparse
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import boto3
+import requests
+
+from ingestion.landing import http_cache
+from ingestion.landing.adaptive_concurrency import DEFAULT_MAX_WINDOW
+from ingestion.landing.crawl_checkpoint import atomic_write_json
+from ingestion.landing.detail_crawl import fetch_with_feedback, make_controller, parse_workers
+from ingestion.transform.snapshots import BRONZE_DIR, ENTITY_FILES, iter_json_array, write_json_array
+from vceamless import jsoncodec, logs, metrics, profiling
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+ASSETS_DIR = BASE_DIR / "data_staging" / "raw_landing" / "assets"
+STATE_PATH = BASE_DIR / "data_staging" / "_runs" / "assets" / "asset_state.json"
+ASSET_MAP_PATH = BRONZE_DIR / "asset_map.json"
+
+# Entity -> record fields holding image URLs
+ASSET_FIELDS = {
+    "companies": ("logo_url", "hero_image_url"),
+    "people": ("photo_url", "detail_photo_url"),
+}
+
+# Relative image URLs are resolved against the site
+SITE_URL = "https://salesforceventures.com/"
+
+# S3 config
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+S3_ASSET_PREFIX = "sf_ventures/assets"
+S3_STATE_KEY = "sf_ventures/_assets/asset_state.json"
+S3_BRONZE_PREFIX = "sf_ventures/bronze"
+ASSET_BASE_URL = os.getenv("ASSET_BASE_URL", f"https://{BUCKET}.s3.amazonaws.com")
+
+# Objects never change under a content-addressed key
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+s3 = boto3.client("s3")
+log = logs.get_logger("sf_ventures_mirror_assets")
+
+
+# --- URLs ---
+
+def absolute_url(url: Optional[str]) -> Optional[str]:
+    """
+    http(s) URL for an asset reference, or None for data: URIs and the like.
+    """
+    if not url:
+        return None
+    url = urljoin(SITE_URL, url.strip())
+    return url if urlparse(url).scheme in ("http", "https") else None
+
+
+def collect_urls(bronze_dir: Path = BRONZE_DIR) -> Dict[str, int]:
+    """
+    Asset URL -> number of record fields referencing it.
+    """
+    counts: Dict[str, int] = {}
+    for entity, fields in ASSET_FIELDS.items():
+        path = bronze_dir / ENTITY_FILES[entity]
+        if not path.exists():
+            log.warning(f"Missing {path}; no {entity} assets to mirror")
+            continue
+        for rec in iter_json_array(path):
+            for field in fields:
+                url = absolute_url(rec.get(field))
+                if url:
+                    counts[url] = counts.get(url, 0) + 1
+    return counts
+
+
+def mirror_url(key: str) -> str:
+    return f"{ASSET_BASE_URL.rstrip('/')}/{key}"
+
+
+# --- State ---
+
+def load_state() -> Dict[str, Any]:
+    """
+    Read the asset state locally, falling back to its S3 mirror.
+    """
+    if STATE_PATH.exists():
+        return jsoncodec.load_path(STATE_PATH)
+    try:
+        obj = s3.get_object(Bucket=BUCKET, Key=S3_STATE_KEY)
+        return jsoncodec.loads(obj["Body"].read())
+    except Exception as e:
+        log.debug("No asset state", extra={"error_class": type(e).__name__})
+    return {"urls": {}, "objects": {}}
+
+
+def save_state(state: Dict[str, Any], upload: bool = True) -> None:
+    body = atomic_write_json(STATE_PATH, state)
+    if not upload:
+        return
+    try:
+        s3.put_object(Bucket=BUCKET, Key=S3_STATE_KEY, Body=body, ContentType="application/json")
+        metrics.current().incr("bytes_uploaded", len(body))
+    except Exception as e:
+        log.warning("Failed to mirror asset state to S3", extra={"key": S3_STATE_KEY, "error": str(e)})
+
+
+# --- Fetch + store ---
+
+def fetch_asset(url: str, previous: Optional[Dict[str, Any]]) -> Tuple[Optional[bytes], requests.Response]:
+    """
+    Conditional GET. The body is None when the server answers 304.
+    """
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+    resp = http_cache.session().get(url, headers=headers, timeout=20)
+    if resp.status_code == 304 and previous:
+        return None, resp
+    resp.raise_for_status()
+    metrics.current().incr("bytes_fetched", len(resp.content))
+    return resp.content, resp
+
+
+def asset_extension(url: str, content_type: str) -> str:
+    ext = mimetypes.guess_extension(content_type) if content_type else None
+    if not ext:
+        ext = os.path.splitext(urlparse(url).path)[1].lower()
+    return ext if ext and len(ext) <= 6 else ""
+
+
+class AssetStore:
+    """
+    Content-addressed local + S3 storage that writes each object once, even
+    when several fetches produce the same bytes concurrently.
+    """
+
+    def __init__(self, uploaded: Dict[str, str], upload: bool = True) -> None:
+        self.uploaded = dict(uploaded)  # sha256 -> key already in S3
+        self.upload = upload
+        self._claimed = set(self.uploaded)
+        self._lock = threading.Lock()
+
+    def has(self, sha: str, key: str) -> bool:
+        """
+        Whether the object is already stored where this run would put it,
+        so a 304 for it can be trusted.
+        """
+        if self.upload:
+            with self._lock:
+                return self.uploaded.get(sha) == key
+        return (ASSETS_DIR / Path(key).name).exists()
+
+    def _claim(self, sha: str) -> bool:
+        with self._lock:
+            if sha in self._claimed:
+                return False
+            self._claimed.add(sha)
+            return True
+
+    def put(self, sha: str, key: str, body: bytes, content_type: str) -> None:
+        m = metrics.current()
+        path = ASSETS_DIR / Path(key).name
+        if not path.exists():
+            with m.stage("save_local"):
+                ASSETS_DIR.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+                tmp.write_bytes(body)
+                os.replace(tmp, path)
+            m.incr("bytes_written", len(body))
+
+        if not self._claim(sha):
+            m.incr("deduplicated")
+            return
+        if not self.upload:
+            return
+        with m.stage("upload"):
+            s3.put_object(Bucket=BUCKET, Key=key, Body=body, ContentType=content_type,
+                          CacheControl=ASSET_CACHE_CONTROL)
+        m.incr("bytes_uploaded", len(body))
+        with self._lock:
+            self.uploaded[sha] = key
+
+
+def mirror_assets(urls, state: Dict[str, Any], store: AssetStore, controller) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch and store every URL; returns the new per-URL state. URLs that fail
+    keep their previous entry.
+    """
+    m = metrics.current()
+    previous: Dict[str, Dict[str, Any]] = state.get("urls", {})
+    entries: Dict[str, Dict[str, Any]] = {}
+    entries_lock = threading.Lock()
+    progress = logs.Progress(log, "mirror", total=len(urls))
+
+    def mirror_one(url: str) -> None:
+        prev = previous.get(url)
+        # Revalidate only when the object is really there; otherwise refetch the body
+        cached = prev if prev and store.has(prev["sha256"], prev["key"]) else None
+        try:
+            body, resp = fetch_with_feedback(lambda u: fetch_asset(u, cached), url, controller, log, url,
+                                             from_cache=lambda result: getattr(result[1], "from_cache", False))
+            now = int(time.time())
+            if body is None:
+                entry = dict(cached, checked_at=now)
+                m.incr("not_modified")
+                outcome = "not_modified"
+            else:
+                sha = hashlib.sha256(body).hexdigest()
+                content_type = resp.headers.get("Content-Type", "").split(";")[0].strip().lower()
+                content_type = content_type or mimetypes.guess_type(url)[0] or "application/octet-stream"
+                key = f"{S3_ASSET_PREFIX}/{sha[:2]}/{sha}{asset_extension(url, content_type)}"
+                store.put(sha, key, body, content_type)
+                entry = {
+                    "sha256": sha,
+                    "key": key,
+                    "content_type": content_type,
+                    "bytes": len(body),
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "fetched_at": now,
+                    "checked_at": now,
+                }
+                outcome = "fetched"
+            m.incr("items")
+        except Exception as e:
+            m.incr("errors")
+            log.warning("Asset fetch failed", extra={"url": url, "error_class": type(e).__name__, "error": str(e)})
+            entry = prev
+            outcome = "failed"
+        finally:
+            controller.release()
+            m.set_gauge("concurrency_window", controller.limit)
+
+        if entry is not None:
+            with entries_lock:
+                entries[url] = entry
+        progress.update(outcome=outcome)
+
+    pool = ThreadPoolExecutor(max_workers=controller.max_window, thread_name_prefix="assets")
+    try:
+        for url in urls:
+            controller.acquire()
+            m.set_gauge("concurrency_window", controller.limit)
+            pool.submit(mirror_one, url)
+        pool.shutdown(wait=True)
+    except BaseException:
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    progress.finish()
+    return entries
+
+
+# --- Map back into bronze ---
+
+def asset_map(entries: Dict[str, Dict[str, Any]], uploaded: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """
+    URL -> mirrored object, for the URLs whose object is in S3.
+    """
+    return {
+        url: {
+            "sha256": entry["sha256"],
+            "s3_key": entry["key"],
+            "mirror_url": mirror_url(entry["key"]),
+            "content_type": entry["content_type"],
+            "bytes": entry["bytes"],
+        }
+        for url, entry in sorted(entries.items())
+        if uploaded.get(entry["sha256"]) == entry["key"]
+    }
+
+
+def annotate_records(path: Path, fields, mapping: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Rewrite a bronze file with `asset_mirrors` set on every record; returns
+    bytes written.
+    """
+    def annotated() -> Iterator[Dict[str, Any]]:
+        for rec in iter_json_array(path):
+            mirrors = {}
+            for field in fields:
+                mirrored = mapping.get(absolute_url(rec.get(field)) or "")
+                if mirrored:
+                    mirrors[field] = mirrored["mirror_url"]
+            rec["asset_mirrors"] = mirrors
+            yield rec
+
+    _, size = write_json_array(path, annotated())
+    return size
+
+
+def _upload_json(key: str, body: bytes) -> None:
+    try:
+        with metrics.current().stage("upload"):
+            s3.put_object(Bucket=BUCKET, Key=key, Body=body, ContentType="application/json")
+        metrics.current().incr("bytes_uploaded", len(body))
+    except Exception as e:
+        metrics.current().incr("errors")
+        log.warning(f"Failed to upload {key} to S3: {e}")
+
+
+# --- Main ---
+
+def run(bronze_dir: Path = BRONZE_DIR, workers=None, max_workers: int = DEFAULT_MAX_WINDOW, upload: bool = True):
+    m = metrics.current()
+
+    with m.stage("load_input"):
+        references = collect_urls(bronze_dir)
+        state = load_state()
+    urls = sorted(references)
+    log.info(
+        f"Mirroring {len(urls)} distinct asset URLs",
+        extra={"references": sum(references.values()), "known": len(state.get("urls", {}))},
+    )
+
+    store = AssetStore(state.get("objects", {}), upload=upload)
+    controller = make_controller(workers, max_workers)
+    entries = mirror_assets(urls, state, store, controller)
+
+    # Entries for URLs no longer referenced are dropped; their objects stay in S3
+    with m.stage("write"):
+        save_state({"ts": m.ts, "urls": dict(sorted(entries.items())), "objects": store.uploaded}, upload=upload)
+        mapping = asset_map(entries, store.uploaded)
+        map_body = atomic_write_json(bronze_dir / ASSET_MAP_PATH.name, mapping)
+        for entity, fields in ASSET_FIELDS.items():
+            path = bronze_dir / ENTITY_FILES[entity]
+            if path.exists():
+                m.incr("bytes_written", annotate_records(path, fields, mapping))
+
+    if upload:
+        _upload_json(f"{S3_BRONZE_PREFIX}/{ASSET_MAP_PATH.name}", map_body)
+        # The annotated bronze files were streamed to disk, so they are read back
+        for name in [ENTITY_FILES[e] for e in ASSET_FIELDS]:
+            if (bronze_dir / name).exists():
+                _upload_json(f"{S3_BRONZE_PREFIX}/{name}", (bronze_dir / name).read_bytes())
+
+    objects = {entry["sha256"] for entry in entries.values()}
+    concurrency = controller.snapshot()
+    m.set_gauge("concurrency_peak_window", concurrency["peak_window"])
+    m.extra["assets"] = {
+        "urls": len(urls),
+        "mirrored_urls": len(mapping),
+        "distinct_objects": len(objects),
+        "uploaded_objects": len(store.uploaded),
+    }
+    log.info(
+        f"Mirrored {len(mapping)} of {len(urls)} asset URLs as {len(objects)} distinct objects",
+        extra=m.extra["assets"],
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mirror bronze image assets to content-addressed S3 objects.")
+    parser.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+    parser.add_argument("--workers", type=parse_workers, default=None, metavar="adaptive|N",
+                        help="Concurrent fetches: 'adaptive' (AIMD, default) or a fixed count")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WINDOW, metavar="N",
+                        help="Upper bound for the adaptive window")
+    parser.add_argument("--no-upload", action="store_true",
+                        help="Store assets locally only; records get no mirror URLs")
+    http_cache.add_cache_arguments(parser)
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+    http_cache.configure_from_args(args)
+
+    with metrics.run_report("sf_ventures_mirror_assets") as m, profiling.profile_from_args(m, args):
+        run(bronze_dir=args.bronze_dir, workers=args.workers, max_workers=args.max_workers, upload=not args.no_upload)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,54 @@
+import argparse
 import os
-import json
-import time
+from itertools import islice
 from pathlib import Path
 
 import boto3
-import requests
+
+from ingestion.extract import extract_companies_list
+from ingestion.landing import http_cache, sf_ventures_discover_changes as discovery, sharding
+from ingestion.landing.adaptive_concurrency import DEFAULT_MAX_WINDOW
+from ingestion.landing.crawl_checkpoint import CHECKPOINT_EVERY, CrawlCheckpoint
+from ingestion.landing.detail_crawl import crawl_detail_pages, make_controller, parse_workers
+from ingestion import raw_archive
+from ingestion.raw_html import RAW_HTML_CONTENT_TYPE, RawPage, iter_html_chunks, page_from_response
+from ingestion.transform import snapshots
+from vceamless import jsoncodec, logs, metrics, profiling
+
+# ------------------------------------------------------------------------------
+# NOTE ABOUT PRODUCTION INGESTION / RE-RUN CONTROL
+#
+# Currently, we skip scraping a company detail page if a *local* HTML file already
+# exists in `data_staging/raw_landing/company_pages/`. This is the correct behavior
+# for a local exploratory workflow, because:
+#
+#   - It avoids re-hitting the live website unnecessarily.
+#   - It keeps local iterations fast.
+#   - Local state is persistent across runs.
+#
+# HOWEVER, this logic is NOT sufficient for any production ingestion pipeline
+# (e.g., Airflow, ECS, Lambda, or containerized deployments), where:
+#
+#   - Local filesystem state is ephemeral or nonexistent.
+#   - Each task/container run should be idempotent.
+#   - Re-run behavior should be governed by *S3 state*, *metadata tables*, or
+#     *checkpoint markers*, not local files.
+#
+# In a real pipeline, this skip logic would be replaced with something like:
+#
+#   - Check whether `s3://<bucket>/sf_ventures/raw_landing/company_pages/<slug>_<ts>.html`
+#     already exists (HEAD request / list / or S3 Select).
+#
+#   - Or maintain a `scrape_log` table in DynamoDB, PostgreSQL, or Snowflake that
+#     records which slugs have been scraped, with timestamps.
+#
+#   - Or use a "run timestamp" pattern: always write new objects to
+#     `company_pages/<slug>_<ingest_run_ts>.html`, and point downstream logic to
+#     the latest run via metadata.
+#
+# This file keeps the local-skip logic intentionally simple for the demo phase.
+# DO NOT reuse this skip condition as-is in any orchestrated production environment.
+# ------------------------------------------------------------------------------
 
 # --- Config ---
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -19,115 +63,231 @@ COMPANY_PAGES_DIR = BASE_DIR / "data_staging" / "raw_landing" / "company_pages"
 BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
 S3_BASE_PREFIX = "sf_ventures/raw_landing/company_pages"
 
-# Control how many companies to fetch for testing, -1 for all
+# Default for --limit: how many companies to fetch, -1 for all
 MAX_COMPANIES = -1
 
 s3 = boto3.client("s3")
+log = logs.get_logger("sf_ventures_scrape_company_pages")
 
 # --- Helpers ---
 
-def fetch_html(url: str) -> str:
-    resp = requests.get(url, timeout=20)
+def fetch_html(url: str) -> RawPage:
+    resp = http_cache.session().get(url, timeout=20)
     resp.raise_for_status()
-    return resp.text
+    metrics.current().incr("bytes_fetched", len(resp.content))
+    return page_from_response(resp)
 
-def save_local(slug: str, html: str) -> Path:
+def save_local(slug: str, page: RawPage) -> Path:
     COMPANY_PAGES_DIR.mkdir(parents=True, exist_ok=True)
     path = COMPANY_PAGES_DIR / f"{slug}.html"
-    path.write_text(html, encoding="utf-8")
+    path.write_bytes(page.body)
+    metrics.current().incr("bytes_written", len(page.body))
     return path
 
-def upload_s3(slug: str, html: str, ts: int):
+def upload_s3(slug: str, page: RawPage, ts: int):
     key = f"{S3_BASE_PREFIX}/{slug}_{ts}.html"
     s3.put_object(
         Bucket=BUCKET,
         Key=key,
-        Body=html.encode("utf-8"),
-        ContentType="text/html",
+        Body=page.body,
+        ContentType=RAW_HTML_CONTENT_TYPE,
+        Metadata=page.s3_metadata,
     )
+    metrics.current().incr("bytes_uploaded", len(page.body))
     return key
 
 # --- Main ---
 
-def main():
-    if not BRONZE_COMPANIES_PATH.exists():
-        raise FileNotFoundError(f"Missing bronze companies JSON at {BRONZE_COMPANIES_PATH}")
-
-    with BRONZE_COMPANIES_PATH.open("r", encoding="utf-8") as f:
-        companies = json.load(f)
-
-    print(f"Loaded {len(companies)} companies from {BRONZE_COMPANIES_PATH}")
-
-    to_process = companies
-    if MAX_COMPANIES > 0:
-        to_process = companies[:MAX_COMPANIES]
-
-    print(f"Fetching detail pages for {len(to_process)} companies (MAX_COMPANIES={MAX_COMPANIES})")
-
-    ts = int(time.time())
-    count = 0
-
-    for rec in to_process:
-        slug = rec.get("slug")
-        url = rec.get("detail_url")
-
-        if not slug or not url:
-            print(f"Skipping record with missing slug or detail_url: {rec}")
-            continue
-
-        # If local file already exists, skip to avoid re-hitting the site
-        # ------------------------------------------------------------------------------
-        # NOTE ABOUT PRODUCTION INGESTION / RE-RUN CONTROL
-        #
-        # Currently, we skip scraping a company detail page if a *local* HTML file already
-        # exists in `data_staging/raw_landing/company_pages/`. This is the correct behavior
-        # for a local exploratory workflow, because:
-        #
-        #   - It avoids re-hitting the live website unnecessarily.
-        #   - It keeps local iterations fast.
-        #   - Local state is persistent across runs.
-        #
-        # HOWEVER, this logic is NOT sufficient for any production ingestion pipeline
-        # (e.g., Airflow, ECS, Lambda, or containerized deployments), where:
-        #
-        #   - Local filesystem state is ephemeral or nonexistent.
-        #   - Each task/container run should be idempotent.
-        #   - Re-run behavior should be governed by *S3 state*, *metadata tables*, or
-        #     *checkpoint markers*, not local files.
-        #
-        # In a real pipeline, this skip logic would be replaced with something like:
-        #
-        #   - Check whether `s3://<bucket>/sf_ventures/raw_landing/company_pages/<slug>_<ts>.html`
-        #     already exists (HEAD request / list / or S3 Select).
-        #
-        #   - Or maintain a `scrape_log` table in DynamoDB, PostgreSQL, or Snowflake that
-        #     records which slugs have been scraped, with timestamps.
-        #
-        #   - Or use a "run timestamp" pattern: always write new objects to
-        #     `company_pages/<slug>_<ingest_run_ts>.html`, and point downstream logic to
-        #     the latest run via metadata.
-        #
-        # This file keeps the local-skip logic intentionally simple for the demo phase.
-        # DO NOT reuse this skip condition as-is in any orchestrated production environment.
-        # ------------------------------------------------------------------------------
-
-        local_path = COMPANY_PAGES_DIR / f"{slug}.html"
-        if local_path.exists():
-            print(f"[SKIP] Local file already exists for slug={slug}: {local_path}")
-            continue
-
-        print(f"[FETCH] slug={slug} url={url}")
-        html = fetch_html(url)
-
-        saved_path = save_local(slug, html)
-        s3_key = upload_s3(slug, html, ts)
-
-        print(f"  -> saved local: {saved_path}")
-        print(f"  -> uploaded s3://{BUCKET}/{s3_key}")
-
-        count += 1
-
-    print(f"\nDone. Processed {count} company detail pages.")
+def run(
+    resume: bool = False,
+    only_changed: bool = False,
+    archive: bool = False,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+    workers=None,
+    max_workers: int = DEFAULT_MAX_WINDOW,
+    shards: int = 0,
+    worker_id: str = "",
+    run_ts=None,
+    lease_ttl: float = sharding.DEFAULT_LEASE_TTL_S,
+    lease_store: str = "s3",
+    limit: int = MAX_COMPANIES,
+    from_list_page: bool = False,
+):
+    m = metrics.current()
+
+    listed = None
+    if from_list_page:
+        # Cards reach the fetch queue as the list page is parsed instead of
+        # after the extract step has written the whole bronze list. The
+        # bronze list is written alongside and replaces the old file once
+        # the page has been read to the end.
+        html_path = Path(extract_companies_list.HTML_PATH)
+        if not html_path.exists():
+            raise FileNotFoundError(f"Missing raw companies list page at {html_path}")
+        m.incr("bytes_read", html_path.stat().st_size)
+        listed = snapshots.tee_json_array(BRONZE_COMPANIES_PATH, extract_companies_list.iter_companies_list(iter_html_chunks(html_path)))
+        to_process = listed
+        log.info(f"Streaming companies from {html_path} (limit={limit})")
+    else:
+        if not BRONZE_COMPANIES_PATH.exists():
+            raise FileNotFoundError(f"Missing bronze companies JSON at {BRONZE_COMPANIES_PATH}")
+
+        with m.stage("load_input"):
+            companies = jsoncodec.load_path(BRONZE_COMPANIES_PATH)
+
+        log.info(f"Loaded {len(companies)} companies from {BRONZE_COMPANIES_PATH}")
+
+        to_process = companies
+        if limit > 0:
+            to_process = companies[:limit]
+
+        log.info(f"Fetching detail pages for {len(to_process)} companies (limit={limit})")
+
+    worklist = None
+    refetch = None
+    if only_changed:
+        worklist = discovery.load_worklist("company_pages")
+        refetch = set(worklist["work_set"])
+        if listed is None:
+            to_process = [rec for rec in to_process if rec.get("slug") in refetch]
+            log.info(
+                f"--only-changed: {len(to_process)} companies from worklist ts={worklist['ts']}",
+                extra={"added": len(worklist["added"]), "changed": len(worklist["changed"])},
+            )
+        else:
+            to_process = (rec for rec in to_process if rec.get("slug") in refetch)
+            log.info(
+                f"--only-changed: up to {len(refetch)} companies from worklist ts={worklist['ts']}",
+                extra={"added": len(worklist["added"]), "changed": len(worklist["changed"])},
+            )
+
+    if listed is not None and limit > 0:
+        to_process = islice(to_process, limit)
+
+    controller = make_controller(workers, max_workers)
+
+    def crawl(records, checkpoint):
+        return crawl_detail_pages(
+            records,
+            pages_dir=COMPANY_PAGES_DIR,
+            fetch_html=fetch_html,
+            save_local=save_local,
+            upload_s3=upload_s3,
+            checkpoint=checkpoint,
+            log=log,
+            bucket=BUCKET,
+            total=len(records) if listed is None else None,
+            controller=controller,
+            refetch=refetch,
+        )
+
+    if shards:
+        count = sharding.crawl_sharded(
+            "company_pages",
+            to_process,
+            crawl,
+            shards=shards,
+            worker_id=worker_id,
+            run_ts=run_ts,
+            s3_prefix=S3_BASE_PREFIX,
+            lease_ttl=lease_ttl,
+            store=sharding.make_store(lease_store),
+            checkpoint_every=checkpoint_every,
+        )
+    else:
+        checkpoint = CrawlCheckpoint.start("company_pages", m.ts, resume=resume, every=checkpoint_every)
+        if checkpoint.resumed:
+            log.info(
+                f"Resuming run ts={checkpoint.ts}: {len(checkpoint.done)} done, "
+                f"{len(checkpoint.dead_letter)} dead-lettered"
+            )
+        count = crawl(to_process, checkpoint)
+
+        if listed is not None:
+            # --limit / --only-changed stop short of the last card; the
+            # bronze list still gets every company on the page.
+            with m.stage("extract"):
+                for _ in listed:
+                    pass
+            log.info(f"Wrote bronze companies list to {BRONZE_COMPANIES_PATH}")
+
+        if archive:
+            # One object per run for extract/backfill instead of one per page.
+            # Every landed page, not just this run's slugs: with --only-changed
+            # or --limit the extractors would otherwise lose the rest.
+            path = raw_archive.pack_pages("company_pages", checkpoint.ts, COMPANY_PAGES_DIR)
+            try:
+                raw_archive.upload_archive(path, s3=s3)
+            except Exception as e:
+                m.incr("errors")
+                log.warning("Failed to upload raw archive", extra={"path": str(path), "error": str(e)})
+
+        if worklist is not None:
+            discovery.mark_worklist_crawled(worklist, m.ts, checkpoint.done)
+
+    log.info(f"Done. Processed {count} company detail pages.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Land company detail pages locally and in S3.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last checkpointed run and retry its dead-lettered slugs")
+    parser.add_argument("--only-changed", action="store_true",
+                        help="Fetch only the added/changed slugs from the latest discovery worklist "
+                             "(with --merge: record which of them the shards finished)")
+    parser.add_argument("--archive", action="store_true",
+                        help="Also pack every landed page into one raw archive and upload it")
+    parser.add_argument("--limit", type=int, default=MAX_COMPANIES, metavar="N",
+                        help="Fetch only the first N companies (-1 for all)")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, metavar="N",
+                        help="Persist crawl progress every N slugs")
+    parser.add_argument("--workers", type=parse_workers, default=None, metavar="adaptive|N",
+                        help="Concurrent fetches: 'adaptive' (AIMD, default) or a fixed count")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WINDOW, metavar="N",
+                        help="Upper bound for the adaptive window")
+    parser.add_argument("--from-list-page", action="store_true",
+                        help="Read companies straight from the raw list page and start fetching as the cards "
+                             "are parsed, writing the bronze list alongside (replaces running extract_companies_list first)")
+    sharding.add_shard_arguments(parser)
+    http_cache.add_cache_arguments(parser)
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    sharding.validate_shard_args(parser, args)
+    if args.archive and args.shards:
+        parser.error("--archive packs a single worker's pages; pack after --merge with ingestion.raw_archive instead")
+    if args.from_list_page and (args.shards or args.merge):
+        parser.error("--from-list-page streams into a single crawl; run the list extract first when sharding")
+    logs.configure_from_args(args)
+    http_cache.configure_from_args(args)
+
+    script = "sf_ventures_scrape_company_pages"
+    if args.merge:
+        with metrics.run_report(f"{script}_merge", ts=args.run_ts):
+            merged = sharding.merge_manifests("company_pages", args.run_ts, args.shards, store=sharding.make_store(args.lease_store))
+            if args.only_changed:
+                # Only the merge sees every shard's done slugs
+                discovery.mark_worklist_crawled(discovery.load_worklist("company_pages"), args.run_ts, merged["done"])
+        return
+    if args.shards:
+        # One report per worker, so workers started in the same second do not collide
+        script = f"{script}_{args.worker_id}"
+
+    with metrics.run_report(script) as m, profiling.profile_from_args(m, args):
+        run(
+            resume=args.resume,
+            only_changed=args.only_changed,
+            archive=args.archive,
+            checkpoint_every=args.checkpoint_every,
+            workers=args.workers,
+            max_workers=args.max_workers,
+            shards=args.shards,
+            worker_id=args.worker_id,
+            run_ts=args.run_ts,
+            lease_ttl=args.lease_ttl,
+            lease_store=args.lease_store,
+            limit=args.limit,
+            from_list_page=args.from_list_page,
+        )
 
 if __name__ == "__main__":
     main()
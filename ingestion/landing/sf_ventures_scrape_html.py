@@ -1,44 +1,70 @@
+import argparse
 import os
-import time
 from pathlib import Path
 
 import boto3
-import requests
+
+from ingestion.landing import http_cache
+from ingestion.raw_html import RAW_HTML_CONTENT_TYPE, RawPage, page_from_response
+from vceamless import logs, metrics, profiling
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 
 BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
 s3 = boto3.client("s3")
+log = logs.get_logger("sf_ventures_scrape_html")
 
 COMPANIES_URL = "https://salesforceventures.com/companies/"
 PEOPLE_URL = "https://salesforceventures.com/people/"
 
-def fetch_html(url: str) -> str:
-    resp = requests.get(url, timeout=20)
+def fetch_html(url: str) -> RawPage:
+    resp = http_cache.session().get(url, timeout=20)
     resp.raise_for_status()
-    return resp.text
+    metrics.current().incr("bytes_fetched", len(resp.content))
+    return page_from_response(resp)
 
-def upload_raw_html(key: str, html: str):
+def upload_raw_html(key: str, page: RawPage):
     s3.put_object(
         Bucket=BUCKET,
         Key=key,
-        Body=html.encode("utf-8"),
-        ContentType="text/html"
+        Body=page.body,
+        ContentType=RAW_HTML_CONTENT_TYPE,
+        Metadata=page.s3_metadata,
     )
-    print(f"Uploaded: s3://{BUCKET}/{key}")
+    metrics.current().incr("bytes_uploaded", len(page.body))
+    log.info(f"Uploaded: s3://{BUCKET}/{key}")
 
-def main():
-    ts = int(time.time())
+def run():
+    m = metrics.current()
+    ts = m.ts
 
     # Scrape companies page
-    companies_html = fetch_html(COMPANIES_URL)
+    with m.stage("fetch"):
+        companies_page = fetch_html(COMPANIES_URL)
     companies_key = f"sf_ventures/raw_landing/companies_{ts}.html"
-    upload_raw_html(companies_key, companies_html)
+    with m.stage("upload"):
+        upload_raw_html(companies_key, companies_page)
+    m.incr("items")
 
     # Scrape people page
-    people_html = fetch_html(PEOPLE_URL)
+    with m.stage("fetch"):
+        people_page = fetch_html(PEOPLE_URL)
     people_key = f"sf_ventures/raw_landing/people_{ts}.html"
-    upload_raw_html(people_key, people_html)
+    with m.stage("upload"):
+        upload_raw_html(people_key, people_page)
+    m.incr("items")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Land the companies and people list pages in S3.")
+    http_cache.add_cache_arguments(parser)
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+    http_cache.configure_from_args(args)
+
+    with metrics.run_report("sf_ventures_scrape_html") as m, profiling.profile_from_args(m, args):
+        run()
 
 if __name__ == "__main__":
     main()
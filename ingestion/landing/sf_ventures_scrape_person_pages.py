@@ -1,10 +1,19 @@
+import argparse
 import os
-import json
-import time
+from itertools import islice
 from pathlib import Path
 
 import boto3
-import requests
+
+from ingestion.extract import extract_people_list
+from ingestion.landing import http_cache, sf_ventures_discover_changes as discovery, sharding
+from ingestion.landing.adaptive_concurrency import DEFAULT_MAX_WINDOW
+from ingestion.landing.crawl_checkpoint import CHECKPOINT_EVERY, CrawlCheckpoint
+from ingestion.landing.detail_crawl import crawl_detail_pages, make_controller, parse_workers
+from ingestion import raw_archive
+from ingestion.raw_html import RAW_HTML_CONTENT_TYPE, RawPage, iter_html_chunks, page_from_response
+from ingestion.transform import snapshots
+from vceamless import jsoncodec, logs, metrics, profiling
 
 # ------------------------------------------------------------------------------
 # NOTE ABOUT PRODUCTION INGESTION / RE-RUN CONTROL
@@ -36,79 +45,232 @@ PERSON_PAGES_DIR = BASE_DIR / "data_staging" / "raw_landing" / "person_pages"
 BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
 S3_BASE_PREFIX = "sf_ventures/raw_landing/person_pages"
 
-# Control how many people to fetch for testing, -1 for all
+# Default for --limit: how many people to fetch, -1 for all
 MAX_PEOPLE = -1
 
 s3 = boto3.client("s3")
+log = logs.get_logger("sf_ventures_scrape_person_pages")
 
 
-def fetch_html(url: str) -> str:
-    resp = requests.get(url, timeout=20)
+def fetch_html(url: str) -> RawPage:
+    resp = http_cache.session().get(url, timeout=20)
     resp.raise_for_status()
-    return resp.text
+    metrics.current().incr("bytes_fetched", len(resp.content))
+    return page_from_response(resp)
 
 
-def save_local(slug: str, html: str) -> Path:
+def save_local(slug: str, page: RawPage) -> Path:
     PERSON_PAGES_DIR.mkdir(parents=True, exist_ok=True)
     path = PERSON_PAGES_DIR / f"{slug}.html"
-    path.write_text(html, encoding="utf-8")
+    path.write_bytes(page.body)
+    metrics.current().incr("bytes_written", len(page.body))
     return path
 
 
-def upload_s3(slug: str, html: str, ts: int) -> str:
+def upload_s3(slug: str, page: RawPage, ts: int) -> str:
     key = f"{S3_BASE_PREFIX}/{slug}_{ts}.html"
     s3.put_object(
         Bucket=BUCKET,
         Key=key,
-        Body=html.encode("utf-8"),
-        ContentType="text/html",
+        Body=page.body,
+        ContentType=RAW_HTML_CONTENT_TYPE,
+        Metadata=page.s3_metadata,
     )
+    metrics.current().incr("bytes_uploaded", len(page.body))
     return key
 
 
-def main():
-    if not BRONZE_PEOPLE_PATH.exists():
-        raise FileNotFoundError(f"Missing bronze people JSON at {BRONZE_PEOPLE_PATH}")
+def run(
+    resume: bool = False,
+    only_changed: bool = False,
+    archive: bool = False,
+    checkpoint_every: int = CHECKPOINT_EVERY,
+    workers=None,
+    max_workers: int = DEFAULT_MAX_WINDOW,
+    shards: int = 0,
+    worker_id: str = "",
+    run_ts=None,
+    lease_ttl: float = sharding.DEFAULT_LEASE_TTL_S,
+    lease_store: str = "s3",
+    limit: int = MAX_PEOPLE,
+    from_list_page: bool = False,
+):
+    m = metrics.current()
+
+    listed = None
+    if from_list_page:
+        # Cards reach the fetch queue as the list page is parsed instead of
+        # after the extract step has written the whole bronze list. The
+        # bronze list is written alongside and replaces the old file once
+        # the page has been read to the end.
+        html_path = Path(extract_people_list.HTML_PATH)
+        if not html_path.exists():
+            raise FileNotFoundError(f"Missing raw people list page at {html_path}")
+        m.incr("bytes_read", html_path.stat().st_size)
+        listed = snapshots.tee_json_array(BRONZE_PEOPLE_PATH, extract_people_list.iter_people_list(iter_html_chunks(html_path)))
+        to_process = listed
+        log.info(f"Streaming people from {html_path} (limit={limit})")
+    else:
+        if not BRONZE_PEOPLE_PATH.exists():
+            raise FileNotFoundError(f"Missing bronze people JSON at {BRONZE_PEOPLE_PATH}")
+
+        with m.stage("load_input"):
+            people = jsoncodec.load_path(BRONZE_PEOPLE_PATH)
+
+        log.info(f"Loaded {len(people)} people from {BRONZE_PEOPLE_PATH}")
+
+        to_process = people
+        if limit > 0:
+            to_process = people[:limit]
+
+        log.info(f"Fetching detail pages for {len(to_process)} people (limit={limit})")
 
-    with BRONZE_PEOPLE_PATH.open("r", encoding="utf-8") as f:
-        people = json.load(f)
+    worklist = None
+    refetch = None
+    if only_changed:
+        worklist = discovery.load_worklist("person_pages")
+        refetch = set(worklist["work_set"])
+        if listed is None:
+            to_process = [rec for rec in to_process if rec.get("slug") in refetch]
+            log.info(
+                f"--only-changed: {len(to_process)} people from worklist ts={worklist['ts']}",
+                extra={"added": len(worklist["added"]), "changed": len(worklist["changed"])},
+            )
+        else:
+            to_process = (rec for rec in to_process if rec.get("slug") in refetch)
+            log.info(
+                f"--only-changed: up to {len(refetch)} people from worklist ts={worklist['ts']}",
+                extra={"added": len(worklist["added"]), "changed": len(worklist["changed"])},
+            )
 
-    print(f"Loaded {len(people)} people from {BRONZE_PEOPLE_PATH}")
+    if listed is not None and limit > 0:
+        to_process = islice(to_process, limit)
 
-    to_process = people
-    if MAX_PEOPLE > 0:
-        to_process = people[:MAX_PEOPLE]
+    controller = make_controller(workers, max_workers)
 
-    print(f"Fetching detail pages for {len(to_process)} people (MAX_PEOPLE={MAX_PEOPLE})")
+    def crawl(records, checkpoint):
+        return crawl_detail_pages(
+            records,
+            pages_dir=PERSON_PAGES_DIR,
+            fetch_html=fetch_html,
+            save_local=save_local,
+            upload_s3=upload_s3,
+            checkpoint=checkpoint,
+            log=log,
+            bucket=BUCKET,
+            total=len(records) if listed is None else None,
+            controller=controller,
+            refetch=refetch,
+        )
 
-    ts = int(time.time())
-    count = 0
+    if shards:
+        count = sharding.crawl_sharded(
+            "person_pages",
+            to_process,
+            crawl,
+            shards=shards,
+            worker_id=worker_id,
+            run_ts=run_ts,
+            s3_prefix=S3_BASE_PREFIX,
+            lease_ttl=lease_ttl,
+            store=sharding.make_store(lease_store),
+            checkpoint_every=checkpoint_every,
+        )
+    else:
+        checkpoint = CrawlCheckpoint.start("person_pages", m.ts, resume=resume, every=checkpoint_every)
+        if checkpoint.resumed:
+            log.info(
+                f"Resuming run ts={checkpoint.ts}: {len(checkpoint.done)} done, "
+                f"{len(checkpoint.dead_letter)} dead-lettered"
+            )
+        count = crawl(to_process, checkpoint)
 
-    for rec in to_process:
-        slug = rec.get("slug")
-        url = rec.get("detail_url")
+        if listed is not None:
+            # --limit / --only-changed stop short of the last card; the
+            # bronze list still gets every person on the page.
+            with m.stage("extract"):
+                for _ in listed:
+                    pass
+            log.info(f"Wrote bronze people list to {BRONZE_PEOPLE_PATH}")
 
-        if not slug or not url:
-            print(f"[SKIP] Missing slug or detail_url in record: {rec}")
-            continue
+        if archive:
+            # One object per run for extract/backfill instead of one per page.
+            # Every landed page, not just this run's slugs: with --only-changed
+            # or --limit the extractors would otherwise lose the rest.
+            path = raw_archive.pack_pages("person_pages", checkpoint.ts, PERSON_PAGES_DIR)
+            try:
+                raw_archive.upload_archive(path, s3=s3)
+            except Exception as e:
+                m.incr("errors")
+                log.warning("Failed to upload raw archive", extra={"path": str(path), "error": str(e)})
 
-        local_path = PERSON_PAGES_DIR / f"{slug}.html"
-        if local_path.exists():
-            print(f"[SKIP] Local file already exists for slug={slug}: {local_path}")
-            continue
+        if worklist is not None:
+            discovery.mark_worklist_crawled(worklist, m.ts, checkpoint.done)
 
-        print(f"[FETCH] slug={slug} url={url}")
-        html = fetch_html(url)
+    log.info(f"Done. Processed {count} person detail pages.")
 
-        saved_path = save_local(slug, html)
-        s3_key = upload_s3(slug, html, ts)
 
-        print(f"  -> saved local: {saved_path}")
-        print(f"  -> uploaded s3://{BUCKET}/{s3_key}")
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Land person detail pages locally and in S3.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last checkpointed run and retry its dead-lettered slugs")
+    parser.add_argument("--only-changed", action="store_true",
+                        help="Fetch only the added/changed slugs from the latest discovery worklist "
+                             "(with --merge: record which of them the shards finished)")
+    parser.add_argument("--archive", action="store_true",
+                        help="Also pack every landed page into one raw archive and upload it")
+    parser.add_argument("--limit", type=int, default=MAX_PEOPLE, metavar="N",
+                        help="Fetch only the first N people (-1 for all)")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, metavar="N",
+                        help="Persist crawl progress every N slugs")
+    parser.add_argument("--workers", type=parse_workers, default=None, metavar="adaptive|N",
+                        help="Concurrent fetches: 'adaptive' (AIMD, default) or a fixed count")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WINDOW, metavar="N",
+                        help="Upper bound for the adaptive window")
+    parser.add_argument("--from-list-page", action="store_true",
+                        help="Read people straight from the raw list page and start fetching as the cards "
+                             "are parsed, writing the bronze list alongside (replaces running extract_people_list first)")
+    sharding.add_shard_arguments(parser)
+    http_cache.add_cache_arguments(parser)
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    sharding.validate_shard_args(parser, args)
+    if args.archive and args.shards:
+        parser.error("--archive packs a single worker's pages; pack after --merge with ingestion.raw_archive instead")
+    if args.from_list_page and (args.shards or args.merge):
+        parser.error("--from-list-page streams into a single crawl; run the list extract first when sharding")
+    logs.configure_from_args(args)
+    http_cache.configure_from_args(args)
 
-        count += 1
+    script = "sf_ventures_scrape_person_pages"
+    if args.merge:
+        with metrics.run_report(f"{script}_merge", ts=args.run_ts):
+            merged = sharding.merge_manifests("person_pages", args.run_ts, args.shards, store=sharding.make_store(args.lease_store))
+            if args.only_changed:
+                # Only the merge sees every shard's done slugs
+                discovery.mark_worklist_crawled(discovery.load_worklist("person_pages"), args.run_ts, merged["done"])
+        return
+    if args.shards:
+        # One report per worker, so workers started in the same second do not collide
+        script = f"{script}_{args.worker_id}"
 
-    print(f"\nDone. Processed {count} person detail pages.")
+    with metrics.run_report(script) as m, profiling.profile_from_args(m, args):
+        run(
+            resume=args.resume,
+            only_changed=args.only_changed,
+            archive=args.archive,
+            checkpoint_every=args.checkpoint_every,
+            workers=args.workers,
+            max_workers=args.max_workers,
+            shards=args.shards,
+            worker_id=args.worker_id,
+            run_ts=args.run_ts,
+            lease_ttl=args.lease_ttl,
+            lease_store=args.lease_store,
+            limit=args.limit,
+            from_list_page=args.from_list_page,
+        )
 
 
 if __name__ == "__main__":
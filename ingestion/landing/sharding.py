@@ -0,0 +1,487 @@
+"""
+Sharded detail-page crawls spread across several workers (containers).
+
+Slugs are partitioned into N shards by a stable hash, so every worker computes
+the same partition from the same list snapshot. Workers coordinate only
+through lease objects in an object store:
+
+  <prefix>/<kind>/<run_ts>/leases/shard-0007.json     who holds shard 7, until when
+  <prefix>/<kind>/<run_ts>/manifests/shard-0007.json  what shard 7 produced
+  <prefix>/<kind>/<run_ts>/manifest.json             merged manifest (--merge)
+
+A worker claims a shard by creating its lease with a conditional write (S3
+`If-None-Match: *`), keeps it alive with compare-and-swap renewals (`If-Match:
+<etag>`), and marks it done after writing the shard manifest. A lease whose
+holder stopped renewing expires and is reclaimed by another worker with the
+same compare-and-swap, so a crashed container only costs one lease TTL.
+
+All workers of a run share `--run-ts`, which is also the timestamp in the S3
+keys of the landed pages, so a reclaimed shard overwrites rather than
+duplicates what the crashed worker already uploaded.
+
+LocalObjectStore is a stand-in for S3 (O_EXCL creates, flock-guarded CAS) for
+local runs and for several workers on one machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fcntl
+import hashlib
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ingestion.landing.crawl_checkpoint import STATE_DIR, CrawlCheckpoint, atomic_write_json
+from vceamless import jsoncodec, logs, metrics
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+LOCAL_STORE_DIR = BASE_DIR / "data_staging" / "_crawl"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+S3_CRAWL_PREFIX = "sf_ventures/_crawl"
+
+DEFAULT_LEASE_TTL_S = 300
+
+log = logs.get_logger("sharding")
+
+
+def shard_of(slug: str, shards: int) -> int:
+    """
+    Stable shard for a slug (independent of PYTHONHASHSEED and list order).
+    """
+    digest = hashlib.sha1(slug.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shards
+
+
+def partition(records: Iterable[Dict[str, Any]], shards: int) -> List[List[Dict[str, Any]]]:
+    parts: List[List[Dict[str, Any]]] = [[] for _ in range(shards)]
+    for rec in records:
+        slug = rec.get("slug")
+        # Records without a slug go to shard 0 so they still get reported as invalid once
+        parts[shard_of(slug, shards) if slug else 0].append(rec)
+    return parts
+
+
+# --- object stores ---
+
+
+class S3ObjectStore:
+    """
+    Lease/manifest storage in S3 using conditional writes.
+    """
+
+    def __init__(self, bucket: str = BUCKET, prefix: str = S3_CRAWL_PREFIX) -> None:
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.s3 = boto3.client("s3")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}"
+
+    @staticmethod
+    def _precondition_failed(e: Exception) -> bool:
+        code = getattr(e, "response", {}).get("Error", {}).get("Code")
+        return code in ("PreconditionFailed", "ConditionalRequestConflict", "412", "409")
+
+    def read(self, key: str) -> Optional[Tuple[bytes, str]]:
+        try:
+            resp = self.s3.get_object(Bucket=self.bucket, Key=self._key(key))
+        except self.s3.exceptions.NoSuchKey:
+            return None
+        return resp["Body"].read(), resp["ETag"]
+
+    def try_create(self, key: str, body: bytes) -> Optional[str]:
+        try:
+            resp = self.s3.put_object(
+                Bucket=self.bucket, Key=self._key(key), Body=body,
+                ContentType="application/json", IfNoneMatch="*",
+            )
+        except Exception as e:
+            if self._precondition_failed(e):
+                return None
+            raise
+        return resp["ETag"]
+
+    def try_replace(self, key: str, body: bytes, etag: str) -> Optional[str]:
+        try:
+            resp = self.s3.put_object(
+                Bucket=self.bucket, Key=self._key(key), Body=body,
+                ContentType="application/json", IfMatch=etag,
+            )
+        except Exception as e:
+            if self._precondition_failed(e):
+                return None
+            raise
+        return resp["ETag"]
+
+    def put(self, key: str, body: bytes) -> None:
+        self.s3.put_object(Bucket=self.bucket, Key=self._key(key), Body=body, ContentType="application/json")
+
+    def uri(self, key: str) -> str:
+        return f"s3://{self.bucket}/{self._key(key)}"
+
+
+class LocalObjectStore:
+    """
+    Filesystem stand-in for S3ObjectStore with the same conditional-write
+    semantics; ETags are content hashes.
+    """
+
+    def __init__(self, root: Path = LOCAL_STORE_DIR) -> None:
+        self.root = root
+
+    def _path(self, key: str) -> Path:
+        return self.root / key
+
+    @staticmethod
+    def _etag(body: bytes) -> str:
+        return hashlib.md5(body).hexdigest()
+
+    def read(self, key: str) -> Optional[Tuple[bytes, str]]:
+        path = self._path(key)
+        try:
+            body = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        return body, self._etag(body)
+
+    def try_create(self, key: str, body: bytes) -> Optional[str]:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._locked(path):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                return None
+            with os.fdopen(fd, "wb") as f:
+                f.write(body)
+        return self._etag(body)
+
+    def try_replace(self, key: str, body: bytes, etag: str) -> Optional[str]:
+        path = self._path(key)
+        with self._locked(path):
+            current = self.read(key)
+            if current is None or current[1] != etag:
+                return None
+            self._write(path, body)
+        return self._etag(body)
+
+    def put(self, key: str, body: bytes) -> None:
+        path = self._path(key)
+        with self._locked(path):
+            self._write(path, body)
+
+    def uri(self, key: str) -> str:
+        return str(self._path(key))
+
+    @staticmethod
+    def _write(path: Path, body: bytes) -> None:
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(body)
+        os.replace(tmp, path)
+
+    class _locked:
+        def __init__(self, path: Path) -> None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.lock_path = path.with_name(f".{path.name}.lock")
+
+        def __enter__(self) -> None:
+            self.fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+        def __exit__(self, *exc: Any) -> None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+
+
+def make_store(kind: str):
+    return LocalObjectStore() if kind == "local" else S3ObjectStore()
+
+
+# --- leases ---
+
+
+class Lease:
+    """
+    One held shard lease, renewed from a background thread.
+    """
+
+    def __init__(self, store, key: str, payload: Dict[str, Any], etag: str, ttl_s: float) -> None:
+        self.store = store
+        self.key = key
+        self.payload = payload
+        self.etag = etag
+        self.ttl_s = ttl_s
+        self.lost = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{key}", daemon=True)
+
+    def start(self) -> "Lease":
+        self._thread.start()
+        return self
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.ttl_s / 3):
+            try:
+                renewed = self._swap(status="held", expires_at=time.time() + self.ttl_s)
+            except Exception as e:
+                # Transient store error: retry on the next beat while the lease
+                # has not expired yet
+                log.warning("Lease renewal failed", extra={"lease": self.key, "error": str(e)})
+                if time.time() < self.payload["expires_at"]:
+                    continue
+                with self._lock:
+                    self.lost = True
+                renewed = False
+            if not renewed:
+                log.warning("Lost shard lease", extra={"lease": self.key})
+                return
+
+    def _swap(self, **changes: Any) -> bool:
+        with self._lock:
+            if self.lost:
+                return False
+            payload = dict(self.payload, **changes)
+            etag = self.store.try_replace(self.key, _encode(payload), self.etag)
+            if etag is None:
+                self.lost = True
+                return False
+            self.payload, self.etag = payload, etag
+            return True
+
+    def complete(self) -> bool:
+        self._stop.set()
+        self._thread.join()
+        return self._swap(status="done", finished_at=time.time())
+
+    def abandon(self) -> None:
+        """
+        Expire the lease now so another worker can take the shard immediately.
+        """
+        self._stop.set()
+        self._thread.join()
+        self._swap(status="held", expires_at=0)
+
+
+def _encode(payload: Dict[str, Any]) -> bytes:
+    return jsoncodec.dumps(payload, indent=True, sort_keys=True)
+
+
+def try_claim(store, key: str, worker_id: str, ttl_s: float) -> Tuple[Optional[Lease], str]:
+    """
+    Claim the lease at `key`: create it if absent, or take it over if its
+    holder let it expire. Returns (lease, state) where state is one of
+    'claimed', 'reclaimed', 'held' or 'done'.
+    """
+    now = time.time()
+    payload = {"worker_id": worker_id, "status": "held", "acquired_at": now, "expires_at": now + ttl_s}
+    etag = store.try_create(key, _encode(payload))
+    if etag is not None:
+        return Lease(store, key, payload, etag, ttl_s), "claimed"
+
+    current = store.read(key)
+    if current is None:
+        return None, "held"  # deleted between our create and read; try again next pass
+    body, etag = current
+    existing = jsoncodec.loads(body)
+    if existing.get("status") == "done":
+        return None, "done"
+    if existing.get("expires_at", 0) > now:
+        return None, "held"
+
+    payload["reclaimed_from"] = existing.get("worker_id")
+    new_etag = store.try_replace(key, _encode(payload), etag)
+    if new_etag is None:
+        return None, "held"  # another worker reclaimed it first
+    return Lease(store, key, payload, new_etag, ttl_s), "reclaimed"
+
+
+# --- sharded crawl ---
+
+
+def add_shard_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("sharded crawl")
+    group.add_argument("--shards", type=int, default=0, metavar="N",
+                       help="Split the crawl into N hash shards claimed through leases (0 = unsharded)")
+    group.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}",
+                       help="Identifies this worker in leases and manifests")
+    group.add_argument("--run-ts", type=int, default=None, metavar="TS",
+                       help="Run timestamp shared by every worker of a sharded crawl (required with --shards)")
+    group.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL_S, metavar="SECONDS")
+    group.add_argument("--lease-store", choices=("s3", "local"), default="s3",
+                       help="Where leases and manifests live (local = data_staging/_crawl stand-in)")
+    group.add_argument("--merge", action="store_true",
+                       help="Only merge the per-shard manifests of --run-ts into one manifest")
+
+
+def validate_shard_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    if (args.shards or args.merge) and args.run_ts is None:
+        parser.error("--shards/--merge need --run-ts so all workers share one run")
+    if args.merge and not args.shards:
+        parser.error("--merge needs --shards")
+    if args.shards < 0:
+        parser.error("--shards must be >= 0")
+
+
+def _run_prefix(kind: str, run_ts: int) -> str:
+    return f"{kind}/{run_ts}"
+
+
+def _shard_name(shard: int) -> str:
+    return f"shard-{shard:04d}"
+
+
+def crawl_sharded(
+    kind: str,
+    records: List[Dict[str, Any]],
+    crawl: Callable[[List[Dict[str, Any]], CrawlCheckpoint], int],
+    *,
+    shards: int,
+    worker_id: str,
+    run_ts: int,
+    s3_prefix: str,
+    lease_ttl: float = DEFAULT_LEASE_TTL_S,
+    store=None,
+    checkpoint_every: int = 10,
+    state_dir: Path = STATE_DIR,
+) -> int:
+    """
+    Claim and crawl shards until every shard of the run is done.
+
+    `crawl(records, checkpoint)` crawls one shard's records (the scraper's
+    crawl_detail_pages call). Workers start at different shards to avoid
+    contending for the same leases, and keep polling while other workers hold
+    shards so that expired leases get reclaimed. A worker that loses a lease
+    mid-crawl stops that shard and leaves its manifest to the new holder.
+    Returns the number of pages fetched by this worker.
+    """
+    m = metrics.current()
+    store = store or S3ObjectStore()
+    parts = partition(records, shards)
+    prefix = _run_prefix(kind, run_ts)
+    start = shard_of(worker_id, shards)
+    order = [(start + i) % shards for i in range(shards)]
+
+    fetched = 0
+    crawled: List[int] = []
+    reclaimed = 0
+    while True:
+        pending = 0
+        for shard in order:
+            name = _shard_name(shard)
+            lease, state = try_claim(store, f"{prefix}/leases/{name}.json", worker_id, lease_ttl)
+            if lease is None:
+                pending += state == "held"
+                continue
+
+            lease.start()
+            reclaimed += state == "reclaimed"
+            log.info(
+                f"Claimed {name} ({len(parts[shard])} records)",
+                extra={"shard": shard, "state": state, "worker_id": worker_id},
+            )
+            checkpoint = CrawlCheckpoint.open(f"{kind}_{name}", run_ts, state_dir=state_dir, every=checkpoint_every)
+            # Another worker may already be crawling a shard whose lease we lost
+            checkpoint.stop_when = lambda lease=lease: lease.lost
+            try:
+                fetched += crawl(parts[shard], checkpoint)
+            except BaseException:
+                lease.abandon()
+                raise
+            if lease.lost:
+                lease.abandon()
+                log.warning(f"Lost the lease for {name} mid-crawl; leaving its manifest to the new holder",
+                            extra={"shard": shard, "done": len(checkpoint.done)})
+                continue
+
+            manifest = {
+                "kind": kind,
+                "run_ts": run_ts,
+                "shard": shard,
+                "shards": shards,
+                "worker_id": worker_id,
+                "finished_at": int(time.time()),
+                "s3_prefix": s3_prefix,
+                "done": sorted(checkpoint.done),
+                "s3_keys": sorted(checkpoint.s3_keys.values()),
+                "dead_letter": checkpoint.dead_letter,
+            }
+            store.put(f"{prefix}/manifests/{name}.json", _encode(manifest))
+            if not lease.complete():
+                log.warning(f"Lease for {name} was taken over before completion; manifest kept",
+                            extra={"shard": shard})
+            crawled.append(shard)
+
+        if not pending:
+            break
+        log.info(f"{pending} shard(s) held by other workers; waiting to reclaim expired leases")
+        time.sleep(min(lease_ttl / 2, 30))
+
+    m.extra["shards"] = {
+        "run_ts": run_ts,
+        "shards": shards,
+        "worker_id": worker_id,
+        "crawled": crawled,
+        "reclaimed": reclaimed,
+        "store": store.uri(prefix),
+    }
+    log.info(f"All {shards} shards done; this worker crawled {len(crawled)}", extra={"crawled": crawled})
+    return fetched
+
+
+def merge_manifests(kind: str, run_ts: int, shards: int, store=None) -> Dict[str, Any]:
+    """
+    Combine the per-shard manifests of a run into <kind>/<run_ts>/manifest.json
+    (also written under data_staging/_runs/crawl_state/).
+    """
+    store = store or S3ObjectStore()
+    prefix = _run_prefix(kind, run_ts)
+
+    done: List[str] = []
+    s3_keys: List[str] = []
+    dead_letter: Dict[str, Any] = {}
+    workers: Dict[str, str] = {}
+    missing: List[int] = []
+    for shard in range(shards):
+        name = _shard_name(shard)
+        current = store.read(f"{prefix}/manifests/{name}.json")
+        if current is None:
+            missing.append(shard)
+            continue
+        part = jsoncodec.loads(current[0])
+        done.extend(part["done"])
+        s3_keys.extend(part["s3_keys"])
+        dead_letter.update(part["dead_letter"])
+        workers[name] = part["worker_id"]
+
+    merged = {
+        "kind": kind,
+        "run_ts": run_ts,
+        "shards": shards,
+        "complete": not missing,
+        "missing_shards": missing,
+        "workers": workers,
+        "done_count": len(done),
+        "dead_letter_count": len(dead_letter),
+        "done": sorted(done),
+        # Pages uploaded under run_ts; done slugs whose local file already
+        # existed were skipped and have no object under this run
+        "s3_keys": sorted(s3_keys),
+        "dead_letter": dead_letter,
+    }
+    store.put(f"{prefix}/manifest.json", _encode(merged))
+    atomic_write_json(STATE_DIR / f"{kind}_{run_ts}.manifest.json", merged)
+
+    metrics.current().extra["merge"] = {k: merged[k] for k in ("complete", "missing_shards", "done_count", "dead_letter_count")}
+    if missing:
+        log.warning(f"{len(missing)} shard manifest(s) missing; merged manifest is incomplete",
+                    extra={"missing_shards": missing})
+    log.info(f"Merged {shards - len(missing)}/{shards} shard manifests into {store.uri(prefix + '/manifest.json')}")
+    return merged
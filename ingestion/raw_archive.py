@@ -0,0 +1,392 @@
+"""
+Packed raw-HTML archives: one file per crawl run instead of one file (and
+one S3 object) per page.
+
+Layout of a .pack file:
+
+  b"VCRAWPK1"                                   magic
+  frame, frame, ...                             each page compressed on its own
+  index JSON                                    {"codec", "kind", "ts", "pages": {slug: [offset, length, raw_length, sha256]}}
+  b"VCRAWPK1" + u64 index offset + u64 index length   fixed 24-byte footer
+
+Pages are compressed independently (zstd when the `zstandard` package is
+installed, zlib otherwise), so any slug can be read by offset without
+touching the rest of the file. The index sits at the end, which means a
+whole historical run is a single S3 GET. RawArchive memory-maps the file
+and decompresses straight from the mapped pages.
+
+  python -m ingestion.raw_archive pack company_pages [--upload]
+  python -m ingestion.raw_archive ls data_staging/raw_landing/archives/company_pages_<ts>.pack
+  python -m ingestion.raw_archive get <archive> <slug>
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ingestion.raw_html import decode_html, read_html
+from vceamless import logs, metrics, profiling
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RAW_LANDING_DIR = BASE_DIR / "data_staging" / "raw_landing"
+ARCHIVE_DIR = RAW_LANDING_DIR / "archives"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+S3_ARCHIVE_PREFIX = "sf_ventures/raw_landing/archives"
+
+# Archive kind -> directory of per-page files it is packed from
+PAGE_DIRS = {
+    "company_pages": RAW_LANDING_DIR / "company_pages",
+    "person_pages": RAW_LANDING_DIR / "person_pages",
+}
+
+MAGIC = b"VCRAWPK1"
+FOOTER = struct.Struct("<8sQQ")
+
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+
+log = logs.get_logger("raw_archive")
+
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def archive_path(kind: str, ts: int) -> Path:
+    return ARCHIVE_DIR / f"{kind}_{ts}.pack"
+
+
+class _Codec:
+    def __init__(self, name: str) -> None:
+        if name == "zstd":
+            if zstandard is None:
+                raise RuntimeError("This archive is zstd-compressed; pip install zstandard to read it")
+            self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+            self._d = zstandard.ZstdDecompressor()
+        elif name != "zlib":
+            raise ValueError(f"Unknown archive codec {name!r}")
+        self.name = name
+
+    def compress(self, data: bytes) -> bytes:
+        if self.name == "zstd":
+            return self._c.compress(data)
+        return zlib.compress(data, ZLIB_LEVEL)
+
+    def decompress(self, frame, raw_length: int) -> bytes:
+        if self.name == "zstd":
+            return self._d.decompress(frame, max_output_size=raw_length)
+        return zlib.decompress(frame, bufsize=raw_length)
+
+
+class RawArchiveWriter:
+    """
+    Append pages to a new archive; close() writes the index and footer.
+
+    The archive is built under a temporary name and renamed into place on
+    close, so a reader never sees a half-written file. Thread-safe.
+    """
+
+    def __init__(self, path: Path, kind: str, ts: int, codec: Optional[str] = None) -> None:
+        self.path = path
+        self.kind = kind
+        self.ts = ts
+        self.codec = _Codec(codec or default_codec())
+        self.pages: Dict[str, List] = {}
+        self.raw_bytes = 0
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        self._f = self._tmp.open("wb")
+        self._f.write(MAGIC)
+        self._lock = threading.Lock()
+
+    def add(self, slug: str, body: bytes) -> None:
+        frame = self.codec.compress(body)
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            offset = self._f.tell()
+            self._f.write(frame)
+            # A re-added slug (e.g. a retry) shadows the earlier frame
+            self.pages[slug] = [offset, len(frame), len(body), digest]
+            self.raw_bytes += len(body)
+
+    def close(self) -> Path:
+        with self._lock:
+            index = json.dumps({
+                "format": "vceamless-raw-archive",
+                "version": 1,
+                "codec": self.codec.name,
+                "kind": self.kind,
+                "ts": self.ts,
+                "created_at": int(time.time()),
+                "pages": self.pages,
+            }, separators=(",", ":")).encode("utf-8")
+            index_offset = self._f.tell()
+            self._f.write(index)
+            self._f.write(FOOTER.pack(MAGIC, index_offset, len(index)))
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._f.close()
+            os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self) -> None:
+        self._f.close()
+        if self._tmp.exists():
+            self._tmp.unlink()
+
+    def __enter__(self) -> "RawArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class RawArchive:
+    """
+    Memory-mapped, random-access reader for a .pack archive.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._f = path.open("rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        if len(self._mm) < len(MAGIC) + FOOTER.size or self._mm[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a raw archive")
+        magic, index_offset, index_length = FOOTER.unpack_from(self._mm, len(self._mm) - FOOTER.size)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} has no archive footer (truncated?)")
+
+        meta = json.loads(self._mm[index_offset:index_offset + index_length])
+        self.kind: str = meta["kind"]
+        self.ts: int = meta["ts"]
+        self.codec = _Codec(meta["codec"])
+        self.pages: Dict[str, List] = meta["pages"]
+
+    def __contains__(self, slug: str) -> bool:
+        return slug in self.pages
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def slugs(self) -> Iterator[str]:
+        return iter(self.pages)
+
+    def compressed_size(self, slug: str) -> int:
+        return self.pages[slug][1]
+
+    def get(self, slug: str, verify: bool = False) -> bytes:
+        """
+        Raw UTF-8 bytes of `slug`'s page (KeyError when not archived).
+        """
+        offset, length, raw_length, digest = self.pages[slug]
+        body = self.codec.decompress(self._view[offset:offset + length], raw_length)
+        if verify and hashlib.sha256(body).hexdigest() != digest:
+            raise ValueError(f"Checksum mismatch for {slug} in {self.path}")
+        return body
+
+    def get_text(self, slug: str) -> str:
+        return decode_html(self.get(slug))
+
+    def close(self) -> None:
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        if not self._mm.closed:
+            self._mm.close()
+        self._f.close()
+
+    def __enter__(self) -> "RawArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# --- packing / locating ---
+
+def pack_pages(kind: str, ts: int, pages_dir: Path, slugs: Optional[Iterable[str]] = None,
+               path: Optional[Path] = None, codec: Optional[str] = None) -> Path:
+    """
+    Pack `slugs` (default: every <slug>.html in pages_dir) into one archive.
+    """
+    m = metrics.current()
+    path = path or archive_path(kind, ts)
+    if slugs is None:
+        slugs = sorted(p.stem for p in pages_dir.glob("*.html"))
+
+    with m.stage("pack"), RawArchiveWriter(path, kind, ts, codec=codec) as writer:
+        for slug in slugs:
+            page = pages_dir / f"{slug}.html"
+            if page.exists():
+                writer.add(slug, page.read_bytes())
+    size = path.stat().st_size
+    m.incr("bytes_written", size)
+    m.extra["archive"] = {
+        "path": str(path),
+        "pages": len(writer.pages),
+        "codec": writer.codec.name,
+        "raw_bytes": writer.raw_bytes,
+        "archive_bytes": size,
+    }
+    log.info(
+        f"Packed {len(writer.pages)} pages into {path}",
+        extra={"codec": writer.codec.name, "raw_bytes": writer.raw_bytes, "archive_bytes": size},
+    )
+    return path
+
+
+def upload_archive(path: Path, s3=None) -> str:
+    """
+    Upload an archive as a single object (multipart under the hood when large).
+    """
+    if s3 is None:
+        import boto3
+
+        s3 = boto3.client("s3")
+    key = f"{S3_ARCHIVE_PREFIX}/{path.name}"
+    with metrics.current().stage("upload"):
+        s3.upload_file(str(path), BUCKET, key, ExtraArgs={"ContentType": "application/octet-stream"})
+    metrics.current().incr("bytes_uploaded", path.stat().st_size)
+    log.info(f"Uploaded archive to s3://{BUCKET}/{key}")
+    return key
+
+
+def latest_archive(kind: str) -> Optional[Path]:
+    candidates = sorted(ARCHIVE_DIR.glob(f"{kind}_*.pack"), key=lambda p: int(p.stem.rsplit("_", 1)[1]))
+    return candidates[-1] if candidates else None
+
+
+def resolve_archive(spec: str, kind: str) -> Path:
+    """
+    Turn an --archive value into a local path: 'latest', a local path, or an
+    s3://bucket/key URI (downloaded with one GET into ARCHIVE_DIR).
+    """
+    if spec == "latest":
+        path = latest_archive(kind)
+        if path is None:
+            raise FileNotFoundError(f"No {kind} archives in {ARCHIVE_DIR}")
+        return path
+    if spec.startswith("s3://"):
+        import boto3
+
+        bucket, _, key = spec[len("s3://"):].partition("/")
+        path = ARCHIVE_DIR / Path(key).name
+        if not path.exists():
+            ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.download")
+            with metrics.current().stage("download"):
+                boto3.client("s3").download_file(bucket, key, str(tmp))
+            os.replace(tmp, path)
+            metrics.current().incr("bytes_fetched", path.stat().st_size)
+        return path
+    return Path(spec)
+
+
+class PageSource:
+    """
+    Where an extractor reads detail pages from: per-slug files in a directory,
+    or a packed archive.
+    """
+
+    def __init__(self, pages_dir: Path, archive: Optional[RawArchive] = None) -> None:
+        self.pages_dir = pages_dir
+        self.archive = archive
+
+    @classmethod
+    def open(cls, pages_dir: Path, archive_spec: Optional[str], kind: str) -> "PageSource":
+        if not archive_spec:
+            return cls(pages_dir)
+        path = resolve_archive(archive_spec, kind)
+        log.info(f"Reading {kind} from archive {path}")
+        return cls(pages_dir, RawArchive(path))
+
+    def location(self, slug: str) -> str:
+        if self.archive is not None:
+            return f"{self.archive.path}#{slug}"
+        return str(self.pages_dir / f"{slug}.html")
+
+    def read(self, slug: str) -> Optional[Tuple[str, int]]:
+        """
+        (html, bytes read) for `slug`, or None when the page is missing.
+        """
+        if self.archive is not None:
+            if slug not in self.archive:
+                return None
+            return self.archive.get_text(slug), self.archive.compressed_size(slug)
+
+        path = self.pages_dir / f"{slug}.html"
+        if not path.exists():
+            return None
+        return read_html(path), path.stat().st_size
+
+    def close(self) -> None:
+        if self.archive is not None:
+            self.archive.close()
+
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack and inspect raw-HTML archives.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_pack = sub.add_parser("pack", help="Pack a landing directory into one archive")
+    p_pack.add_argument("kind", choices=sorted(PAGE_DIRS))
+    p_pack.add_argument("--ts", type=int, default=None, help="Run timestamp for the archive name (default: now)")
+    p_pack.add_argument("--codec", choices=("zstd", "zlib"), default=None)
+    p_pack.add_argument("--upload", action="store_true", help="Also upload the archive to S3")
+
+    p_ls = sub.add_parser("ls", help="List the pages in an archive")
+    p_ls.add_argument("archive")
+
+    p_get = sub.add_parser("get", help="Write one page's HTML to stdout")
+    p_get.add_argument("archive")
+    p_get.add_argument("slug")
+
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    if args.command == "pack":
+        with metrics.run_report("raw_archive_pack", ts=args.ts) as m, profiling.profile_from_args(m, args):
+            path = pack_pages(args.kind, m.ts, PAGE_DIRS[args.kind], codec=args.codec)
+            if args.upload:
+                upload_archive(path)
+        return
+
+    with RawArchive(resolve_archive(args.archive, "")) as archive:
+        if args.command == "ls":
+            for slug in archive.slugs():
+                offset, length, raw_length, _ = archive.pages[slug]
+                print(f"{slug}\t{offset}\t{length}\t{raw_length}")
+        else:
+            sys.stdout.buffer.write(archive.get(args.slug, verify=True))
+
+if __name__ == "__main__":
+    main()
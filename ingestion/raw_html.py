@@ -0,0 +1,372 @@
+"""
+Raw HTML as it moves from the landing scrapers to the extractors.
+
+Landed pages are kept as the response bytes: the scrapers write that one
+buffer to data_staging/raw_landing/ and send the same buffer to S3, without
+a decode/encode round trip. Raw HTML at rest is always UTF-8. A page served
+in another charset is transcoded once at fetch time, and the charset it was
+served in is recorded in the S3 object metadata.
+
+Extractors read a page with read_html(). It decodes straight out of a
+memory-mapped file in a single codec pass. The parse functions also accept
+bytes (or any buffer), via make_soup().
+
+The extractors only read a few known subtrees of each page, such as
+div.profile or ul#companies-grid. make_soup(markup, SubtreeFilter(...))
+builds tree nodes for those subtrees only, and the navigation, footer and
+scripts are tokenized but never become Tags.
+
+The list pages can be much larger than any detail page, so they are not
+parsed into a soup at all. iter_cards() runs an event parser over the page
+in chunks and yields each card as soon as its end tag is seen. Only the
+open card is held in memory.
+"""
+
+from __future__ import annotations
+
+import codecs
+import mmap
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.filter import ElementFilter
+
+RAW_HTML_ENCODING = "utf-8"
+RAW_HTML_CONTENT_TYPE = f"text/html; charset={RAW_HTML_ENCODING}"
+
+# Only the head of the document is searched for a <meta charset>
+META_SNIFF_BYTES = 4096
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+Markup = Union[str, bytes, bytearray, memoryview, mmap.mmap]
+
+
+class RawPage(NamedTuple):
+    """
+    A fetched page: UTF-8 body bytes and the charset it was served in.
+    """
+
+    body: bytes
+    source_charset: str
+    # Replayed from the development HTTP cache rather than fetched
+    from_cache: bool = False
+
+    @property
+    def s3_metadata(self):
+        return {"source-charset": self.source_charset}
+
+
+def _header_charset(content_type: Optional[str]) -> Optional[str]:
+    for param in (content_type or "").split(";")[1:]:
+        key, _, value = param.partition("=")
+        if key.strip().lower() == "charset" and value.strip():
+            return value.strip().strip("\"'")
+    return None
+
+
+def _canonical(charset: Optional[str]) -> Optional[str]:
+    if not charset:
+        return None
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def page_from_response(resp) -> RawPage:
+    """
+    Build a RawPage from a requests.Response without decoding UTF-8 bodies.
+
+    The charset comes from the Content-Type header, then <meta charset>, then
+    defaults to UTF-8. (requests' own fallback for text/* is ISO-8859-1, which
+    garbles UTF-8 pages that do not declare a charset.)
+    """
+    body = resp.content
+    charset = _canonical(_header_charset(resp.headers.get("Content-Type")))
+    if charset is None:
+        match = _META_CHARSET.search(body[:META_SNIFF_BYTES])
+        charset = _canonical(match.group(1).decode("ascii")) if match else None
+    charset = charset or RAW_HTML_ENCODING
+
+    if charset not in ("utf-8", "ascii"):
+        body = body.decode(charset, errors="replace").encode(RAW_HTML_ENCODING)
+    return RawPage(body, charset, from_cache=getattr(resp, "from_cache", False))
+
+
+# (tag, "class" | "id", value), from a "tag.class" or "tag#id" selector
+Rule = Tuple[str, str, str]
+
+
+def parse_selector(selector: str) -> Rule:
+    match = re.fullmatch(r"([a-z0-9]+)([.#])([\w-]+)", selector)
+    if not match:
+        raise ValueError(f"Unsupported subtree selector {selector!r}")
+    tag, sep, value = match.groups()
+    return tag, "class" if sep == "." else "id", value
+
+
+def matches(rule: Rule, name: str, attrs: Dict[str, Any]) -> bool:
+    tag, attr, value = rule
+    raw = attrs.get(attr) if name == tag else None
+    if raw is None:
+        return False
+    if attr == "class":
+        return value in (raw.split() if isinstance(raw, str) else raw)
+    return raw == value
+
+
+class SubtreeFilter(ElementFilter):
+    """
+    parse_only filter that keeps just the subtrees rooted at tags matching one
+    of a few simple selectors ("tag.class" or "tag#id").
+
+    bs4 only consults the filter for tags outside any kept subtree, so
+    everything inside a match is built as usual. SoupStrainer is not used
+    because, at parse time, it compares class="a b" as one string and would
+    miss div.profile on <div class="profile profile--company">.
+    """
+
+    def __init__(self, *selectors: str) -> None:
+        super().__init__()
+        self.rules: List[Rule] = [parse_selector(selector) for selector in selectors]
+
+    @property
+    def includes_everything(self) -> bool:
+        return False
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return bool(attrs) and any(matches(rule, name, attrs) for rule in self.rules)
+
+    def allow_string_creation(self, string: str) -> bool:
+        return False
+
+    def __repr__(self) -> str:
+        return f"SubtreeFilter({self.rules!r})"
+
+
+def decode_html(data) -> str:
+    """
+    Decode raw page bytes the way Path.read_text does: invalid UTF-8 replaced,
+    and \r\n / \r turned into \n (universal newlines), so parsed text and
+    record hashes do not depend on how a page was read.
+    """
+    return str(data, RAW_HTML_ENCODING, "replace").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def make_soup(markup: Markup, parse_only: Optional[ElementFilter] = None) -> BeautifulSoup:
+    """
+    BeautifulSoup over str or UTF-8 bytes-like markup, optionally restricted
+    to the subtrees a SubtreeFilter selects.
+
+    Bytes are decoded here in one pass rather than handed to bs4, which would
+    run its encoding detection over them first.
+    """
+    if not isinstance(markup, str):
+        markup = decode_html(markup)
+    return BeautifulSoup(markup, "html.parser", parse_only=parse_only)
+
+
+def read_html(path: Path) -> str:
+    """
+    Decode a landed page directly from a read-only memory map (no intermediate
+    bytes copy).
+    """
+    with path.open("rb") as f:
+        if f.seek(0, 2) == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return decode_html(mm)
+
+
+# --- Streaming list pages ---
+
+# Read size for iter_html_chunks (characters)
+STREAM_CHUNK_CHARS = 1 << 16
+
+# Tags bs4 never leaves open, so they take no end tag
+VOID_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+
+
+class CardElement:
+    """
+    An element of a streamed card. It implements the part of the bs4 Tag API
+    the list extractors use (get, find, get_text), so the same record code
+    runs on either. "class" is a list, as in bs4.
+    """
+
+    __slots__ = ("name", "attrs", "contents")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.contents: List[Union[CardElement, str]] = []
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.attrs.get(key, default)
+
+    def descendants(self) -> Iterator[Union[CardElement, str]]:
+        for child in self.contents:
+            yield child
+            if isinstance(child, CardElement):
+                yield from child.descendants()
+
+    def find(self, name: str, class_: Optional[str] = None) -> Optional[CardElement]:
+        for el in self.descendants():
+            if not isinstance(el, CardElement) or el.name != name:
+                continue
+            classes = el.attrs.get("class", [])
+            if class_ is None or class_ in classes or " ".join(classes) == class_:
+                return el
+        return None
+
+    def get_text(self, strip: bool = False) -> str:
+        strings = (s for s in self.descendants() if isinstance(s, str))
+        if strip:
+            return "".join(s.strip() for s in strings if s.strip())
+        return "".join(strings)
+
+    def __repr__(self) -> str:
+        return f"<{self.name} {self.attrs!r}>"
+
+
+class _CardParser(HTMLParser):
+    """
+    Event parser that builds a CardElement tree for each card inside a grid
+    and nothing else.
+
+    It keeps the names of every open tag, and an end tag closes everything
+    up to its most recent match (or is ignored when none is open), as bs4's
+    html.parser builder does. This way a missing </li> ends a card where the
+    soup would end it.
+    """
+
+    def __init__(self, grid: str, card: str) -> None:
+        super().__init__(convert_charrefs=True)
+        self.grid_rule = parse_selector(grid)
+        self.card_rule = parse_selector(card)
+        # (tag name, element inside a card or None, "grid" | "card" | None)
+        self.open: List[Tuple[str, Optional[CardElement], Optional[str]]] = []
+        self.grids = 0
+        self.cards = 0
+        self.seq = 0
+        self.pending: List[Tuple[int, CardElement]] = []  # closed cards nested in an open one
+        self.ready: List[CardElement] = []
+        self.text_open = False
+
+    def _current(self) -> Optional[CardElement]:
+        return self.open[-1][1] if self.open else None
+
+    def handle_starttag(self, tag, attrs):
+        values: Dict[str, Any] = {}
+        for key, value in attrs:
+            value = "" if value is None else value
+            values[key] = value.split() if key == "class" else value
+
+        role = None
+        if self.grids and matches(self.card_rule, tag, values):
+            role = "card"
+        elif matches(self.grid_rule, tag, values):
+            role = "grid"
+
+        el = None
+        if self.cards or role == "card":
+            el = CardElement(tag, values)
+            parent = self._current() if self.cards else None
+            if parent is not None:
+                parent.contents.append(el)
+            self.text_open = False
+        if role == "card":
+            self.cards += 1
+            self.seq += 1
+            self.pending.append((self.seq, el))
+        elif role == "grid":
+            self.grids += 1
+
+        if tag in VOID_TAGS:
+            return
+        self.open.append((tag, el, role))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        for i in range(len(self.open) - 1, -1, -1):
+            if self.open[i][0] == tag:
+                break
+        else:
+            return
+        self._close_from(i)
+
+    def _close_from(self, i: int) -> None:
+        closing, self.open = self.open[i:], self.open[:i]
+        self.text_open = False
+        for _, _, role in reversed(closing):
+            if role == "grid":
+                self.grids -= 1
+            elif role == "card":
+                self.cards -= 1
+        if not self.cards and self.pending:
+            # bs4 returns cards in document (start tag) order
+            self.ready.extend(el for _, el in sorted(self.pending, key=lambda p: p[0]))
+            self.pending = []
+
+    def handle_data(self, data):
+        if not self.cards or self.cdata_elem is not None:
+            return
+        parent = self._current()
+        if self.text_open and parent.contents and isinstance(parent.contents[-1], str):
+            parent.contents[-1] += data
+        else:
+            parent.contents.append(data)
+            self.text_open = True
+
+    def _break_text(self, *_):
+        # Comments and declarations split the surrounding text, as in bs4
+        self.text_open = False
+
+    handle_comment = handle_decl = handle_pi = unknown_decl = _break_text
+
+    def finish(self) -> None:
+        self.close()
+        self._close_from(0)
+
+
+def iter_cards(chunks: Iterable[str], grid: str, card: str) -> Iterator[CardElement]:
+    """
+    Stream the cards matching `card` ("tag.class" or "tag#id") inside any
+    element matching `grid`, in document order, with each one yielded as soon
+    as it closes. Nothing outside the cards is kept, so memory stays at one
+    card plus the parser's buffer whatever the page size.
+
+    Produces the same cards, in the same order, as soup.select(f"{grid}
+    {card}"). A card nested in another is held back until the outer one
+    closes.
+    """
+    parser = _CardParser(grid, card)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.ready:
+            ready, parser.ready = parser.ready, []
+            yield from ready
+    parser.finish()
+    yield from parser.ready
+
+
+def iter_html_chunks(path: Path, chunk_chars: int = STREAM_CHUNK_CHARS) -> Iterator[str]:
+    """
+    Decoded text of a landed page, chunk_chars at a time, with universal
+    newlines like read_html.
+    """
+    with path.open("r", encoding=RAW_HTML_ENCODING, errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                return
+            yield chunk
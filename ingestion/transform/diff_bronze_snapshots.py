@@ -0,0 +1,300 @@
+"""
+Keyed diff of two bronze snapshots into an NDJSON change feed.
+
+  python -m ingestion.transform.diff_bronze_snapshots                 # two latest history snapshots
+  python -m ingestion.transform.diff_bronze_snapshots --old A --new B # any two snapshot dirs
+  python -m ingestion.transform.diff_bronze_snapshots --old A         # A vs the current bronze dir
+
+Records are matched on `slug`. Each line of the feed is one event:
+
+  {"op": "added",    "entity": "companies", "slug": ..., "record": {...}}
+  {"op": "removed",  "entity": "companies", "slug": ..., "record": {...}}
+  {"op": "modified", "entity": "companies", "slug": ..., "changes": [
+      {"field": "status_detail", "old": "Active", "new": "Acquired"},
+      {"field": "leadership", "added": [{...}], "removed": [{...}]},
+      ...]}
+
+Each record is hashed as a whole, and field-level work only happens for
+records whose hash changed. Each top-level field is hashed too. List fields
+of objects (leadership, portfolio_companies) are diffed element by element,
+so a new CEO shows up as one added element rather than a rewritten list.
+
+Both snapshots are streamed. Small inputs are diffed in memory. Large ones
+are first hash-partitioned by slug into NDJSON spill files, then diffed one
+partition at a time. Time stays linear and memory is bounded by the biggest
+partition.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import boto3
+
+from ingestion.transform.snapshots import (
+    BRONZE_DIR,
+    ENTITY_FILES,
+    history_snapshots,
+    iter_json_array,
+    record_hash,
+    snapshot_file,
+)
+from vceamless import jsoncodec, logs, metrics, profiling
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CHANGES_DIR = BASE_DIR / "data_staging" / "bronze" / "changes"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+CHANGES_S3_PREFIX = "sf_ventures/bronze/changes"
+
+# Inputs above this size (bytes, both snapshots together) are spilled to partitions
+IN_MEMORY_LIMIT_BYTES = 64 * 1024 * 1024
+# Target size of one spilled partition
+PARTITION_TARGET_BYTES = 16 * 1024 * 1024
+
+# List-of-object fields diffed element by element
+NESTED_LIST_FIELDS = ("leadership", "portfolio_companies")
+
+s3 = boto3.client("s3")
+log = logs.get_logger("diff_bronze_snapshots")
+
+
+def _partition_of(slug: str, partitions: int) -> int:
+    return int.from_bytes(hashlib.blake2b(slug.encode("utf-8"), digest_size=8).digest(), "big") % partitions
+
+
+# --- field-level diff ---
+
+def diff_list_field(old: List[Any], new: List[Any]) -> Dict[str, List[Any]]:
+    """
+    Multiset difference of two lists by element hash (order changes alone
+    are not reported).
+    """
+    old_counts: Dict[bytes, List[Any]] = {}
+    for item in old:
+        old_counts.setdefault(record_hash(item), []).append(item)
+    added = []
+    for item in new:
+        bucket = old_counts.get(record_hash(item))
+        if bucket:
+            bucket.pop()
+        else:
+            added.append(item)
+    removed = [item for bucket in old_counts.values() for item in bucket]
+    return {"added": added, "removed": removed}
+
+
+def diff_records(old: Dict[str, Any], new: Dict[str, Any]) -> List[Dict[str, Any]]:
+    changes = []
+    for field in list(old) + [k for k in new if k not in old]:
+        in_old, in_new = field in old, field in new
+        old_value, new_value = old.get(field), new.get(field)
+        if in_old and in_new and record_hash(old_value) == record_hash(new_value):
+            continue
+        if (field in NESTED_LIST_FIELDS and isinstance(old_value, list) and isinstance(new_value, list)):
+            delta = diff_list_field(old_value, new_value)
+            if not delta["added"] and not delta["removed"]:
+                continue  # reordered only
+            changes.append({"field": field, **delta})
+            continue
+        change: Dict[str, Any] = {"field": field}
+        if in_old:
+            change["old"] = old_value
+        if in_new:
+            change["new"] = new_value
+        changes.append(change)
+    return changes
+
+
+# --- diff core ---
+
+def _diff_partition(
+    entity: str,
+    old_records: Iterable[Dict[str, Any]],
+    new_records: Iterable[Dict[str, Any]],
+) -> Iterator[Dict[str, Any]]:
+    old_by_slug: Dict[str, Tuple[bytes, Dict[str, Any]]] = {}
+    for rec in old_records:
+        old_by_slug[rec["slug"]] = (record_hash(rec), rec)
+
+    for rec in new_records:
+        slug = rec["slug"]
+        prev = old_by_slug.pop(slug, None)
+        if prev is None:
+            yield {"op": "added", "entity": entity, "slug": slug, "record": rec}
+            continue
+        if prev[0] == record_hash(rec):
+            continue
+        changes = diff_records(prev[1], rec)
+        if changes:
+            yield {"op": "modified", "entity": entity, "slug": slug, "changes": changes}
+
+    for slug, (_, rec) in old_by_slug.items():
+        yield {"op": "removed", "entity": entity, "slug": slug, "record": rec}
+
+
+def _keyed(path: Path) -> Iterator[Dict[str, Any]]:
+    m = metrics.current()
+    for rec in iter_json_array(path):
+        if not rec.get("slug"):
+            m.incr("skipped_no_slug")
+            continue
+        m.incr("items")
+        yield rec
+
+
+def _spill(path: Path, spill_dir: Path, label: str, partitions: int) -> List[Path]:
+    paths = [spill_dir / f"{label}-{i:04d}.ndjson" for i in range(partitions)]
+    files = [p.open("wb") for p in paths]
+    try:
+        for rec in _keyed(path):
+            f = files[_partition_of(rec["slug"], partitions)]
+            f.write(jsoncodec.dumps(rec))
+            f.write(b"\n")
+    finally:
+        for f in files:
+            f.close()
+    return paths
+
+
+def _read_ndjson(path: Path) -> Iterator[Dict[str, Any]]:
+    with path.open("rb") as f:
+        for line in f:
+            yield jsoncodec.loads(line)
+
+
+def diff_snapshots(entity: str, old_path: Path, new_path: Path, partitions: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield change events turning `old_path` into `new_path`.
+    """
+    m = metrics.current()
+    total_bytes = old_path.stat().st_size + new_path.stat().st_size
+    m.incr("bytes_read", total_bytes)
+
+    if partitions is None:
+        partitions = 1 if total_bytes <= IN_MEMORY_LIMIT_BYTES else -(-total_bytes // PARTITION_TARGET_BYTES)
+    if partitions <= 1:
+        yield from _diff_partition(entity, _keyed(old_path), _keyed(new_path))
+        return
+
+    spill_dir = Path(tempfile.mkdtemp(prefix=f"diff-{entity}-"))
+    try:
+        with m.stage("partition"):
+            old_parts = _spill(old_path, spill_dir, "old", partitions)
+            new_parts = _spill(new_path, spill_dir, "new", partitions)
+        log.info(f"Spilled {entity} into {partitions} partitions", extra={"spill_dir": str(spill_dir)})
+        for old_part, new_part in zip(old_parts, new_parts):
+            yield from _diff_partition(entity, _read_ndjson(old_part), _read_ndjson(new_part))
+            old_part.unlink()
+            new_part.unlink()
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+# --- Main ---
+
+def _label(snapshot_dir: Path) -> str:
+    return snapshot_dir.name if snapshot_dir.name.isdigit() else "current"
+
+
+def resolve_pair(old: Optional[str], new: Optional[str]) -> Tuple[Path, Path]:
+    """
+    Explicit --old/--new, or else the two latest history snapshots (or the
+    latest history snapshot vs the current bronze dir when only one exists).
+    --old alone is diffed against the current bronze dir.
+    """
+    if old and new:
+        return Path(old), Path(new)
+    if old:
+        return Path(old), BRONZE_DIR
+    history = [p for _, p in history_snapshots()]
+    if new:
+        candidates = [p for p in history if p.resolve() != Path(new).resolve()]
+        if not candidates:
+            raise FileNotFoundError("No history snapshot to diff against; pass --old")
+        return candidates[-1], Path(new)
+    if len(history) >= 2:
+        return history[-2], history[-1]
+    if len(history) == 1:
+        return history[0], BRONZE_DIR
+    raise FileNotFoundError("No bronze history snapshots; run the backfill or pass --old and --new")
+
+
+def run(old: Optional[str] = None, new: Optional[str] = None, entities: Iterable[str] = tuple(ENTITY_FILES),
+        out_dir: Path = CHANGES_DIR, partitions: Optional[int] = None, upload: bool = True):
+    m = metrics.current()
+    old_dir, new_dir = resolve_pair(old, new)
+    log.info(f"Diffing {old_dir} -> {new_dir}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    summary: Dict[str, Dict[str, int]] = {}
+    for entity in entities:
+        old_path, new_path = snapshot_file(old_dir, entity), snapshot_file(new_dir, entity)
+        if not old_path.exists() or not new_path.exists():
+            log.warning(f"Skipping {entity}: missing {old_path if not old_path.exists() else new_path}")
+            continue
+
+        out_path = out_dir / f"{entity}_{_label(old_dir)}__{_label(new_dir)}.ndjson"
+        tmp = out_path.with_name(f".{out_path.name}.tmp")
+        counts = {"added": 0, "removed": 0, "modified": 0}
+        with m.stage("diff"), tmp.open("wb") as f:
+            for event in diff_snapshots(entity, old_path, new_path, partitions=partitions):
+                counts[event["op"]] += 1
+                f.write(jsoncodec.dumps(event))
+                f.write(b"\n")
+        os.replace(tmp, out_path)
+        size = out_path.stat().st_size
+        m.incr("bytes_written", size)
+        summary[entity] = counts
+        log.info(f"Wrote {entity} change feed to {out_path}", extra=counts)
+
+        if upload:
+            key = f"{CHANGES_S3_PREFIX}/{out_path.name}"
+            try:
+                with m.stage("upload"):
+                    s3.upload_file(str(out_path), BUCKET, key, ExtraArgs={"ContentType": "application/x-ndjson"})
+                m.incr("bytes_uploaded", size)
+            except Exception as e:
+                m.incr("errors")
+                log.warning(f"Failed to upload change feed to S3: {e}")
+
+    m.extra["changes"] = summary
+    m.extra["old"], m.extra["new"] = str(old_dir), str(new_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff two bronze snapshots into an NDJSON change feed.")
+    parser.add_argument("--old", default=None, metavar="DIR",
+                        help="Older snapshot directory (alone: diffed against the current bronze dir)")
+    parser.add_argument("--new", default=None, metavar="DIR",
+                        help="Newer snapshot directory (alone: diffed against the latest other history snapshot)")
+    parser.add_argument("--entity", choices=sorted(ENTITY_FILES), action="append", default=None,
+                        help="Entity to diff (repeatable; default: all)")
+    parser.add_argument("--out-dir", type=Path, default=CHANGES_DIR)
+    parser.add_argument("--partitions", type=int, default=None, metavar="N",
+                        help="Force N spill partitions (default: by input size; 1 = in memory)")
+    parser.add_argument("--no-upload", action="store_true", help="Do not mirror the change feed to S3")
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.old and not args.new and Path(args.old).resolve() == BRONZE_DIR.resolve():
+        parser.error("--old is the current bronze dir; pass --new as well")
+    logs.configure_from_args(args)
+
+    with metrics.run_report("diff_bronze_snapshots") as m, profiling.profile_from_args(m, args):
+        run(
+            old=args.old,
+            new=args.new,
+            entities=args.entity or tuple(ENTITY_FILES),
+            out_dir=args.out_dir,
+            partitions=args.partitions,
+            upload=not args.no_upload,
+        )
+
+
+if __name__ == "__main__":
+    main()
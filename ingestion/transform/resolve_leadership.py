@@ -0,0 +1,289 @@
+"""
+Link company leadership entries to person records.
+
+  python -m ingestion.transform.resolve_leadership [--threshold 0.93]
+
+companies_enriched.leadership holds free-text {name, role} pairs. People
+come from people_enriched.json, or from people_list.json when the detail
+pages have not been extracted. This stage resolves each leader to a person
+slug and writes bronze/leadership_links.json, with one row per
+PersonCompany__c "Leadership" edge (ADR-0002):
+
+  {"person_company_key": "<person>::<company>", "person_slug", "company_slug",
+   "relationship_type": "Leadership", "leader_name", "person_name", "role",
+   "score", "method": "exact" | "fuzzy"}
+
+Every person is indexed once under a few blocking keys: each normalized name
+token, the Soundex code of the last name, and first initial + last name. A
+leader is scored only against people sharing one of its keys, and blocks
+larger than MAX_BLOCK_SIZE are skipped. The work is therefore roughly
+linear in leaders + people rather than their product. The score is
+Jaro-Winkler over the normalized full name, and over first + last name when
+either side has middle names. A leader links to the best candidate at or
+above the threshold, unless the runner-up is within AMBIGUITY_MARGIN; those
+leaders are counted as ambiguous and left unlinked.
+"""
+
+import argparse
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import boto3
+
+from ingestion.transform.snapshots import BRONZE_DIR, ENTITY_FILES, iter_json_array
+from vceamless import jsoncodec, logs, metrics, profiling
+
+PEOPLE_LIST_PATH = BRONZE_DIR / "people_list.json"
+OUT_PATH = BRONZE_DIR / "leadership_links.json"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+BRONZE_S3_KEY = "sf_ventures/bronze/leadership_links.json"
+
+MATCH_THRESHOLD = 0.93
+AMBIGUITY_MARGIN = 0.02
+MAX_BLOCK_SIZE = 200
+
+# Dropped before matching: honorifics, suffixes, credentials
+NAME_NOISE = frozenset("mr mrs ms dr prof sir jr sr ii iii iv phd md mba cpa esq".split())
+
+s3 = boto3.client("s3")
+log = logs.get_logger("resolve_leadership")
+
+
+# --- Names ---
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+
+
+def normalize_name(name: str) -> List[str]:
+    """
+    Lowercase ASCII tokens with accents, punctuation and NAME_NOISE removed.
+    """
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    cleaned = _NON_ALNUM.sub(" ", ascii_name.lower().replace("'", ""))
+    return [t for t in cleaned.split() if t not in NAME_NOISE]
+
+
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(
+    ("aeiouyhw", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for c in letters}
+
+
+def soundex(token: str) -> str:
+    letters = [c for c in token if c.isalpha()]
+    if not letters:
+        return ""
+    out = letters[0].upper()
+    prev = _SOUNDEX_CODES.get(letters[0], "")
+    for c in letters[1:]:
+        code = _SOUNDEX_CODES.get(c, "")
+        if code and code != "0" and code != prev:
+            out += code
+        if c not in "hw":  # h/w do not separate equal codes
+            prev = code
+        if len(out) == 4:
+            break
+    return out.ljust(4, "0")
+
+
+def jaro_winkler(a: str, b: str, prefix_scale: float = 0.1) -> float:
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    a_matched = [False] * len(a)
+    b_matched = [False] * len(b)
+    matches = 0
+    for i, ch in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not b_matched[j] and b[j] == ch:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+    a_seq = [ch for ch, m in zip(a, a_matched) if m]
+    b_seq = [ch for ch, m in zip(b, b_matched) if m]
+    transpositions = sum(x != y for x, y in zip(a_seq, b_seq)) / 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+def blocking_keys(tokens: List[str]) -> Set[Tuple[str, str]]:
+    if not tokens:
+        return set()
+    keys = {("tok", t) for t in tokens if len(t) > 1}
+    keys.add(("sdx", soundex(tokens[-1])))
+    if len(tokens) > 1:
+        keys.add(("fl", tokens[0][0] + tokens[-1]))
+    return keys
+
+
+def name_score(a: List[str], b: List[str]) -> float:
+    score = jaro_winkler(" ".join(a), " ".join(b))
+    if len(a) > 2 or len(b) > 2:
+        score = max(score, jaro_winkler(f"{a[0]} {a[-1]}", f"{b[0]} {b[-1]}"))
+    return score
+
+
+# --- Resolution ---
+
+class PersonIndex:
+    """
+    People by blocking key.
+    """
+
+    def __init__(self, people: Iterable[Dict[str, Any]]) -> None:
+        self.people: List[Tuple[str, str, List[str]]] = []  # (slug, display name, tokens)
+        self.blocks: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self.exact: Dict[str, List[int]] = defaultdict(list)
+        for rec in people:
+            slug = rec.get("slug")
+            name = rec.get("detail_name") or rec.get("name")
+            if not slug or not name:
+                continue
+            tokens = normalize_name(name)
+            if not tokens:
+                continue
+            i = len(self.people)
+            self.people.append((slug, name, tokens))
+            self.exact[" ".join(tokens)].append(i)
+            for key in blocking_keys(tokens):
+                self.blocks[key].append(i)
+
+    def candidates(self, tokens: List[str]) -> Set[int]:
+        found: Set[int] = set()
+        for key in blocking_keys(tokens):
+            block = self.blocks.get(key, ())
+            if len(block) <= MAX_BLOCK_SIZE:
+                found.update(block)
+        return found
+
+    def resolve(self, name: str, threshold: float = MATCH_THRESHOLD) -> Tuple[str, Optional[int], float]:
+        """
+        ("exact" | "fuzzy" | "ambiguous" | "unmatched", person index, score).
+        """
+        tokens = normalize_name(name)
+        if not tokens:
+            return "unmatched", None, 0.0
+        exact = self.exact.get(" ".join(tokens), [])
+        if len(exact) == 1:
+            return "exact", exact[0], 1.0
+        if len(exact) > 1:
+            return "ambiguous", None, 1.0
+
+        scored = sorted(((name_score(tokens, self.people[i][2]), i) for i in self.candidates(tokens)), reverse=True)
+        if not scored or scored[0][0] < threshold:
+            return "unmatched", None, scored[0][0] if scored else 0.0
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < AMBIGUITY_MARGIN:
+            return "ambiguous", None, scored[0][0]
+        return "fuzzy", scored[0][1], scored[0][0]
+
+
+def resolve_leadership(companies: Iterable[Dict[str, Any]], index: PersonIndex,
+                       threshold: float = MATCH_THRESHOLD) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    m = metrics.current()
+    links: Dict[str, Dict[str, Any]] = {}
+    outcomes: Dict[str, int] = defaultdict(int)
+    for company in companies:
+        company_slug = company.get("slug")
+        for leader in company.get("leadership") or []:
+            name = leader.get("name")
+            if not company_slug or not name:
+                continue
+            m.incr("items")
+            method, i, score = index.resolve(name, threshold)
+            outcomes[method] += 1
+            if i is None:
+                log.debug("Leader not linked", extra={"company": company_slug, "leader": name, "outcome": method,
+                                                      "score": round(score, 3)})
+                continue
+            person_slug, person_name, _ = index.people[i]
+            key = f"{person_slug}::{company_slug}"
+            # One edge per pair; a person listed twice keeps the better match
+            if key in links and links[key]["score"] >= score:
+                continue
+            links[key] = {
+                "person_company_key": key,
+                "person_slug": person_slug,
+                "company_slug": company_slug,
+                "relationship_type": "Leadership",
+                "leader_name": name,
+                "person_name": person_name,
+                "role": leader.get("role"),
+                "score": round(score, 4),
+                "method": method,
+            }
+    return sorted(links.values(), key=lambda link: link["person_company_key"]), dict(outcomes)
+
+
+# --- Main ---
+
+def _people_path(bronze_dir: Path) -> Optional[Path]:
+    for path in (bronze_dir / ENTITY_FILES["people"], bronze_dir / PEOPLE_LIST_PATH.name):
+        if path.exists():
+            return path
+    return None
+
+
+def run(bronze_dir: Path = BRONZE_DIR, out_path: Path = OUT_PATH, threshold: float = MATCH_THRESHOLD,
+        upload: bool = True):
+    m = metrics.current()
+    companies_path = bronze_dir / ENTITY_FILES["companies"]
+    people_path = _people_path(bronze_dir)
+    if not companies_path.exists():
+        raise FileNotFoundError(f"Missing bronze companies at {companies_path}")
+    if people_path is None:
+        raise FileNotFoundError(f"No people_enriched.json or people_list.json in {bronze_dir}")
+    m.incr("bytes_read", companies_path.stat().st_size + people_path.stat().st_size)
+
+    with m.stage("index"):
+        index = PersonIndex(iter_json_array(people_path))
+    log.info(f"Indexed {len(index.people)} people from {people_path}", extra={"blocks": len(index.blocks)})
+
+    with m.stage("resolve"):
+        links, outcomes = resolve_leadership(iter_json_array(companies_path), index, threshold)
+    m.extra["outcomes"] = outcomes
+    log.info(f"Linked {len(links)} leadership edges", extra=outcomes)
+
+    with m.stage("write"):
+        body = jsoncodec.write_path(out_path, links)
+    m.incr("bytes_written", len(body))
+    log.info(f"Wrote leadership links to {out_path}")
+
+    if upload:
+        try:
+            with m.stage("upload"):
+                s3.put_object(Bucket=BUCKET, Key=BRONZE_S3_KEY, Body=body, ContentType="application/json")
+            m.incr("bytes_uploaded", len(body))
+        except Exception as e:
+            m.incr("errors")
+            log.warning(f"Failed to upload leadership links to S3: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Link company leadership entries to person slugs.")
+    parser.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+    parser.add_argument("--out", type=Path, default=OUT_PATH)
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD, help="Minimum Jaro-Winkler score to link")
+    parser.add_argument("--no-upload", action="store_true", help="Do not mirror the links to S3")
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    with metrics.run_report("resolve_leadership") as m, profiling.profile_from_args(m, args):
+        run(bronze_dir=args.bronze_dir, out_path=args.out, threshold=args.threshold, upload=not args.no_upload)
+
+
+if __name__ == "__main__":
+    main()
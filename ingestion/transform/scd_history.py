@@ -0,0 +1,457 @@
+"""
+Type-2 slowly changing dimension history for companies and people.
+
+  python -m ingestion.transform.scd_history apply              # pending history snapshots + current bronze
+  python -m ingestion.transform.scd_history apply --rebuild    # drop the database and replay everything
+  python -m ingestion.transform.scd_history as-of 2025-12-01 --entity companies [--slug acme]
+  python -m ingestion.transform.scd_history versions companies acme
+
+Every bronze run overwrites companies_enriched.json / people_enriched.json,
+so status transitions (active -> exited, Private -> Acquired) only survive
+in history. This module keeps dim_company and dim_person (ADR-0002) in a
+SQLite database. Each row is one version of an entity, valid over
+[valid_from, valid_to). Times are snapshot run timestamps (epoch seconds).
+
+A snapshot is applied incrementally against the current rows only:
+
+  unchanged  record hash equal to the current row     -> nothing written
+  changed    current row closed (valid_to = ts), new version opened
+  added      new version opened
+  removed    current row closed
+
+Applied snapshots are recorded in scd_snapshots and never applied twice.
+Snapshots must arrive in ts order. A history snapshot backfilled after a
+newer one was applied is skipped with a warning, and --rebuild replays it
+in order. The current bronze dir is stamped with the run ts of the extract
+that wrote it (from its run report), not with a file mtime.
+
+An as-of query is a single indexed lookup (valid_from <= t < valid_to); no
+snapshots are replayed.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import boto3
+
+from ingestion.transform.snapshots import (
+    BRONZE_DIR,
+    ENTITY_FILES,
+    canonical_json,
+    history_snapshots,
+    iter_json_array,
+    record_hash,
+    snapshot_file,
+    snapshot_ts,
+)
+from vceamless import logs, metrics, profiling
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+WAREHOUSE_DIR = BASE_DIR / "data_staging" / "warehouse"
+DB_PATH = WAREHOUSE_DIR / "dim_history.sqlite"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+DB_S3_KEY = "sf_ventures/warehouse/dim_history.sqlite"
+
+# Scripts whose run reports stamp the current bronze dir
+EXTRACT_SCRIPTS = ("extract_company_pages", "extract_person_pages")
+
+s3 = boto3.client("s3")
+log = logs.get_logger("scd_history")
+
+
+def _joined(values: Optional[List[str]]) -> Optional[str]:
+    return ";".join(values) if values else None
+
+
+def _json_or_none(value: Any) -> Optional[str]:
+    return canonical_json(value).decode("utf-8") if value else None
+
+
+class Dimension(NamedTuple):
+    """
+    One SCD2 table: its name, its natural-key column and the attribute
+    columns derived from a bronze record.
+    """
+
+    table: str
+    key: str
+    columns: Tuple[Tuple[str, Callable[[Dict[str, Any]], Any]], ...]
+
+
+# Column names follow the ADR-0002 field mapping, in snake case.
+DIMENSIONS: Dict[str, Dimension] = {
+    "companies": Dimension("dim_company", "company_slug", (
+        ("name", lambda r: r.get("detail_name") or r.get("name")),
+        ("status", lambda r: r.get("status")),
+        ("status_detail", lambda r: r.get("status_detail")),
+        ("fund_tags", lambda r: _joined(r.get("fund_tags"))),
+        ("theme_tags", lambda r: _joined(r.get("theme_tags"))),
+        ("website_url", lambda r: r.get("website_url")),
+        ("description", lambda r: r.get("description")),
+        ("logo_url", lambda r: r.get("logo_url")),
+        ("hero_image_url", lambda r: r.get("hero_image_url")),
+        ("source_url", lambda r: r.get("detail_url")),
+        ("leadership_json", lambda r: _json_or_none(r.get("leadership"))),
+    )),
+    "people": Dimension("dim_person", "person_slug", (
+        ("name", lambda r: r.get("name")),
+        ("title", lambda r: r.get("detail_title") or r.get("title") or None),
+        ("location", lambda r: r.get("location")),
+        ("bio", lambda r: r.get("bio")),
+        ("photo_url", lambda r: r.get("photo_url") or r.get("detail_photo_url")),
+        ("source_url", lambda r: r.get("detail_url")),
+        ("portfolio_json", lambda r: _json_or_none(r.get("portfolio_companies"))),
+    )),
+}
+
+
+# --- Schema ---
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    for dim in DIMENSIONS.values():
+        attrs = ",\n".join(f"    {name} TEXT" for name, _ in dim.columns)
+        conn.executescript(f"""
+CREATE TABLE IF NOT EXISTS {dim.table} (
+    version_id INTEGER PRIMARY KEY,
+    {dim.key} TEXT NOT NULL,
+{attrs},
+    record_json TEXT NOT NULL,
+    row_hash BLOB NOT NULL,
+    valid_from INTEGER NOT NULL,
+    valid_to INTEGER,
+    is_current INTEGER NOT NULL DEFAULT 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS {dim.table}_key_from ON {dim.table} ({dim.key}, valid_from);
+CREATE INDEX IF NOT EXISTS {dim.table}_valid ON {dim.table} (valid_from, valid_to);
+CREATE INDEX IF NOT EXISTS {dim.table}_current ON {dim.table} ({dim.key}) WHERE is_current = 1;
+""")
+    conn.execute("""
+CREATE TABLE IF NOT EXISTS scd_snapshots (
+    ts INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    applied_at INTEGER NOT NULL,
+    stats_json TEXT NOT NULL
+)""")
+
+
+def connect(path: Path = DB_PATH) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    _create_schema(conn)
+    return conn
+
+
+def applied_snapshots(conn: sqlite3.Connection) -> Dict[int, str]:
+    return {row["ts"]: row["source"] for row in conn.execute("SELECT ts, source FROM scd_snapshots")}
+
+
+# --- Apply ---
+
+def _apply_entity(conn: sqlite3.Connection, entity: str, path: Path, ts: int) -> Dict[str, int]:
+    dim = DIMENSIONS[entity]
+    m = metrics.current()
+    current: Dict[str, Tuple[int, bytes]] = {
+        row[0]: (row[1], row[2])
+        for row in conn.execute(f"SELECT {dim.key}, version_id, row_hash FROM {dim.table} WHERE is_current = 1")
+    }
+    stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+    closes: List[Tuple[int, int]] = []
+    inserts: List[Tuple[Any, ...]] = []
+    seen = set()
+
+    for rec in iter_json_array(path):
+        slug = rec.get("slug")
+        if not slug or slug in seen:
+            m.incr("skipped_no_slug" if not slug else "skipped_duplicate")
+            continue
+        seen.add(slug)
+        m.incr("items")
+        row_hash = record_hash(rec)
+        prev = current.get(slug)
+        if prev is not None and prev[1] == row_hash:
+            stats["unchanged"] += 1
+            continue
+        if prev is not None:
+            closes.append((ts, prev[0]))
+            stats["changed"] += 1
+        else:
+            stats["added"] += 1
+        inserts.append((
+            slug,
+            *(extract(rec) for _, extract in dim.columns),
+            canonical_json(rec).decode("utf-8"),
+            row_hash,
+            ts,
+        ))
+
+    for slug, (version_id, _) in current.items():
+        if slug not in seen:
+            closes.append((ts, version_id))
+            stats["removed"] += 1
+
+    columns = [dim.key, *(name for name, _ in dim.columns), "record_json", "row_hash", "valid_from"]
+    conn.executemany(f"UPDATE {dim.table} SET valid_to = ?, is_current = 0 WHERE version_id = ?", closes)
+    conn.executemany(
+        f"INSERT INTO {dim.table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        inserts,
+    )
+    m.incr("bytes_read", path.stat().st_size)
+    return stats
+
+
+def apply_snapshot(conn: sqlite3.Connection, snapshot_dir: Path, ts: int) -> Optional[Dict[str, Dict[str, int]]]:
+    """
+    Apply one bronze snapshot as of `ts` in a single transaction. Returns the
+    per-entity stats, or None when the snapshot was already applied.
+    """
+    applied = applied_snapshots(conn)
+    if ts in applied:
+        log.info(f"Snapshot {ts} already applied from {applied[ts]}; skipping")
+        return None
+    if applied and ts < max(applied):
+        raise ValueError(f"Snapshot {ts} is older than the latest applied ({max(applied)}); rerun with --rebuild")
+
+    summary: Dict[str, Dict[str, int]] = {}
+    with conn:
+        for entity in DIMENSIONS:
+            path = snapshot_file(snapshot_dir, entity)
+            if not path.exists():
+                # A missing file is not evidence that every entity was removed
+                log.warning(f"Skipping {entity} for snapshot {ts}: missing {path}")
+                continue
+            summary[entity] = _apply_entity(conn, entity, path, ts)
+        conn.execute(
+            "INSERT INTO scd_snapshots (ts, source, applied_at, stats_json) VALUES (?, ?, ?, ?)",
+            (ts, str(snapshot_dir), int(time.time()), json.dumps(summary)),
+        )
+    log.info(f"Applied snapshot {ts} from {snapshot_dir}", extra={e: s for e, s in summary.items()})
+    return summary
+
+
+def latest_extract_ts(runs_dir: Path = metrics.RUNS_DIR) -> Optional[int]:
+    """
+    Run ts of the newest successful detail extract, from its run report.
+    """
+    found = []
+    for script in EXTRACT_SCRIPTS:
+        for path in runs_dir.glob(f"*_{script}.json"):
+            stem = path.name[: -len(f"_{script}.json")]
+            if stem.isdigit():
+                found.append((int(stem), path))
+    for ts, path in sorted(found, reverse=True):
+        try:
+            report = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        if report.get("status") == "ok":
+            return int(report.get("run_ts") or ts)
+    return None
+
+
+def current_bronze_ts(snapshot_dir: Path = BRONZE_DIR) -> Optional[int]:
+    """
+    Run ts for the current bronze dir: the extract run that wrote it. A file
+    mtime changes whenever a file is copied or rewritten, so it is only the
+    fallback (no run reports, or a directory other than BRONZE_DIR).
+    """
+    if snapshot_dir == BRONZE_DIR:
+        ts = latest_extract_ts()
+        if ts is not None:
+            return ts
+    mtimes = [
+        int(snapshot_file(snapshot_dir, entity).stat().st_mtime)
+        for entity in ENTITY_FILES
+        if snapshot_file(snapshot_dir, entity).exists()
+    ]
+    return max(mtimes) if mtimes else None
+
+
+def pending_snapshots(conn: sqlite3.Connection, include_current: bool = True) -> List[Tuple[int, Path]]:
+    """
+    History snapshots not applied yet, followed by the current bronze dir when
+    it is newer than everything applied. History snapshots older than the
+    latest applied one cannot be applied in order and are skipped.
+    """
+    applied = applied_snapshots(conn)
+    latest_applied = max(applied, default=None)
+    pending = []
+    for ts, path in history_snapshots():
+        if ts in applied:
+            continue
+        if latest_applied is not None and ts < latest_applied:
+            log.warning(f"Skipping history snapshot {ts}: older than the latest applied ({latest_applied}); "
+                        "apply it with --rebuild")
+            metrics.current().incr("skipped_out_of_order")
+            continue
+        pending.append((ts, path))
+    if include_current:
+        ts = current_bronze_ts()
+        latest = max([*applied, *(t for t, _ in pending)], default=None)
+        if ts is not None and (latest is None or ts > latest):
+            pending.append((ts, BRONZE_DIR))
+    return pending
+
+
+# --- Queries ---
+
+def parse_as_of(value: str) -> int:
+    """
+    Epoch seconds, or an ISO date/datetime (UTC unless it carries an offset).
+    """
+    if value.isdigit():
+        return int(value)
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+    return {
+        "slug": row[0],
+        "valid_from": row["valid_from"],
+        "valid_to": row["valid_to"],
+        "record": json.loads(row["record_json"]),
+    }
+
+
+def as_of(conn: sqlite3.Connection, entity: str, ts: int, slug: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    The version of each entity (or of one slug) that was valid at `ts`.
+    """
+    dim = DIMENSIONS[entity]
+    query = (
+        f"SELECT {dim.key}, valid_from, valid_to, record_json FROM {dim.table} "
+        "WHERE valid_from <= ? AND (valid_to IS NULL OR valid_to > ?)"
+    )
+    params: Tuple[Any, ...] = (ts, ts)
+    if slug is not None:
+        query += f" AND {dim.key} = ?"
+        params += (slug,)
+    return [_row_to_dict(row) for row in conn.execute(query + f" ORDER BY {dim.key}", params)]
+
+
+def versions(conn: sqlite3.Connection, entity: str, slug: str) -> List[Dict[str, Any]]:
+    dim = DIMENSIONS[entity]
+    rows = conn.execute(
+        f"SELECT {dim.key}, valid_from, valid_to, record_json FROM {dim.table} WHERE {dim.key} = ? ORDER BY valid_from",
+        (slug,),
+    )
+    return [_row_to_dict(row) for row in rows]
+
+
+# --- Main ---
+
+def run(db_path: Path = DB_PATH, snapshot: Optional[str] = None, ts: Optional[int] = None,
+        rebuild: bool = False, include_current: bool = True, upload: bool = True):
+    m = metrics.current()
+    if rebuild and db_path.exists():
+        log.info(f"Rebuilding {db_path}")
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+
+    conn = connect(db_path)
+    try:
+        if snapshot:
+            snapshot_dir = Path(snapshot)
+            snapshot_at = ts or snapshot_ts(snapshot_dir) or current_bronze_ts(snapshot_dir)
+            if snapshot_at is None:
+                raise FileNotFoundError(f"No bronze files in {snapshot_dir}")
+            pending = [(snapshot_at, snapshot_dir)]
+        else:
+            pending = pending_snapshots(conn, include_current=include_current)
+
+        summary: Dict[int, Any] = {}
+        with m.stage("apply"):
+            for snapshot_at, snapshot_dir in pending:
+                stats = apply_snapshot(conn, snapshot_dir, snapshot_at)
+                if stats is not None:
+                    summary[snapshot_at] = stats
+        if not summary:
+            log.info("No new snapshots to apply")
+            return
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    size = db_path.stat().st_size
+    m.incr("bytes_written", size)
+    m.extra["applied"] = summary
+    if upload:
+        try:
+            with m.stage("upload"):
+                s3.upload_file(str(db_path), BUCKET, DB_S3_KEY, ExtraArgs={"ContentType": "application/vnd.sqlite3"})
+            m.incr("bytes_uploaded", size)
+        except Exception as e:
+            m.incr("errors")
+            log.warning(f"Failed to upload SCD history to S3: {e}")
+
+
+def _print_rows(rows: Iterable[Dict[str, Any]]) -> None:
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query SCD2 history for companies and people.")
+    parser.add_argument("--db", type=Path, default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_apply = sub.add_parser("apply", help="Apply new bronze snapshots")
+    p_apply.add_argument("--snapshot", default=None, metavar="DIR", help="Apply just this snapshot directory")
+    p_apply.add_argument("--ts", type=int, default=None, help="Snapshot time for --snapshot (default: dir name, extract run ts or file mtime)")
+    p_apply.add_argument("--rebuild", action="store_true", help="Drop the database and replay all snapshots")
+    p_apply.add_argument("--history-only", action="store_true", help="Do not apply the current bronze dir")
+    p_apply.add_argument("--no-upload", action="store_true", help="Do not mirror the database to S3")
+
+    p_as_of = sub.add_parser("as-of", help="Print the versions valid at a point in time (NDJSON)")
+    p_as_of.add_argument("when", help="Epoch seconds or ISO date/datetime (UTC)")
+    p_as_of.add_argument("--entity", choices=sorted(DIMENSIONS), default="companies")
+    p_as_of.add_argument("--slug", default=None)
+
+    p_versions = sub.add_parser("versions", help="Print every version of one entity (NDJSON)")
+    p_versions.add_argument("entity", choices=sorted(DIMENSIONS))
+    p_versions.add_argument("slug")
+
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    if args.command == "apply":
+        if args.ts is not None and not args.snapshot:
+            parser.error("--ts requires --snapshot")
+        with metrics.run_report("scd_history") as m, profiling.profile_from_args(m, args):
+            run(
+                db_path=args.db,
+                snapshot=args.snapshot,
+                ts=args.ts,
+                rebuild=args.rebuild,
+                include_current=not args.history_only,
+                upload=not args.no_upload,
+            )
+        return
+
+    if not args.db.exists():
+        parser.error(f"{args.db} does not exist; run `apply` first")
+    conn = connect(args.db)
+    try:
+        if args.command == "as-of":
+            _print_rows(as_of(conn, args.entity, parse_as_of(args.when), slug=args.slug))
+        else:
+            _print_rows(versions(conn, args.entity, args.slug))
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
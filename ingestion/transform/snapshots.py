@@ -0,0 +1,167 @@
+"""
+Reading bronze snapshots for the transform stages.
+
+A bronze snapshot is one directory holding companies_enriched.json and
+people_enriched.json. The current one is data_staging/bronze/, and the
+backfilled ones live under data_staging/bronze/history/<ts>/.
+iter_json_array() streams records out of those JSON arrays one at a time,
+so memory is bounded by the largest record rather than the file, and
+write_json_array() is the matching writer.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from vceamless import jsoncodec
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+BRONZE_DIR = BASE_DIR / "data_staging" / "bronze"
+HISTORY_DIR = BRONZE_DIR / "history"
+
+# Entity name -> enriched bronze file name
+ENTITY_FILES = {
+    "companies": "companies_enriched.json",
+    "people": "people_enriched.json",
+}
+
+READ_CHUNK_CHARS = 1 << 16
+
+_decoder = json.JSONDecoder()
+
+
+def iter_json_array(path: Path, chunk_chars: int = READ_CHUNK_CHARS) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array without loading the file.
+    """
+    with path.open("r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_chars)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws() -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        skip_ws()
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos += 1
+
+        while True:
+            skip_ws()
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if buf[pos] == "]":
+                return
+            if buf[pos] == ",":
+                pos += 1
+                skip_ws()
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # Element continues past the buffer; read more and retry
+                    if eof or not fill():
+                        raise
+                    continue
+                # A number at the very end of the buffer may be cut short
+                if end == len(buf) and not eof and fill():
+                    continue
+                pos = end
+                yield value
+                break
+
+
+def tee_json_array(path: Path, records: Iterable[Any]) -> Iterator[Any]:
+    """
+    Yield each record after appending it to a JSON array at `path`, so a
+    consumer (e.g. a crawl's fetch queue) sees records while the file is
+    still being written. The file goes through a temp file and only replaces
+    `path` once `records` is exhausted; if iteration stops early the temp
+    file is removed and `path` is left untouched.
+    """
+    tmp = path.with_name(f".{path.name}.tmp")
+    n = 0
+    try:
+        with tmp.open("wb") as f:
+            for value in records:
+                f.write(b",\n  " if n else b"[\n  ")
+                # Newlines only come from the indentation; strings escape theirs
+                f.write(jsoncodec.dumps(value, indent=True).replace(b"\n", b"\n  "))
+                n += 1
+                yield value
+            f.write(b"\n]" if n else b"[]")
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, path)
+
+
+def write_json_array(path: Path, records: Iterable[Any]) -> Tuple[int, int]:
+    """
+    Write records to a JSON array one at a time, through a temp file and
+    os.replace. The bytes match json.dump(list(records), f, indent=2,
+    ensure_ascii=False). Returns (records, bytes) written.
+    """
+    n = sum(1 for _ in tee_json_array(path, records))
+    return n, path.stat().st_size
+
+
+def canonical_json(value: Any) -> bytes:
+    # Always stdlib json: record hashes must not change with the codec backend
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def record_hash(value: Any) -> bytes:
+    """
+    Stable 16-byte digest of a JSON value (key order does not matter).
+    """
+    return hashlib.blake2b(canonical_json(value), digest_size=16).digest()
+
+
+def snapshot_file(snapshot_dir: Path, entity: str) -> Path:
+    return snapshot_dir / ENTITY_FILES[entity]
+
+
+def history_snapshots() -> List[Tuple[int, Path]]:
+    """
+    Completed backfilled snapshots (those with _SUCCESS), oldest first.
+    """
+    if not HISTORY_DIR.exists():
+        return []
+    found = [
+        (int(p.name), p)
+        for p in HISTORY_DIR.iterdir()
+        if p.is_dir() and p.name.isdigit() and (p / "_SUCCESS").exists()
+    ]
+    return sorted(found)
+
+
+def snapshot_ts(snapshot_dir: Path) -> Optional[int]:
+    """
+    Run ts of a history snapshot directory (None for the current bronze dir).
+    """
+    return int(snapshot_dir.name) if snapshot_dir.name.isdigit() else None
+
+
+def load_records_by_slug(path: Path) -> Dict[str, Dict[str, Any]]:
+    return {rec["slug"]: rec for rec in iter_json_array(path) if rec.get("slug")}
@@ -14,12 +14,13 @@ The "salesforce" value is itself a JSON string containing the SF fields.
 
 from __future__ import annotations
 
-import json
 import os
 from typing import Dict, Any
 
 import boto3
 
+from vceamless import jsoncodec
+
 
 # Default secret id + region can be overridden via env vars
 DEFAULT_SECRET_ID = os.getenv("SF_SECRET_ID", "dev/vceamless")
@@ -46,8 +47,8 @@ def load_raw_secret(secret_id: str | None = None, region_name: str | None = None
         raise ValueError(f"Secret {sid!r} does not contain a SecretString")
 
     try:
-        outer = json.loads(secret_string)
-    except json.JSONDecodeError as e:
+        outer = jsoncodec.loads(secret_string)
+    except jsoncodec.JSONDecodeError as e:
         raise ValueError(f"Secret {sid!r} SecretString is not valid JSON") from e
 
     if not isinstance(outer, dict):
@@ -70,8 +71,8 @@ def load_salesforce_raw(secret_id: str | None = None, region_name: str | None =
         sf_raw = outer["salesforce"]
         if isinstance(sf_raw, str):
             try:
-                sf_dict = json.loads(sf_raw)
-            except json.JSONDecodeError as e:
+                sf_dict = jsoncodec.loads(sf_raw)
+            except jsoncodec.JSONDecodeError as e:
                 raise ValueError("The 'salesforce' value is not valid JSON") from e
         elif isinstance(sf_raw, dict):
             sf_dict = sf_raw
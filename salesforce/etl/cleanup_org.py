@@ -9,7 +9,12 @@ It safely:
 - Deletes in correct dependency order
 """
 
+import argparse
+
 from salesforce.client.session import get_salesforce_client
+from vceamless import logs, metrics, profiling
+
+log = logs.get_logger("cleanup_org")
 
 DEPENDENCY_ORDER = [
     ("Opportunity", "SELECT Id FROM Opportunity"),
@@ -21,8 +26,11 @@ DEPENDENCY_ORDER = [
     ("Event", "SELECT Id FROM Event"),
 ]
 
-def main():
-    sf = get_salesforce_client()
+def run():
+    m = metrics.current()
+
+    with m.stage("connect"):
+        sf = get_salesforce_client()
 
     print("Connected. Checking record counts...\n")
 
@@ -30,11 +38,13 @@ def main():
 
     for obj, soql in DEPENDENCY_ORDER:
         try:
-            result = sf.query_all(soql)
+            with m.stage("query"):
+                result = sf.query_all(soql)
             ids = [r["Id"] for r in result.get("records", [])]
             counts[obj] = ids
             print(f"{obj}: {len(ids)} record(s)")
         except Exception as e:
+            m.incr("errors")
             print(f"{obj}: error querying ({e})")
 
     print("\n--- SUMMARY ---")
@@ -46,18 +56,35 @@ def main():
         print("Aborted.")
         return
 
-    print("\nDeleting records...")
+    log.info("Deleting records...")
     for obj, ids in counts.items():
         if not ids:
             continue
-        print(f"Deleting from {obj}...")
+        log.info(f"Deleting from {obj}...")
+        progress = logs.Progress(log, f"delete {obj}", total=len(ids))
         for Id in ids:
             try:
-                getattr(sf, obj).delete(Id)
+                with m.stage("delete"):
+                    getattr(sf, obj).delete(Id)
+                m.incr("items")
+                progress.update(outcome="deleted")
             except Exception as e:
-                print(f"  Error deleting {Id}: {e}")
+                m.incr("errors")
+                progress.update(outcome="failed")
+                log.error("Error deleting record", extra={"object": obj, "id": Id, "error": str(e)})
+        progress.finish()
+
+    log.info("Cleanup completed.")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Delete demo data from the Salesforce dev org.")
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
 
-    print("\nCleanup completed.")
+    with metrics.run_report("cleanup_org") as m, profiling.profile_from_args(m, args):
+        run()
 
 if __name__ == "__main__":
     main()
@@ -8,14 +8,17 @@ Quick connectivity test to the Salesforce dev org.
 
 from __future__ import annotations
 
-from typing import List, Dict, Any
+import argparse
+from typing import List, Dict, Any, Optional
 
 from salesforce.client.session import get_salesforce_client
+from vceamless import logs, metrics, profiling
 
 # --- New Constant Defined Here ---
 # Define a module-level constant for the default number of sample records.
 # This follows the Python convention of using ALL_CAPS for constants.
 DEFAULT_RECORD_LIMIT = 25
+log = logs.get_logger("test_connection")
 
 # -----------------------------------
 
@@ -27,52 +30,74 @@ def summarize_records(records: List[Dict[str, Any]], fields: List[str], max_rows
     """
     for i, rec in enumerate(records[:max_rows], start=1):
         summary = ", ".join(f"{f}={rec.get(f)!r}" for f in fields)
-        print(f"  [{i}] {summary}")
+        log.info(f"  [{i}] {summary}")
 
 
-def main(record_limit: int = DEFAULT_RECORD_LIMIT):
+def run(record_limit: int = DEFAULT_RECORD_LIMIT):
     """
-    The main function now accepts an optional record_limit argument
-    that defaults to the module constant.
+    Run the test queries, recording stage timings into the active run metrics.
     """
-    print("Creating Salesforce client...")
-    sf = get_salesforce_client()
+    m = metrics.current()
+
+    log.info("Creating Salesforce client...")
+    with m.stage("connect"):
+        sf = get_salesforce_client()
 
-    print("Successfully connected. Running test queries...\n")
-    print(f"Using a record limit of **{record_limit}** for all queries.")
+    log.info("Successfully connected. Running test queries...")
+    log.info(f"Using a record limit of **{record_limit}** for all queries.")
 
     # Test 1: Accounts (companies)
     try:
         # --- SOQL query uses an f-string to insert the variable ---
         account_query = f"SELECT Id, Name FROM Account LIMIT {record_limit}"
-        print(f"Running Account query: {account_query}")
-        result = sf.query(account_query)
+        log.info(f"Running Account query: {account_query}")
+        with m.stage("query"):
+            result = sf.query(account_query)
         records = result.get("records", [])
-        print(f"Retrieved {len(records)} Account record(s).")
+        m.incr("items", len(records))
+        log.info(f"Retrieved {len(records)} Account record(s).")
         # --- Pass the limit to summarize_records to ensure consistency ---
         summarize_records(records, ["Id", "Name"], max_rows=record_limit)
-        print()
     except Exception as e:
-        print(f"[ERROR] Failed to query Account: {e}")
+        m.incr("errors")
+        log.error(f"Failed to query Account: {e}")
 
     # Test 2: Contacts (people)
     try:
         # --- SOQL query uses an f-string to insert the variable ---
         contact_query = f"SELECT Id, FirstName, LastName, Name FROM Contact LIMIT {record_limit}"
-        print(f"Running Contact query: {contact_query}")
-        result = sf.query(contact_query)
+        log.info(f"Running Contact query: {contact_query}")
+        with m.stage("query"):
+            result = sf.query(contact_query)
         records = result.get("records", [])
-        print(f"Retrieved {len(records)} Contact record(s).")
+        m.incr("items", len(records))
+        log.info(f"Retrieved {len(records)} Contact record(s).")
         # --- Pass the limit to summarize_records to ensure consistency ---
         summarize_records(records, ["Id", "FirstName", "LastName", "Name"], max_rows=record_limit)
-        print()
     except Exception as e:
-        print(f"[ERROR] Failed to query Contact: {e}")
+        m.incr("errors")
+        log.error(f"Failed to query Contact: {e}")
+
+    log.info("Test connection script completed.")
+
+
+def main(record_limit: int = DEFAULT_RECORD_LIMIT, argv: Optional[List[str]] = None):
+    """
+    The main function now accepts an optional record_limit argument
+    that defaults to the module constant (overridable with --record-limit).
+    """
+    parser = argparse.ArgumentParser(description="Quick connectivity test to the Salesforce dev org.")
+    parser.add_argument("--record-limit", type=int, default=record_limit)
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
 
-    print("Test connection script completed.")
+    with metrics.run_report("test_connection") as m, profiling.profile_from_args(m, args):
+        run(args.record_limit)
 
 
 if __name__ == "__main__":
     # To customize the limit when running the script:
-    # main(record_limit={user defined limit}) 
+    # main(record_limit={user defined limit})  or  --record-limit N
     main()
\ No newline at end of file
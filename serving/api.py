@@ -0,0 +1,358 @@
+"""
+Local read-only HTTP API over the bronze outputs (asyncio, stdlib only).
+
+  python -m serving.api [--host 127.0.0.1] [--port 8080]
+
+Endpoints (GET/HEAD, JSON):
+
+  /health
+  /stats
+  /companies?status=&status_detail=&fund=&theme=&partner=&limit=&offset=
+  /companies/<slug>
+  /companies/<slug>/partners
+  /people?company=&status=&fund=&theme=&limit=&offset=
+  /people/<slug>
+  /people/<slug>/portfolio?status=&fund=&theme=
+  /search?q=&kind=company|person&limit=
+
+fund/theme may repeat (all must match); status/status_detail may repeat
+(any may match).
+
+Queries are answered by QueryEngine (and SearchIndex for /search) held in
+one immutable _State. The engine keeps the snapshot as slotted records;
+responses convert them back to the bronze JSON shape. A response body is rendered once, stored in the
+state's LRU cache with a content-hash ETag, and served from there after
+that. If-None-Match gives a 304.
+
+The data version is the (size, mtime) of companies_enriched.json,
+people_enriched.json and search.idx. Every extract run rewrites those
+files, so they act as the run manifest. A background task polls them. On
+a change it builds a fresh engine in a worker thread and swaps _State in
+one assignment, so in-flight requests finish on the old data and the old
+cache is dropped with it.
+"""
+
+import argparse
+import asyncio
+import hashlib
+from collections import OrderedDict
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from ingestion.extract.records import Record
+from ingestion.transform.snapshots import BRONZE_DIR, ENTITY_FILES
+from serving.query_engine import QueryEngine
+from serving.search_index import INDEX_PATH, SearchIndex, search_paths
+from vceamless import jsoncodec, logs
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_RELOAD_INTERVAL_S = 2.0
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_HEADER_LINES = 100
+
+COMPANY_SUMMARY_FIELDS = ("slug", "name", "status", "status_detail", "fund_tags", "theme_tags", "website_url")
+PERSON_SUMMARY_FIELDS = ("slug", "name", "detail_title", "location")
+
+log = logs.get_logger("api")
+
+
+class ApiError(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def data_version(bronze_dir: Path, index_path: Path) -> str:
+    """
+    Fingerprint of the files the API serves; changes whenever a run rewrites one.
+    """
+    parts = []
+    for path in [bronze_dir / name for name in ENTITY_FILES.values()] + [index_path]:
+        try:
+            st = path.stat()
+            parts.append(f"{path.name}:{st.st_size}:{st.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{path.name}:-")
+    return hashlib.blake2b("|".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class _State:
+    """
+    One loaded version of the data plus its response cache.
+    """
+
+    def __init__(self, version: str, engine: QueryEngine, search: Optional[SearchIndex], cache_size: int) -> None:
+        self.version = version
+        self.engine = engine
+        self.search = search
+        self.cache: "OrderedDict[str, Tuple[int, bytes, str]]" = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, key: str) -> Optional[Tuple[int, bytes, str]]:
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.cache.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def store(self, key: str, entry: Tuple[int, bytes, str]) -> None:
+        self.cache[key] = entry
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def close(self) -> None:
+        if self.search is not None:
+            self.search.close()
+
+
+def _load_state(bronze_dir: Path, index_path: Path, cache_size: int) -> _State:
+    version = data_version(bronze_dir, index_path)
+    engine = QueryEngine.load(bronze_dir)
+    search = SearchIndex(index_path) if index_path.exists() else None
+    return _State(version, engine, search, cache_size)
+
+
+# --- Routing ---
+
+def _one(params: Dict[str, List[str]], name: str) -> Optional[str]:
+    values = params.get(name)
+    return values[-1] if values else None
+
+
+def _int(params: Dict[str, List[str]], name: str, default: int, maximum: int) -> int:
+    raw = _one(params, name)
+    if raw is None:
+        return default
+    if not raw.isdigit():
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be a non-negative integer")
+    return min(int(raw), maximum)
+
+
+def _company_filters(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    return {
+        "status": params.get("status"),
+        "status_detail": params.get("status_detail"),
+        "fund_tags": params.get("fund"),
+        "theme_tags": params.get("theme"),
+    }
+
+
+def _summary(rec: Record, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    return {f: rec.get(f) for f in fields}
+
+
+def _page(items: List[Record], fields: Tuple[str, ...], params: Dict[str, List[str]]) -> Dict[str, Any]:
+    limit = _int(params, "limit", DEFAULT_LIMIT, MAX_LIMIT)
+    offset = _int(params, "offset", 0, len(items))
+    return {
+        "count": len(items),
+        "offset": offset,
+        "items": [_summary(rec, fields) for rec in items[offset:offset + limit]],
+    }
+
+
+def route(state: _State, path: str, params: Dict[str, List[str]]) -> Any:
+    engine = state.engine
+    parts = [unquote(p) for p in path.strip("/").split("/") if p]
+
+    if parts == ["health"]:
+        return {"status": "ok", "version": state.version}
+    if parts == ["stats"]:
+        return {
+            "version": state.version,
+            "companies": len(engine.companies),
+            "people": len(engine.people),
+            "search_index": state.search is not None,
+            "cache": {"entries": len(state.cache), "hits": state.hits, "misses": state.misses},
+        }
+
+    if parts and parts[0] == "companies":
+        if len(parts) == 1:
+            return _page(engine.find_companies(partner=_one(params, "partner"), **_company_filters(params)),
+                         COMPANY_SUMMARY_FIELDS, params)
+        company = engine.company(parts[1])
+        if company is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown company {parts[1]!r}")
+        if len(parts) == 2:
+            partners = engine.find_people(company=parts[1])
+            return {**company.to_dict(), "partners": [p.slug for p in partners]}
+        if parts[2:] == ["partners"]:
+            return _page(engine.find_people(company=parts[1]), PERSON_SUMMARY_FIELDS, params)
+
+    if parts and parts[0] == "people":
+        if len(parts) == 1:
+            filters = {k: v for k, v in _company_filters(params).items() if v}
+            return _page(engine.find_people(company=_one(params, "company"), **filters),
+                         PERSON_SUMMARY_FIELDS, params)
+        person = engine.person(parts[1])
+        if person is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown person {parts[1]!r}")
+        if len(parts) == 2:
+            return person.to_dict()
+        if parts[2:] == ["portfolio"]:
+            return _page(engine.find_companies(partner=parts[1], **_company_filters(params)),
+                         COMPANY_SUMMARY_FIELDS, params)
+
+    if parts == ["search"]:
+        if state.search is None:
+            raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, "No search index; run serving.search_index build")
+        query = _one(params, "q")
+        if not query:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "q is required")
+        kind = _one(params, "kind")
+        if kind not in (None, "company", "person"):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "kind must be company or person")
+        hits = state.search.search(query, kind=kind, limit=_int(params, "limit", 10, MAX_LIMIT))
+        return {"items": [{"kind": k, "slug": s, "score": round(score, 4)} for k, s, score in hits]}
+
+    raise ApiError(HTTPStatus.NOT_FOUND, f"No route for {path}")
+
+
+# --- HTTP ---
+
+def _render(status: HTTPStatus, payload: Any) -> Tuple[int, bytes, str]:
+    body = jsoncodec.dumps(payload)
+    etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+    return status.value, body, etag
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines += [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class ApiServer:
+    def __init__(self, bronze_dir: Path = BRONZE_DIR, index_path: Path = INDEX_PATH,
+                 cache_size: int = DEFAULT_CACHE_SIZE, reload_interval: float = DEFAULT_RELOAD_INTERVAL_S) -> None:
+        self.bronze_dir = bronze_dir
+        self.index_path = index_path
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.state = _load_state(bronze_dir, index_path, cache_size)
+
+    def respond(self, target: str, if_none_match: Optional[str]) -> Tuple[int, bytes, str]:
+        state = self.state  # one read: the whole request sees one version
+        entry = state.cached(target)
+        if entry is None:
+            url = urlsplit(target)
+            try:
+                entry = _render(HTTPStatus.OK, route(state, url.path, parse_qs(url.query)))
+                state.store(target, entry)
+            except ApiError as e:
+                return _render(e.status, {"error": str(e)})
+            except Exception:
+                # A bug in one route should cost that request, not the connection
+                log.exception("Unhandled error", extra={"target": target})
+                return _render(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "internal server error"})
+        if if_none_match is not None and entry[2] in [t.strip() for t in if_none_match.split(",")]:
+            return HTTPStatus.NOT_MODIFIED.value, b"", entry[2]
+        return entry
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(_head(400, {"Content-Length": "0", "Connection": "close"}))
+                    break
+
+                headers: Dict[str, str] = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("content-length", "0").isdigit() and int(headers.get("content-length", "0")):
+                    await reader.readexactly(int(headers["content-length"]))
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive")
+                if method not in ("GET", "HEAD"):
+                    status, body, etag = _render(HTTPStatus.METHOD_NOT_ALLOWED, {"error": "read-only API"})
+                else:
+                    status, body, etag = self.respond(target, headers.get("if-none-match"))
+
+                out_headers = {
+                    "Content-Type": "application/json",
+                    "Content-Length": str(len(body)),
+                    "ETag": etag,
+                    "Cache-Control": "no-cache",
+                    "Connection": "keep-alive" if keep_alive else "close",
+                }
+                writer.write(_head(status, out_headers))
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def watch(self) -> None:
+        """
+        Poll the data version and swap in a freshly built state on change.
+        """
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            version = data_version(self.bronze_dir, self.index_path)
+            if version == self.state.version:
+                continue
+            try:
+                state = await asyncio.to_thread(_load_state, self.bronze_dir, self.index_path, self.cache_size)
+            except Exception as e:
+                # Likely caught a file mid-write; retry on the next tick
+                log.warning(f"Reload failed; keeping version {self.state.version}: {e}")
+                continue
+            old, self.state = self.state, state
+            log.info(f"Reloaded data version {old.version} -> {state.version}",
+                     extra={"companies": len(state.engine.companies), "people": len(state.engine.people)})
+            # respond() never awaits, so no request is still reading the old state
+            old.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        log.info(f"Serving on http://{host}:{port}", extra={"version": self.state.version})
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.watch())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the bronze outputs over a local read-only HTTP API.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE, help="Cached responses (LRU)")
+    parser.add_argument("--reload-interval", type=float, default=DEFAULT_RELOAD_INTERVAL_S,
+                        help="Seconds between data file checks")
+    logs.add_logging_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    index_path, _ = search_paths(args.bronze_dir)
+    server = ApiServer(args.bronze_dir, index_path, args.cache_size, args.reload_interval)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
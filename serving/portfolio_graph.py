@@ -0,0 +1,633 @@
+"""
+Person <-> company graph in compressed sparse row form, with materialized
+partner/portfolio aggregates.
+
+  python -m serving.portfolio_graph build                     # from the current bronze files
+  python -m serving.portfolio_graph apply data_staging/bronze/changes/people_A__B.ndjson ...
+  python -m serving.portfolio_graph top-partners [--active] [--limit 10]
+  python -m serving.portfolio_graph top-pairs [--limit 10]
+  python -m serving.portfolio_graph co-investors <person-slug>
+
+Nodes get dense integer ids. The edges (people_enriched.portfolio_companies,
+i.e. ADR-0002's PersonCompany__c) are held in CSR form in both directions:
+
+  person_indptr[P + 1], person_indices[E]     companies of person p:
+                                              person_indices[person_indptr[p]:person_indptr[p + 1]]
+  company_indptr[C + 1], company_indices[E]   people of company c, same shape
+
+Company attributes are array columns. status and status_detail are
+vocabulary codes (0 = missing). fund and theme tags are u64 bitmasks over
+their vocabularies. Companies that only appear in a portfolio list are kept
+as nodes, with attributes read from the link's tags and present = 0. A
+company that drops out of companies_enriched.json keeps its last known
+attributes and is also marked present = 0.
+
+Four aggregates are materialized: portfolio size and active portfolio size per
+person, partner count per company, and co-investment counts per partner
+pair. apply_events() takes a diff_bronze_snapshots change feed and updates
+these aggregates by delta. A new snapshot therefore costs work proportional
+to the edges that changed, and the pair counts are never recomputed.
+
+Filter queries build a bitset of matching companies (a Python int) and
+intersect it with each person's row bitset. The per-value bitsets are built
+once per graph version, so a filter is a few big-int ANDs plus one popcount
+per person, with no per-company Python loop.
+"""
+
+import argparse
+import array
+import json
+import os
+import struct
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ingestion.extract.extract_companies_list import classify_tags
+from ingestion.transform.snapshots import BRONZE_DIR, iter_json_array, snapshot_file
+from vceamless import jsoncodec, logs, metrics, profiling
+
+GRAPH_DIR = BRONZE_DIR / "graph"
+GRAPH_PATH = GRAPH_DIR / "portfolio_graph.bin"
+
+MAGIC = b"VCGRAPH1"
+FOOTER = struct.Struct("<8sQQ")
+MAX_TAGS = 64  # width of the tag bitmask columns
+
+ACTIVE = "active"
+
+# Column name -> array typecode
+COLUMNS = {
+    "person_indptr": "I",
+    "person_indices": "I",
+    "company_indptr": "I",
+    "company_indices": "I",
+    "status": "H",
+    "status_detail": "H",
+    "fund_bits": "Q",
+    "theme_bits": "Q",
+    "present": "B",
+    "portfolio_count": "I",
+    "active_count": "I",
+    "partner_count": "I",
+    "pair_a": "I",
+    "pair_b": "I",
+    "pair_n": "I",
+}
+# Fields whose change can move a company in or out of a filter
+ATTRIBUTE_FIELDS = ("status", "status_detail", "fund_tags", "theme_tags")
+
+log = logs.get_logger("portfolio_graph")
+
+
+class Vocab:
+    """
+    String <-> small int codes; code 0 is reserved for "missing".
+    """
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: List[str] = [""]
+        self.codes: Dict[str, int] = {}
+        for v in values:
+            self.code(v)
+
+    def code(self, value: Optional[str]) -> int:
+        if not value:
+            return 0
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def bits(self, values: Iterable[str]) -> int:
+        mask = 0
+        for v in values or ():
+            code = self.code(v)
+            if code > MAX_TAGS:
+                raise ValueError(f"More than {MAX_TAGS} distinct tags; widen the bitmask columns")
+            mask |= 1 << (code - 1)
+        return mask
+
+    def names(self, mask: int) -> List[str]:
+        return [self.values[i + 1] for i in range(mask.bit_length()) if mask >> i & 1]
+
+
+def _csr(rows: List[Set[int]]) -> Tuple[array.array, array.array]:
+    indptr = array.array("I", [0])
+    indices = array.array("I")
+    for row in rows:
+        indices.extend(sorted(row))
+        indptr.append(len(indices))
+    return indptr, indices
+
+
+def _pair(a: int, b: int) -> Tuple[int, int]:
+    return (a, b) if a < b else (b, a)
+
+
+class PortfolioGraph:
+    def __init__(self) -> None:
+        self.company_slugs: List[str] = []
+        self.person_slugs: List[str] = []
+        self.company_ids: Dict[str, int] = {}
+        self.person_ids: Dict[str, int] = {}
+        self.status_vocab = Vocab()
+        self.status_detail_vocab = Vocab()
+        self.fund_vocab = Vocab()
+        self.theme_vocab = Vocab()
+        self.cols: Dict[str, array.array] = {name: array.array(code) for name, code in COLUMNS.items()}
+        self.cols["person_indptr"].append(0)
+        self.cols["company_indptr"].append(0)
+        self.pairs: Dict[Tuple[int, int], int] = {}
+        self._row_bits: Optional[List[int]] = None
+        self._attr_bits: Optional[Dict[Tuple[str, int], int]] = None
+
+    # --- construction ---
+
+    @classmethod
+    def build(cls, companies: Iterable[Dict[str, Any]], people: Iterable[Dict[str, Any]]) -> "PortfolioGraph":
+        graph = cls()
+        portfolios: List[Set[int]] = []
+        for rec in companies:
+            if rec.get("slug"):
+                graph._set_company(rec, present=True)
+        for rec in people:
+            slug = rec.get("slug")
+            if not slug or slug in graph.person_ids:
+                continue
+            graph._add_person(slug)
+            portfolios.append({graph._company_for_link(link) for link in rec.get("portfolio_companies") or []
+                               if link.get("slug")})
+
+        partners: List[Set[int]] = [set() for _ in graph.company_slugs]
+        for person_id, row in enumerate(portfolios):
+            for company_id in row:
+                partners[company_id].add(person_id)
+        graph._freeze(portfolios, partners)
+        graph._recompute_aggregates()
+        return graph
+
+    def _add_company(self, slug: str) -> int:
+        company_id = self.company_ids.get(slug)
+        if company_id is None:
+            company_id = self.company_ids[slug] = len(self.company_slugs)
+            self.company_slugs.append(slug)
+            for name in ("status", "status_detail", "fund_bits", "theme_bits", "present", "partner_count"):
+                self.cols[name].append(0)
+        return company_id
+
+    def _add_person(self, slug: str) -> int:
+        person_id = self.person_ids[slug] = len(self.person_slugs)
+        self.person_slugs.append(slug)
+        self.cols["portfolio_count"].append(0)
+        self.cols["active_count"].append(0)
+        return person_id
+
+    def _set_company(self, rec: Dict[str, Any], present: bool) -> int:
+        company_id = self._add_company(rec["slug"])
+        c = self.cols
+        c["status"][company_id] = self.status_vocab.code(rec.get("status"))
+        c["status_detail"][company_id] = self.status_detail_vocab.code(rec.get("status_detail"))
+        c["fund_bits"][company_id] = self.fund_vocab.bits(rec.get("fund_tags"))
+        c["theme_bits"][company_id] = self.theme_vocab.bits(rec.get("theme_tags"))
+        c["present"][company_id] = 1 if present else 0
+        return company_id
+
+    def _company_for_link(self, link: Dict[str, Any]) -> int:
+        """
+        Node id for a portfolio link, creating a stub from its tags when the
+        company is not in companies_enriched.json.
+        """
+        company_id = self.company_ids.get(link["slug"])
+        if company_id is not None:
+            return company_id
+        status, fund_tags, theme_tags = classify_tags(link.get("tags") or [])
+        return self._set_company(
+            {"slug": link["slug"], "status": status, "fund_tags": fund_tags, "theme_tags": theme_tags},
+            present=False,
+        )
+
+    def _freeze(self, portfolios: List[Set[int]], partners: List[Set[int]]) -> None:
+        c = self.cols
+        c["person_indptr"], c["person_indices"] = _csr(portfolios)
+        c["company_indptr"], c["company_indices"] = _csr(partners)
+        self._row_bits = None
+        self._attr_bits = None
+
+    def _thaw(self) -> Tuple[List[Set[int]], List[Set[int]]]:
+        portfolios = [set(self.portfolio(p)) for p in range(len(self.person_slugs))]
+        partners = [set(self.partners(c)) for c in range(len(self.company_slugs))]
+        return portfolios, partners
+
+    def _recompute_aggregates(self) -> None:
+        c = self.cols
+        active = self.status_vocab.codes.get(ACTIVE, -1)
+        status = c["status"]
+        for p in range(len(self.person_slugs)):
+            row = self.portfolio(p)
+            c["portfolio_count"][p] = len(row)
+            c["active_count"][p] = sum(1 for company_id in row if status[company_id] == active)
+        pairs: Dict[Tuple[int, int], int] = defaultdict(int)
+        for company_id in range(len(self.company_slugs)):
+            people = self.partners(company_id)
+            c["partner_count"][company_id] = len(people)
+            for i, a in enumerate(people):
+                for b in people[i + 1:]:
+                    pairs[(a, b)] += 1
+        self.pairs = dict(pairs)
+
+    # --- incremental maintenance ---
+
+    def _is_active(self, company_id: int) -> bool:
+        return self.cols["status"][company_id] == self.status_vocab.codes.get(ACTIVE, -1)
+
+    def _link(self, portfolios, partners, person_id: int, company_id: int, sign: int) -> bool:
+        """
+        Add (sign > 0) or remove one edge. False when there was nothing to do.
+        """
+        c = self.cols
+        row, col = portfolios[person_id], partners[company_id]
+        if (company_id in row) == (sign > 0):
+            return False
+        if sign < 0:
+            row.discard(company_id)
+            col.discard(person_id)
+        for other in col:
+            key = _pair(person_id, other)
+            n = self.pairs.get(key, 0) + sign
+            if n:
+                self.pairs[key] = n
+            else:
+                self.pairs.pop(key, None)
+        if sign > 0:
+            row.add(company_id)
+            col.add(person_id)
+        c["portfolio_count"][person_id] += sign
+        c["partner_count"][company_id] += sign
+        if self._is_active(company_id):
+            c["active_count"][person_id] += sign
+        return True
+
+    def _update_company(self, partners, rec: Dict[str, Any], present: bool) -> None:
+        company_id = self.company_ids.get(rec["slug"])
+        was_active = company_id is not None and self._is_active(company_id)
+        company_id = self._set_company(rec, present)
+        if company_id >= len(partners):
+            partners.append(set())
+        delta = int(self._is_active(company_id)) - int(was_active)
+        if delta:
+            for person_id in partners[company_id]:
+                self.cols["active_count"][person_id] += delta
+
+    def apply_events(self, events: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Apply a change feed (see diff_bronze_snapshots) and update the
+        aggregates by delta.
+        """
+        portfolios, partners = self._thaw()
+        counts: Dict[str, int] = defaultdict(int)
+
+        def company_for_link(link):
+            company_id = self._company_for_link(link)
+            if company_id >= len(partners):
+                partners.append(set())
+            return company_id
+
+        for event in events:
+            op, entity, slug = event["op"], event["entity"], event["slug"]
+            counts[f"{entity}_{op}"] += 1
+            if entity == "companies":
+                if op == "added":
+                    self._update_company(partners, event["record"], present=True)
+                elif op == "removed":
+                    company_id = self.company_ids.get(slug)
+                    if company_id is not None:
+                        self.cols["present"][company_id] = 0
+                else:
+                    company_id = self.company_ids.get(slug)
+                    changed = {ch["field"]: ch for ch in event["changes"]}
+                    if company_id is None or not changed.keys() & set(ATTRIBUTE_FIELDS):
+                        continue
+                    rec = {"slug": slug, **self.company_attributes(company_id)}
+                    for field in ATTRIBUTE_FIELDS:
+                        if field in changed:
+                            rec[field] = changed[field].get("new")
+                    self._update_company(partners, rec, present=bool(self.cols["present"][company_id]))
+                continue
+
+            if op == "added":
+                # A removed person keeps its id with no edges, so a re-added
+                # slug gets its portfolio set to the record's links
+                person_id = self.person_ids.get(slug)
+                if person_id is None:
+                    person_id = self._add_person(slug)
+                    portfolios.append(set())
+                wanted = {company_for_link(link) for link in event["record"].get("portfolio_companies") or []
+                          if link.get("slug")}
+                for company_id in portfolios[person_id] - wanted:
+                    counts["edges_removed"] += self._link(portfolios, partners, person_id, company_id, -1)
+                for company_id in wanted:
+                    counts["edges_added"] += self._link(portfolios, partners, person_id, company_id, +1)
+            elif op == "removed":
+                person_id = self.person_ids.get(slug)
+                if person_id is not None:
+                    for company_id in list(portfolios[person_id]):
+                        counts["edges_removed"] += self._link(portfolios, partners, person_id, company_id, -1)
+            else:
+                person_id = self.person_ids.get(slug)
+                change = next((ch for ch in event["changes"] if ch["field"] == "portfolio_companies"), None)
+                if person_id is None or change is None:
+                    continue
+                if "added" in change:
+                    added = {link["slug"]: link for link in change["added"] if link.get("slug")}
+                    removed = {link["slug"] for link in change["removed"] if link.get("slug")}
+                else:  # the whole field appeared, vanished or changed type
+                    added = {link["slug"]: link for link in change.get("new") or [] if link.get("slug")}
+                    removed = {link["slug"] for link in change.get("old") or [] if link.get("slug")}
+                for company_slug in removed - added.keys():
+                    company_id = self.company_ids.get(company_slug)
+                    if company_id is not None:
+                        counts["edges_removed"] += self._link(portfolios, partners, person_id, company_id, -1)
+                for company_slug in added.keys() - removed:
+                    counts["edges_added"] += self._link(portfolios, partners, person_id,
+                                                        company_for_link(added[company_slug]), +1)
+
+        self._freeze(portfolios, partners)
+        return dict(counts)
+
+    # --- persistence ---
+
+    def save(self, path: Path = GRAPH_PATH) -> int:
+        pairs = sorted(self.pairs.items())
+        self.cols["pair_a"] = array.array("I", (a for (a, _), _ in pairs))
+        self.cols["pair_b"] = array.array("I", (b for (_, b), _ in pairs))
+        self.cols["pair_n"] = array.array("I", (n for _, n in pairs))
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        sections: Dict[str, List[int]] = {}
+        with tmp.open("wb") as f:
+            f.write(MAGIC)
+            for name in COLUMNS:
+                data = self.cols[name].tobytes()
+                sections[name] = [f.tell(), len(data)]
+                f.write(data)
+            index = json.dumps({
+                "format": "vceamless-portfolio-graph",
+                "version": 1,
+                "sections": sections,
+                "company_slugs": self.company_slugs,
+                "person_slugs": self.person_slugs,
+                "vocab": {
+                    "status": self.status_vocab.values[1:],
+                    "status_detail": self.status_detail_vocab.values[1:],
+                    "fund": self.fund_vocab.values[1:],
+                    "theme": self.theme_vocab.values[1:],
+                },
+            }, separators=(",", ":")).encode("utf-8")
+            index_offset = f.tell()
+            f.write(index)
+            f.write(FOOTER.pack(MAGIC, index_offset, len(index)))
+        os.replace(tmp, path)
+        return path.stat().st_size
+
+    @classmethod
+    def load(cls, path: Path = GRAPH_PATH) -> "PortfolioGraph":
+        data = path.read_bytes()
+        magic, index_offset, index_length = FOOTER.unpack_from(data, len(data) - FOOTER.size)
+        if magic != MAGIC or data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a portfolio graph")
+        index = json.loads(data[index_offset:index_offset + index_length])
+        graph = cls()
+        graph.company_slugs = index["company_slugs"]
+        graph.person_slugs = index["person_slugs"]
+        graph.company_ids = {slug: i for i, slug in enumerate(graph.company_slugs)}
+        graph.person_ids = {slug: i for i, slug in enumerate(graph.person_slugs)}
+        graph.status_vocab = Vocab(index["vocab"]["status"])
+        graph.status_detail_vocab = Vocab(index["vocab"]["status_detail"])
+        graph.fund_vocab = Vocab(index["vocab"]["fund"])
+        graph.theme_vocab = Vocab(index["vocab"]["theme"])
+        for name, code in COLUMNS.items():
+            offset, length = index["sections"][name]
+            col = array.array(code)
+            col.frombytes(data[offset:offset + length])
+            graph.cols[name] = col
+        c = graph.cols
+        graph.pairs = {(a, b): n for a, b, n in zip(c["pair_a"], c["pair_b"], c["pair_n"])}
+        return graph
+
+    # --- queries ---
+
+    def portfolio(self, person_id: int) -> array.array:
+        c = self.cols
+        return c["person_indices"][c["person_indptr"][person_id]:c["person_indptr"][person_id + 1]]
+
+    def partners(self, company_id: int) -> array.array:
+        c = self.cols
+        return c["company_indices"][c["company_indptr"][company_id]:c["company_indptr"][company_id + 1]]
+
+    def degree(self, person_id: int) -> int:
+        indptr = self.cols["person_indptr"]
+        return indptr[person_id + 1] - indptr[person_id]
+
+    def company_attributes(self, company_id: int) -> Dict[str, Any]:
+        c = self.cols
+        return {
+            "status": self.status_vocab.values[c["status"][company_id]] or None,
+            "status_detail": self.status_detail_vocab.values[c["status_detail"][company_id]] or None,
+            "fund_tags": self.fund_vocab.names(c["fund_bits"][company_id]),
+            "theme_tags": self.theme_vocab.names(c["theme_bits"][company_id]),
+        }
+
+    def _attribute_bits(self) -> Dict[Tuple[str, int], int]:
+        """
+        Company bitset per attribute value and per tag, built in one pass and
+        cached until the graph changes.
+        """
+        if self._attr_bits is None:
+            c = self.cols
+            n_bytes = (len(self.company_slugs) + 7) // 8
+            buffers: Dict[Tuple[str, int], bytearray] = defaultdict(lambda: bytearray(n_bytes))
+            for i in range(len(self.company_slugs)):
+                byte, bit = i >> 3, 1 << (i & 7)
+                buffers[("status", c["status"][i])][byte] |= bit
+                buffers[("status_detail", c["status_detail"][i])][byte] |= bit
+                for column in ("fund_bits", "theme_bits"):
+                    tags = c[column][i]
+                    while tags:
+                        low = tags & -tags
+                        buffers[(column, low.bit_length() - 1)][byte] |= bit
+                        tags ^= low
+            self._attr_bits = {key: int.from_bytes(buf, "little") for key, buf in buffers.items()}
+        return self._attr_bits
+
+    def company_mask(self, status: Optional[str] = None, status_detail: Optional[str] = None,
+                     fund_tags: Iterable[str] = (), theme_tags: Iterable[str] = ()) -> int:
+        """
+        Bitset (bit i = company id i) of companies matching every filter: an
+        AND of the cached per-value bitsets.
+        """
+        attribute_bits = self._attribute_bits()
+        mask = (1 << len(self.company_slugs)) - 1
+        wanted = [("status", self.status_vocab, status), ("status_detail", self.status_detail_vocab, status_detail)]
+        wanted += [("fund_bits", self.fund_vocab, t) for t in fund_tags]
+        wanted += [("theme_bits", self.theme_vocab, t) for t in theme_tags]
+        for column, vocab, value in wanted:
+            if value is None:
+                continue
+            code = vocab.codes.get(value)
+            if code is None:
+                return 0
+            key = (column, code) if column in ("status", "status_detail") else (column, code - 1)
+            mask &= attribute_bits.get(key, 0)
+        return mask
+
+    def row_bits(self) -> List[int]:
+        """
+        Each person's portfolio as a company bitset (built once, then cached).
+        """
+        if self._row_bits is None:
+            rows = []
+            for p in range(len(self.person_slugs)):
+                bits = bytearray((len(self.company_slugs) + 7) // 8)
+                for company_id in self.portfolio(p):
+                    bits[company_id >> 3] |= 1 << (company_id & 7)
+                rows.append(int.from_bytes(bits, "little"))
+            self._row_bits = rows
+        return self._row_bits
+
+    def filtered_degrees(self, mask: int) -> List[int]:
+        return [(row & mask).bit_count() for row in self.row_bits()]
+
+    def top_partners(self, limit: int = 10, active: bool = False, mask: Optional[int] = None) -> List[Tuple[str, int]]:
+        """
+        People by portfolio size: the materialized counts for all/active
+        companies, or a popcount against `mask` for any other filter.
+        """
+        if mask is not None:
+            counts = self.filtered_degrees(mask)
+        else:
+            counts = self.cols["active_count" if active else "portfolio_count"]
+        ranked = sorted((i for i, n in enumerate(counts) if n), key=lambda i: (-counts[i], i))
+        return [(self.person_slugs[i], counts[i]) for i in ranked[:limit]]
+
+    def top_pairs(self, limit: int = 10) -> List[Tuple[str, str, int]]:
+        ranked = sorted(self.pairs.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        return [(self.person_slugs[a], self.person_slugs[b], n) for (a, b), n in ranked]
+
+    def co_investors(self, person_slug: str, limit: int = 10) -> List[Tuple[str, int]]:
+        person_id = self.person_ids[person_slug]
+        rows = self.row_bits()
+        mine = rows[person_id]
+        shared = [((row & mine).bit_count(), q) for q, row in enumerate(rows) if q != person_id]
+        shared = sorted((s for s in shared if s[0]), key=lambda s: (-s[0], s[1]))[:limit]
+        return [(self.person_slugs[q], n) for n, q in shared]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "companies": len(self.company_slugs),
+            "stub_companies": self.cols["present"].tolist().count(0),
+            "people": len(self.person_slugs),
+            "edges": len(self.cols["person_indices"]),
+            "pairs": len(self.pairs),
+        }
+
+
+# --- Main ---
+
+def _read_ndjson(paths: Iterable[Path]) -> Iterator[Dict[str, Any]]:
+    for path in paths:
+        with path.open("rb") as f:
+            for line in f:
+                if line.strip():
+                    yield jsoncodec.loads(line)
+
+
+def run_build(bronze_dir: Path = BRONZE_DIR, out: Path = GRAPH_PATH):
+    m = metrics.current()
+
+    def records(entity: str) -> Iterable[Dict[str, Any]]:
+        path = snapshot_file(bronze_dir, entity)
+        if not path.exists():
+            log.warning(f"No {entity} in {bronze_dir}; building without them")
+            return []
+        m.incr("bytes_read", path.stat().st_size)
+        return iter_json_array(path)
+
+    with m.stage("build"):
+        graph = PortfolioGraph.build(records("companies"), records("people"))
+    with m.stage("write"):
+        m.incr("bytes_written", graph.save(out))
+    m.extra["graph"] = graph.stats()
+    log.info(f"Wrote portfolio graph to {out}", extra=graph.stats())
+
+
+def run_apply(feeds: List[Path], path: Path = GRAPH_PATH):
+    m = metrics.current()
+    with m.stage("load"):
+        graph = PortfolioGraph.load(path)
+    with m.stage("apply"):
+        counts = graph.apply_events(_read_ndjson(feeds))
+    with m.stage("write"):
+        m.incr("bytes_written", graph.save(path))
+    m.extra["applied"] = counts
+    log.info(f"Applied {len(feeds)} change feed(s) to {path}", extra={**counts, **graph.stats()})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build, update and query the person <-> company graph.")
+    parser.add_argument("--graph", type=Path, default=GRAPH_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Build the graph from a bronze snapshot")
+    p_build.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+
+    p_apply = sub.add_parser("apply", help="Apply diff_bronze_snapshots change feeds")
+    p_apply.add_argument("feeds", nargs="+", type=Path)
+
+    p_top = sub.add_parser("top-partners", help="People by portfolio size")
+    p_top.add_argument("--active", action="store_true", help="Count active companies only")
+    p_top.add_argument("--theme", action="append", default=[], help="Count companies with these themes (repeatable)")
+    p_top.add_argument("--fund", action="append", default=[], help="Count companies in these funds (repeatable)")
+    p_top.add_argument("--limit", type=int, default=10)
+
+    p_pairs = sub.add_parser("top-pairs", help="Partner pairs by shared portfolio companies")
+    p_pairs.add_argument("--limit", type=int, default=10)
+
+    p_co = sub.add_parser("co-investors", help="People sharing portfolio companies with a person")
+    p_co.add_argument("person")
+    p_co.add_argument("--limit", type=int, default=10)
+
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    if args.command in ("build", "apply"):
+        with metrics.run_report(f"portfolio_graph_{args.command}") as m, profiling.profile_from_args(m, args):
+            if args.command == "build":
+                run_build(args.bronze_dir, args.graph)
+            else:
+                run_apply(args.feeds, args.graph)
+        return
+
+    graph = PortfolioGraph.load(args.graph)
+    if args.command == "top-partners":
+        mask = None
+        if args.theme or args.fund:
+            mask = graph.company_mask(status=ACTIVE if args.active else None,
+                                      fund_tags=args.fund, theme_tags=args.theme)
+        rows = [{"slug": s, "count": n} for s, n in graph.top_partners(args.limit, active=args.active, mask=mask)]
+    elif args.command == "top-pairs":
+        rows = [{"a": a, "b": b, "shared": n} for a, b, n in graph.top_pairs(args.limit)]
+    else:
+        if args.person not in graph.person_ids:
+            parser.error(f"Unknown person {args.person!r}")
+        rows = [{"slug": s, "shared": n} for s, n in graph.co_investors(args.person, args.limit)]
+    for row in rows:
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
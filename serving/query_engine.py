@@ -0,0 +1,294 @@
+"""
+In-memory indexed query engine over the enriched companies and people.
+
+  python -m serving.query_engine companies --status active --theme security --partner jane-doe
+  python -m serving.query_engine people --company acme
+  python -m serving.query_engine top-partners --limit 10
+
+The snapshot is held as slotted CompanyRecord/PersonRecord objects (see
+ingestion.extract.records), streamed straight from the bronze files, so tag
+lists are shared code tuples rather than lists of strings per record.
+Records get dense integer ids at build time, and every filter is a row
+bitset over company ids:
+
+  slug           -> id
+  status         -> rows      (hash index, one bitset per value)
+  status_detail  -> rows
+  fund_tags      -> rows      (RecordTable, one bitset per tag)
+  theme_tags     -> rows
+
+The person <-> company adjacency comes from people_enriched.portfolio_companies
+and is indexed in both directions, with each person's portfolio also kept as
+a bitset. A query ANDs the bitsets of its filters, so its cost is a few
+big-int operations plus the result size. Portfolio links to slugs missing
+from companies_enriched.json are counted but not indexed.
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type, Union
+
+from ingestion.extract.records import CompanyRecord, PersonRecord, Record, RecordTable, iter_rows, load_records, rows_of
+from ingestion.transform.snapshots import BRONZE_DIR, snapshot_file
+from vceamless import logs
+
+log = logs.get_logger("query_engine")
+
+# Company fields with a value -> rows hash index
+COMPANY_INDEXES = ("status", "status_detail")
+# Company tag fields, filtered through the RecordTable's per-tag bitsets
+COMPANY_TAG_FIELDS = ("fund_tags", "theme_tags")
+
+Values = Union[str, Iterable[str], None]
+
+
+def _as_values(value: Values) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def _as_record(cls: Type[Record], rec: Union[Record, Dict[str, Any]]) -> Record:
+    return rec if isinstance(rec, Record) else cls.from_dict(rec)
+
+
+class QueryEngine:
+    """
+    Row bitsets and the person <-> company adjacency over one bronze snapshot.
+    Built once; read-only afterwards. Accepts records or plain dicts.
+    """
+
+    def __init__(self, companies: Iterable[Union[CompanyRecord, Dict[str, Any]]],
+                 people: Iterable[Union[PersonRecord, Dict[str, Any]]]):
+        started = time.perf_counter()
+        self.companies: List[CompanyRecord] = []
+        self.people: List[PersonRecord] = []
+        self.company_ids: Dict[str, int] = {}
+        self.person_ids: Dict[str, int] = {}
+        self.portfolio: Dict[int, Set[int]] = defaultdict(set)  # person id -> company ids
+        self.partners: Dict[int, Set[int]] = defaultdict(set)  # company id -> person ids
+        self.unresolved_links = 0
+
+        index_ids: Dict[str, Dict[str, List[int]]] = {name: defaultdict(list) for name in COMPANY_INDEXES}
+        for rec in companies:
+            rec = _as_record(CompanyRecord, rec)
+            slug = rec.slug
+            if not slug or slug in self.company_ids:
+                continue
+            id_ = len(self.companies)
+            self.company_ids[slug] = id_
+            self.companies.append(rec)
+            for name in COMPANY_INDEXES:
+                value = getattr(rec, name)
+                if isinstance(value, str):
+                    index_ids[name][value].append(id_)
+
+        n = len(self.companies)
+        self.all_rows = (1 << n) - 1
+        self.indexes: Dict[str, Dict[str, int]] = {
+            name: {value: rows_of(ids, n) for value, ids in by_value.items()} for name, by_value in index_ids.items()
+        }
+        self.table = RecordTable(self.companies)
+
+        for rec in people:
+            rec = _as_record(PersonRecord, rec)
+            slug = rec.slug
+            if not slug or slug in self.person_ids:
+                continue
+            id_ = len(self.people)
+            self.person_ids[slug] = id_
+            self.people.append(rec)
+            for link in rec.portfolio_companies or ():
+                company_id = self.company_ids.get(link.get("slug"))
+                if company_id is None:
+                    self.unresolved_links += 1
+                    continue
+                self.portfolio[id_].add(company_id)
+                self.partners[company_id].add(id_)
+        self.portfolio_rows: Dict[int, int] = {
+            person_id: rows_of(company_ids, n) for person_id, company_ids in self.portfolio.items()
+        }
+
+        self.build_seconds = time.perf_counter() - started
+        log.info(
+            f"Built query engine in {self.build_seconds * 1000:.1f}ms",
+            extra={
+                "companies": len(self.companies),
+                "people": len(self.people),
+                "links": sum(len(ids) for ids in self.portfolio.values()),
+                "unresolved_links": self.unresolved_links,
+            },
+        )
+
+    @classmethod
+    def load(cls, bronze_dir: Path = BRONZE_DIR) -> "QueryEngine":
+        """
+        Build from a bronze snapshot directory; a missing entity file is
+        treated as empty.
+        """
+        def records(entity: str, record_cls: Type[Record]) -> List[Record]:
+            path = snapshot_file(bronze_dir, entity)
+            if not path.exists():
+                log.warning(f"No {entity} in {bronze_dir}; indexing none")
+                return []
+            return load_records(path, record_cls)
+
+        return cls(records("companies", CompanyRecord), records("people", PersonRecord))
+
+    # --- lookups ---
+
+    def company(self, slug: str) -> Optional[CompanyRecord]:
+        id_ = self.company_ids.get(slug)
+        return None if id_ is None else self.companies[id_]
+
+    def person(self, slug: str) -> Optional[PersonRecord]:
+        id_ = self.person_ids.get(slug)
+        return None if id_ is None else self.people[id_]
+
+    def values(self, attribute: str) -> Dict[str, int]:
+        """
+        Distinct values of an indexed attribute or tag field with their
+        company counts.
+        """
+        if attribute in COMPANY_TAG_FIELDS:
+            return dict(sorted(self.table.counts(attribute).items()))
+        return {value: rows.bit_count() for value, rows in sorted(self.indexes[attribute].items())}
+
+    # --- filters ---
+
+    def company_rows_where(
+        self,
+        status: Values = None,
+        status_detail: Values = None,
+        fund_tags: Values = None,
+        theme_tags: Values = None,
+        partner: Optional[str] = None,
+    ) -> int:
+        """
+        Row bitset of companies matching every filter. status/status_detail
+        match any of the given values; fund_tags/theme_tags require all of
+        them.
+        """
+        rows = self.all_rows
+        for name, value in (("status", status), ("status_detail", status_detail)):
+            wanted = _as_values(value)
+            if wanted:
+                index = self.indexes[name]
+                either = 0
+                for v in wanted:
+                    either |= index.get(v, 0)
+                rows &= either
+        for name, value in (("fund_tags", fund_tags), ("theme_tags", theme_tags)):
+            wanted = _as_values(value)
+            if wanted:
+                rows &= self.table.mask(name, all_of=wanted)
+        if partner is not None:
+            person_id = self.person_ids.get(partner)
+            rows &= self.portfolio_rows.get(person_id, 0) if person_id is not None else 0
+        return rows
+
+    def company_ids_where(self, **filters) -> Set[int]:
+        return set(iter_rows(self.company_rows_where(**filters)))
+
+    def find_companies(self, **filters) -> List[CompanyRecord]:
+        return [self.companies[i] for i in iter_rows(self.company_rows_where(**filters))]
+
+    def find_people(self, company: Optional[str] = None, **company_filters) -> List[PersonRecord]:
+        """
+        People linked to `company`, or to any company matching `company_filters`
+        (all people when neither is given).
+        """
+        if company is None and not company_filters:
+            return list(self.people)
+        if company is not None:
+            company_id = self.company_ids.get(company)
+            ids = self.partners.get(company_id, set()) if company_id is not None else set()
+            if company_filters:
+                matching = self.company_rows_where(**company_filters)
+                ids = ids if company_id is not None and matching >> company_id & 1 else set()
+        else:
+            matching = self.company_rows_where(**company_filters)
+            ids = set().union(*(self.partners.get(c, ()) for c in iter_rows(matching)))
+        return [self.people[i] for i in sorted(ids)]
+
+    # --- aggregates ---
+
+    def top_partners(self, limit: int = 10, **company_filters) -> List[Tuple[PersonRecord, int]]:
+        """
+        People ranked by how many of their portfolio companies match
+        `company_filters` (e.g. status="active").
+        """
+        matching = self.company_rows_where(**company_filters) if company_filters else self.all_rows
+        counts = []
+        for person_id, rows in self.portfolio_rows.items():
+            n = (rows & matching).bit_count()
+            if n:
+                counts.append((n, person_id))
+        counts.sort(key=lambda c: (-c[0], c[1]))
+        return [(self.people[person_id], n) for n, person_id in counts[:limit]]
+
+
+# --- Main ---
+
+def _summary(rec: Record, *fields: str) -> Dict[str, Any]:
+    return {f: rec.get(f) for f in ("slug", "name", *fields)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the enriched companies and people.")
+    parser.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_company_filters(p):
+        p.add_argument("--status", action="append", default=None, help="Repeatable; any of")
+        p.add_argument("--status-detail", action="append", default=None, help="Repeatable; any of")
+        p.add_argument("--fund", action="append", default=None, help="Repeatable; all of")
+        p.add_argument("--theme", action="append", default=None, help="Repeatable; all of")
+
+    p_companies = sub.add_parser("companies", help="Companies matching the filters")
+    add_company_filters(p_companies)
+    p_companies.add_argument("--partner", default=None, metavar="PERSON_SLUG")
+
+    p_people = sub.add_parser("people", help="People linked to a company or to matching companies")
+    add_company_filters(p_people)
+    p_people.add_argument("--company", default=None, metavar="COMPANY_SLUG")
+
+    p_top = sub.add_parser("top-partners", help="People ranked by matching portfolio companies")
+    add_company_filters(p_top)
+    p_top.add_argument("--limit", type=int, default=10)
+
+    logs.add_logging_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    engine = QueryEngine.load(args.bronze_dir)
+    filters = {
+        k: v for k, v in (
+            ("status", args.status),
+            ("status_detail", args.status_detail),
+            ("fund_tags", args.fund),
+            ("theme_tags", args.theme),
+        ) if v
+    }
+
+    started = time.perf_counter()
+    if args.command == "companies":
+        rows = [_summary(r, "status", "status_detail") for r in engine.find_companies(partner=args.partner, **filters)]
+    elif args.command == "people":
+        rows = [_summary(r, "detail_title") for r in engine.find_people(company=args.company, **filters)]
+    else:
+        rows = [{**_summary(r), "count": n} for r, n in engine.top_partners(args.limit, **filters)]
+    elapsed_us = (time.perf_counter() - started) * 1e6
+
+    for row in rows:
+        print(json.dumps(row, ensure_ascii=False))
+    log.info(f"{len(rows)} result(s) in {elapsed_us:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+BM25 full-text index over company descriptions and person bios.
+
+  python -m serving.search_index build                       # (re)index the current bronze files
+  python -m serving.search_index search "payments security" [--kind company] [--limit 10]
+  python -m serving.search_index stats
+
+The extract scripts call update_documents() after each run. Only records
+whose text changed are re-tokenized. Term counts per document are kept in a
+forward store (docs.json), and the inverted file is rewritten from that store.
+
+Layout of search.idx (little-endian, every section 8-byte aligned):
+
+  header       b"VCBM25I1", u32 n_docs, u32 n_terms, f64 avgdl,
+               then (u64 offset, u64 length) for each section below
+  doc_keys     u32 offsets[n_docs + 1] + UTF-8 blob ("company:<slug>")
+  doc_kinds    u8[n_docs]      0 = company, 1 = person
+  doc_lens     u32[n_docs]     tokens per document
+  terms        u32 offsets[n_terms + 1] + UTF-8 blob, sorted by bytes
+  postings     u32 offsets[n_terms + 1] into the two arrays below
+  post_docs    u32[]           doc ids, ascending within a term
+  post_tfs     u16[]           term frequency (clamped)
+
+SearchIndex memory-maps the file and casts the sections to memoryviews. It
+loads nothing at startup: terms are found by binary search over the mapped
+blob, and only the postings of the query terms are touched.
+"""
+
+import argparse
+import array
+import bisect
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ingestion.transform.snapshots import BRONZE_DIR, iter_json_array, snapshot_file
+from vceamless import jsoncodec, logs, metrics, profiling
+
+def search_paths(bronze_dir: Path) -> Tuple[Path, Path]:
+    """
+    (search.idx, docs.json) for the bronze outputs in `bronze_dir`.
+    """
+    search_dir = bronze_dir / "search"
+    return search_dir / "search.idx", search_dir / "docs.json"
+
+
+INDEX_PATH, DOCS_PATH = search_paths(BRONZE_DIR)
+
+MAGIC = b"VCBM25I1"
+SECTIONS = ("doc_key_offsets", "doc_keys", "doc_kinds", "doc_lens",
+            "term_offsets", "terms", "post_offsets", "post_docs", "post_tfs")
+HEADER = struct.Struct("<8sIId" + "QQ" * len(SECTIONS))
+ALIGN = 8
+MAX_TF = 0xFFFF
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Document kind -> (kind id, entity in ENTITY_FILES)
+KINDS = {"company": (0, "companies"), "person": (1, "people")}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their "
+    "this to was we were will with who".split()
+)
+# (suffix, replacement), first match wins; the stem must keep MIN_STEM chars
+_SUFFIXES = (("ies", "y"), ("ing", ""), ("ed", ""), ("ly", ""), ("s", ""))
+MIN_STEM = 3
+
+log = logs.get_logger("search_index")
+
+
+# --- Text ---
+
+def stem(token: str) -> str:
+    """
+    Light suffix stripping: plural/-ing/-ed/-ly only, never below MIN_STEM chars.
+    """
+    if token.endswith(("ss", "us", "is")):
+        return token
+    for suffix, replacement in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM:
+            return token[: -len(suffix)] + replacement
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(t) for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def document_text(kind: str, rec: Dict[str, Any]) -> str:
+    if kind == "company":
+        parts = (rec.get("detail_name") or rec.get("name"), rec.get("description"))
+    else:
+        parts = (rec.get("detail_name") or rec.get("name"), rec.get("detail_title"), rec.get("bio"))
+    return "\n".join(p for p in parts if isinstance(p, str))
+
+
+# --- Building ---
+
+def _load_docs(path: Path) -> Dict[str, Dict[str, Any]]:
+    if not path.exists():
+        return {}
+    return jsoncodec.load_path(path)
+
+
+def _pad(f) -> None:
+    f.write(b"\0" * (-f.tell() % ALIGN))
+
+
+def _string_table(values: Sequence[bytes]) -> Tuple[bytes, bytes]:
+    offsets = array.array("I", [0])
+    for v in values:
+        offsets.append(offsets[-1] + len(v))
+    return _le(offsets), b"".join(values)
+
+
+def _le(arr: array.array) -> bytes:
+    if sys.byteorder != "little":
+        arr = array.array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def write_index(docs: Dict[str, Dict[str, Any]], path: Path = INDEX_PATH) -> Dict[str, int]:
+    """
+    Invert the forward store into a search.idx file (written to a temp name,
+    then renamed into place).
+    """
+    keys = sorted(docs)
+    postings: Dict[bytes, List[Tuple[int, int]]] = {}
+    doc_lens = array.array("I")
+    doc_kinds = array.array("B")
+    for doc_id, key in enumerate(keys):
+        entry = docs[key]
+        doc_lens.append(entry["len"])
+        doc_kinds.append(KINDS[key.split(":", 1)[0]][0])
+        for term, tf in entry["tf"].items():
+            postings.setdefault(term.encode("utf-8"), []).append((doc_id, min(tf, MAX_TF)))
+
+    terms = sorted(postings)
+    post_offsets = array.array("I", [0])
+    post_docs = array.array("I")
+    post_tfs = array.array("H")
+    for term in terms:
+        for doc_id, tf in postings[term]:
+            post_docs.append(doc_id)
+            post_tfs.append(tf)
+        post_offsets.append(len(post_docs))
+
+    doc_key_offsets, doc_key_blob = _string_table([k.encode("utf-8") for k in keys])
+    term_offsets, term_blob = _string_table(terms)
+    payloads = {
+        "doc_key_offsets": doc_key_offsets,
+        "doc_keys": doc_key_blob,
+        "doc_kinds": doc_kinds.tobytes(),
+        "doc_lens": _le(doc_lens),
+        "term_offsets": term_offsets,
+        "terms": term_blob,
+        "post_offsets": _le(post_offsets),
+        "post_docs": _le(post_docs),
+        "post_tfs": _le(post_tfs),
+    }
+    avgdl = (sum(doc_lens) / len(doc_lens)) if doc_lens else 0.0
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    table: List[int] = []
+    with tmp.open("wb") as f:
+        f.write(b"\0" * HEADER.size)
+        for name in SECTIONS:
+            _pad(f)
+            table += [f.tell(), len(payloads[name])]
+            f.write(payloads[name])
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, len(keys), len(terms), avgdl, *table))
+    os.replace(tmp, path)
+    return {"docs": len(keys), "terms": len(terms), "postings": len(post_docs), "bytes": path.stat().st_size}
+
+
+def update_documents(kind: str, records: Iterable[Dict[str, Any]],
+                     index_path: Path = INDEX_PATH, docs_path: Path = DOCS_PATH) -> Dict[str, int]:
+    """
+    Make the index's `kind` documents match `records`: re-tokenize changed
+    text, drop documents whose record is gone, then rewrite search.idx.
+    """
+    m = metrics.current()
+    docs = _load_docs(docs_path)
+    prefix = f"{kind}:"
+    stale = {key for key in docs if key.startswith(prefix)}
+    counts = {"reindexed": 0, "unchanged": 0, "removed": 0}
+
+    for rec in records:
+        slug = rec.get("slug")
+        if not slug:
+            continue
+        key = prefix + slug
+        stale.discard(key)
+        text = document_text(kind, rec)
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        if docs.get(key, {}).get("hash") == digest:
+            counts["unchanged"] += 1
+            continue
+        tokens = tokenize(text)
+        docs[key] = {"hash": digest, "len": len(tokens), "tf": dict(Counter(tokens))}
+        counts["reindexed"] += 1
+
+    for key in stale:
+        del docs[key]
+    counts["removed"] = len(stale)
+
+    docs_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = docs_path.with_name(f".{docs_path.name}.tmp")
+    tmp.write_bytes(jsoncodec.dumps(docs))
+    os.replace(tmp, docs_path)
+    stats = write_index(docs, index_path)
+    m.incr("bytes_written", stats["bytes"])
+    log.info(f"Updated search index for {kind}", extra={**counts, **stats})
+    return {**counts, **stats}
+
+
+# --- Querying ---
+
+class _Strings:
+    """
+    Random access into an offsets + blob string table (as bytes, for bisect).
+    """
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+
+class SearchIndex:
+    """
+    Read-only, memory-mapped view of a search.idx file.
+    """
+
+    def __init__(self, path: Path = INDEX_PATH) -> None:
+        if sys.byteorder != "little":
+            raise RuntimeError("search.idx is little-endian; this reader needs a little-endian host")
+        self.path = path
+        self._f = path.open("rb")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mv = memoryview(self._mm)
+        magic, self.n_docs, self.n_terms, self.avgdl, *table = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a search index")
+        formats = {"doc_keys": "B", "terms": "B", "doc_kinds": "B", "post_tfs": "H"}
+        s = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = table[2 * i], table[2 * i + 1]
+            s[name] = self._mv[offset:offset + length].cast(formats.get(name, "I"))
+        self._sections = s
+        self.doc_keys = _Strings(s["doc_key_offsets"], s["doc_keys"])
+        self.terms = _Strings(s["term_offsets"], s["terms"])
+
+    def close(self) -> None:
+        # Release every view before the map
+        for view in self._sections.values():
+            view.release()
+        self._sections.clear()
+        self.doc_keys = self.terms = None
+        self._mv.release()
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _term_id(self, term: str) -> Optional[int]:
+        needle = term.encode("utf-8")
+        i = bisect.bisect_left(self.terms, needle)
+        return i if i < len(self.terms) and self.terms[i] == needle else None
+
+    def search(self, query: str, kind: Optional[str] = None, limit: int = 10) -> List[Tuple[str, str, float]]:
+        """
+        Top `limit` documents by BM25 as (kind, slug, score), best first.
+        """
+        s = self._sections
+        post_offsets, post_docs, post_tfs = s["post_offsets"], s["post_docs"], s["post_tfs"]
+        doc_lens, doc_kinds = s["doc_lens"], s["doc_kinds"]
+        kind_id = KINDS[kind][0] if kind else None
+        avgdl = self.avgdl or 1.0
+
+        scores: Dict[int, float] = {}
+        for term in dict.fromkeys(tokenize(query)):
+            term_id = self._term_id(term)
+            if term_id is None:
+                continue
+            start, end = post_offsets[term_id], post_offsets[term_id + 1]
+            df = end - start
+            idf = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            for j in range(start, end):
+                doc_id = post_docs[j]
+                if kind_id is not None and doc_kinds[doc_id] != kind_id:
+                    continue
+                tf = post_tfs[j]
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lens[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        results = []
+        for doc_id, score in top:
+            doc_kind, slug = self.doc_keys[doc_id].decode("utf-8").split(":", 1)
+            results.append((doc_kind, slug, score))
+        return results
+
+
+# --- Main ---
+
+def run(bronze_dir: Path = BRONZE_DIR):
+    m = metrics.current()
+    index_path, docs_path = search_paths(bronze_dir)
+    for kind, (_, entity) in KINDS.items():
+        path = snapshot_file(bronze_dir, entity)
+        if not path.exists():
+            log.warning(f"Skipping {kind} documents: missing {path}")
+            continue
+        m.incr("bytes_read", path.stat().st_size)
+        with m.stage("index"):
+            update_documents(kind, iter_json_array(path), index_path=index_path, docs_path=docs_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the BM25 search index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Index the bronze enriched files")
+    p_build.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+
+    p_search = sub.add_parser("search", help="Print the top matches (NDJSON)")
+    p_search.add_argument("query")
+    p_search.add_argument("--kind", choices=sorted(KINDS), default=None)
+    p_search.add_argument("--limit", type=int, default=10)
+    p_search.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+
+    p_stats = sub.add_parser("stats", help="Print index header counts")
+    p_stats.add_argument("--bronze-dir", type=Path, default=BRONZE_DIR)
+
+    logs.add_logging_arguments(parser)
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    logs.configure_from_args(args)
+
+    if args.command == "build":
+        with metrics.run_report("search_index") as m, profiling.profile_from_args(m, args):
+            run(bronze_dir=args.bronze_dir)
+        return
+
+    index_path, _ = search_paths(args.bronze_dir)
+    if not index_path.exists():
+        parser.error(f"{index_path} does not exist; run `build` first")
+    with SearchIndex(index_path) as index:
+        if args.command == "search":
+            for kind, slug, score in index.search(args.query, kind=args.kind, limit=args.limit):
+                print(json.dumps({"kind": kind, "slug": slug, "score": round(score, 4)}))
+        else:
+            print(json.dumps({"docs": index.n_docs, "terms": index.n_terms, "avgdl": round(index.avgdl, 2),
+                              "bytes": index_path.stat().st_size}))
+
+
+if __name__ == "__main__":
+    main()
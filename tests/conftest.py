@@ -0,0 +1,11 @@
+"""
+Shared pytest setup: make the repo root importable when pytest is run
+without `python -m`.
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
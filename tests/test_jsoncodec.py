@@ -0,0 +1,95 @@
+"""
+Round-trip and byte-equality checks for vceamless.jsoncodec against the
+stdlib json module, under both backends.
+"""
+
+import json
+
+import pytest
+
+from vceamless import jsoncodec
+
+BACKENDS = [
+    "json",
+    pytest.param("orjson", marks=pytest.mark.skipif(jsoncodec._installed is None, reason="orjson not installed")),
+]
+
+VALUES = {
+    "record": {
+        "slug": "acme",
+        "name": "Acme, Inc.",
+        "fund_tags": ["slack-fund", "ai-fund"],
+        "leadership": [{"name": "Jane Doe", "role": "CEO"}],
+        "social_links": {"linkedin": "https://www.linkedin.com/company/acme"},
+        "acquired_by": None,
+    },
+    "unicode": {"name": "Zoë ☃ \U0001f680", "quote": "\"\\/\n\t "},
+    "numbers": {"int": 2 ** 63 - 1, "neg": -0.5, "float": 0.1 + 0.2, "zero": 0},
+    "empty": {"list": [], "dict": {}, "none": None, "bools": [True, False]},
+    "list": [1, "two", [3.5], {"four": 4}],
+}
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    previous = jsoncodec.BACKEND
+    jsoncodec.set_backend(request.param)
+    yield request.param
+    jsoncodec.set_backend(previous)
+
+
+def _stdlib(value, indent=False, sort_keys=False):
+    if indent:
+        return json.dumps(value, indent=2, ensure_ascii=False, sort_keys=sort_keys).encode("utf-8")
+    return json.dumps(value, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":")).encode("utf-8")
+
+
+@pytest.mark.parametrize("indent", [False, True])
+@pytest.mark.parametrize("sort_keys", [False, True])
+@pytest.mark.parametrize("label", sorted(VALUES))
+def test_dumps_matches_stdlib(backend, label, indent, sort_keys):
+    value = VALUES[label]
+    assert jsoncodec.dumps(value, indent=indent, sort_keys=sort_keys) == _stdlib(value, indent, sort_keys)
+
+
+@pytest.mark.parametrize("label", sorted(VALUES))
+def test_round_trip(backend, label):
+    value = VALUES[label]
+    for indent in (False, True):
+        body = jsoncodec.dumps(value, indent=indent)
+        assert jsoncodec.loads(body) == value
+        assert jsoncodec.loads(body.decode("utf-8")) == value
+        assert jsoncodec.loads(memoryview(body)) == json.loads(body)
+
+
+def test_loads_raises_json_decode_error(backend):
+    with pytest.raises(json.JSONDecodeError):
+        jsoncodec.loads(b'{"slug": ')
+
+
+@pytest.mark.parametrize("value", [{1: "one", 2: "two"}, {"big": 2 ** 70}])
+def test_rejected_values_fall_back_to_stdlib(backend, value):
+    # orjson raises TypeError for non-str keys and ints beyond 64 bits
+    assert jsoncodec.dumps(value) == _stdlib(value)
+    assert jsoncodec.dumps(value, indent=True) == _stdlib(value, indent=True)
+
+
+def test_unserializable_value_still_raises(backend):
+    with pytest.raises(TypeError):
+        jsoncodec.dumps({"when": object()})
+
+
+def test_write_path(backend, tmp_path):
+    path = tmp_path / "nested" / "companies_enriched.json"
+    value = [VALUES["record"], VALUES["unicode"]]
+    body = jsoncodec.write_path(path, value)
+    assert body == _stdlib(value, indent=True)
+    assert path.read_bytes() == body
+    assert jsoncodec.load_path(path) == value
+    # Atomic write: no temp file left behind
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
+
+
+def test_set_backend_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        jsoncodec.set_backend("simplejson")
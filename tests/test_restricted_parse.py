@@ -0,0 +1,75 @@
+"""
+The restricted (SubtreeFilter) parses and the streamed list parses must
+produce exactly what a full-DOM parse does, on the benchmark fixture pages
+and on pages without the div.profile the restricted detail parse targets.
+"""
+
+import pytest
+
+from benchmarks.fixtures import build_corpus
+from ingestion.extract.extract_companies_list import iter_companies_list, parse_companies_list_html
+from ingestion.extract.extract_company_pages import parse_company_detail_html
+from ingestion.extract.extract_people_list import iter_people_list, parse_people_list_html
+from ingestion.extract.extract_person_pages import parse_person_detail_html
+from ingestion.raw_html import STREAM_CHUNK_CHARS
+
+CORPUS = build_corpus("small")
+
+DETAIL_PAGES = [(parse_company_detail_html, "company_pages"), (parse_person_detail_html, "person_pages")]
+LIST_PAGES = [
+    (parse_companies_list_html, iter_companies_list, "companies_list_page"),
+    (parse_people_list_html, iter_people_list, "people_list_page"),
+]
+
+
+def _chunks(text, size=STREAM_CHUNK_CHARS):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _without_profile(html):
+    # Same content, but no div.profile for the restricted parse to select
+    return html.replace('<div class="profile"', '<div class="legacy-profile"', 1)
+
+
+@pytest.mark.parametrize("parse, key", DETAIL_PAGES)
+def test_detail_restricted_matches_full(parse, key):
+    for html in CORPUS[key]:
+        full = parse(html, restricted=False)
+        assert full["detail_name"]
+        assert parse(html, restricted=True) == full
+
+
+@pytest.mark.parametrize("parse, key", DETAIL_PAGES)
+def test_detail_bytes_match_str(parse, key):
+    html = CORPUS[key][0]
+    assert parse(html.encode("utf-8"), restricted=True) == parse(html, restricted=False)
+
+
+@pytest.mark.parametrize("parse, key", DETAIL_PAGES)
+def test_detail_without_profile_falls_back_to_full_parse(parse, key):
+    for html in CORPUS[key][:5]:
+        page = _without_profile(html)
+        assert '<div class="profile"' not in page
+        full = parse(page, restricted=False)
+        assert full["detail_name"]
+        assert parse(page, restricted=True) == full
+
+
+@pytest.mark.parametrize("parse, key", DETAIL_PAGES)
+def test_detail_empty_page(parse, key):
+    assert parse("<html><body></body></html>", restricted=True) == parse("<html><body></body></html>", restricted=False)
+
+
+@pytest.mark.parametrize("parse, stream, key", LIST_PAGES)
+def test_list_restricted_matches_full(parse, stream, key):
+    html = CORPUS[key]
+    full = parse(html, restricted=False)
+    assert len(full) == 100
+    assert parse(html, restricted=True) == full
+
+
+@pytest.mark.parametrize("parse, stream, key", LIST_PAGES)
+@pytest.mark.parametrize("chunk_size", [STREAM_CHUNK_CHARS, 7])
+def test_list_stream_matches_full(parse, stream, key, chunk_size):
+    html = CORPUS[key]
+    assert list(stream(_chunks(html, chunk_size))) == parse(html, restricted=False)
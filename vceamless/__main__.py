@@ -0,0 +1,5 @@
+import sys
+
+from vceamless.cli import main
+
+sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Single entry point for the pipeline stages.
+
+  python -m vceamless [--json-backend auto|orjson|json] <command> [<stage>] [stage options]
+
+  python -m vceamless land companies --limit 20 --workers 4
+  python -m vceamless extract people
+  python -m vceamless diff snapshots --help
+  python -m vceamless bench --size small
+
+Each stage is still its module's main(), so `vceamless land companies ...`
+takes the same options as `python -m ingestion.landing.sf_ventures_scrape_company_pages ...`.
+This module imports only the standard library and vceamless.jsoncodec. The
+stage module, and with it bs4, boto3, requests or simple_salesforce, is
+imported once the stage has been chosen, so `vceamless --help` and
+`vceamless <command> --help` start without loading any of them.
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from vceamless import jsoncodec
+
+# command -> stage -> (module with a main(argv), summary). A command with a
+# single stage named "" runs it directly (`vceamless bench ...`).
+COMMANDS: Dict[str, Dict[str, Tuple[str, str]]] = {
+    "land": {
+        "lists": ("ingestion.landing.sf_ventures_scrape_html", "Land the companies and people list pages in S3"),
+        "discover": ("ingestion.landing.sf_ventures_discover_changes", "Compute new or changed detail pages"),
+        "companies": ("ingestion.landing.sf_ventures_scrape_company_pages", "Land company detail pages"),
+        "people": ("ingestion.landing.sf_ventures_scrape_person_pages", "Land person detail pages"),
+        "assets": ("ingestion.landing.sf_ventures_mirror_assets", "Mirror bronze image assets to S3"),
+        "archive": ("ingestion.raw_archive", "Pack and inspect raw-HTML archives"),
+    },
+    "extract": {
+        "companies-list": ("ingestion.extract.extract_companies_list", "Extract bronze companies_list.json"),
+        "people-list": ("ingestion.extract.extract_people_list", "Extract bronze people_list.json"),
+        "companies": ("ingestion.extract.extract_company_pages", "Enrich bronze companies from detail pages"),
+        "people": ("ingestion.extract.extract_person_pages", "Enrich bronze people from detail pages"),
+        "leadership": ("ingestion.transform.resolve_leadership", "Link leadership entries to person slugs"),
+        "backfill": ("ingestion.extract.backfill_raw_snapshots", "Re-extract bronze history from raw snapshots"),
+    },
+    "load": {
+        "check": ("salesforce.etl.test_connection", "Quick connectivity test to the Salesforce dev org"),
+    },
+    "cleanup": {
+        "": ("salesforce.etl.cleanup_org", "Delete demo data from the Salesforce dev org"),
+    },
+    "bench": {
+        "": ("benchmarks.run_benchmarks", "Benchmark the parse and serialization hot paths"),
+    },
+    "diff": {
+        "snapshots": ("ingestion.transform.diff_bronze_snapshots", "Diff two bronze snapshots into a change feed"),
+        "history": ("ingestion.transform.scd_history", "Build and query SCD2 history"),
+    },
+    "serve": {
+        "api": ("serving.api", "Serve the bronze outputs over a local HTTP API"),
+        "query": ("serving.query_engine", "Query the enriched companies and people"),
+        "search": ("serving.search_index", "Build and query the BM25 search index"),
+        "graph": ("serving.portfolio_graph", "Build, update and query the person <-> company graph"),
+    },
+}
+
+
+def _summary(stages: Dict[str, Tuple[str, str]]) -> str:
+    if "" in stages:
+        return stages[""][1]
+    return ", ".join(stages)
+
+
+def _listing(rows: Dict[str, str]) -> str:
+    width = max(len(name) for name in rows)
+    return "\n".join(f"  {name:<{width}}  {text}" for name, text in rows.items())
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="vceamless",
+        description="Run a pipeline stage. Options after the stage name go to the stage itself.",
+        epilog="commands:\n" + _listing({c: _summary(s) for c, s in COMMANDS.items()})
+               + "\n\nRun `vceamless <command> --help` for its stages.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--json-backend", choices=jsoncodec.BACKENDS, default="auto",
+                        help="JSON codec for bronze files and S3 bodies (default: orjson when installed)")
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command", help="one of the commands below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+
+def _command_help(command: str) -> str:
+    stages = COMMANDS[command]
+    return (f"usage: vceamless {command} <stage> [stage options]\n\nstages:\n"
+            + _listing({s: text for s, (_, text) in stages.items()})
+            + f"\n\nRun `vceamless {command} <stage> --help` for a stage's options.")
+
+
+def resolve(command: str, args: List[str]) -> Optional[Tuple[str, str, List[str]]]:
+    """
+    (stage, module, remaining argv) for a command line, or None when it only
+    asks for the command's stage list.
+    """
+    stages = COMMANDS[command]
+    if "" in stages:
+        return "", stages[""][0], args
+    if not args or args[0] in ("-h", "--help"):
+        return None
+    stage, rest = args[0], args[1:]
+    if stage not in stages:
+        raise KeyError(stage)
+    return stage, stages[stage][0], rest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    try:
+        resolved = resolve(args.command, args.args)
+    except KeyError as e:
+        parser.error(f"unknown {args.command} stage {e.args[0]!r} (choose from {', '.join(COMMANDS[args.command])})")
+    if resolved is None:
+        print(_command_help(args.command))
+        return 0 if args.args else 2
+    stage, module_name, rest = resolved
+
+    if args.json_backend != "auto":
+        try:
+            jsoncodec.set_backend(args.json_backend)
+        except ValueError as e:
+            parser.error(str(e))
+
+    module = importlib.import_module(module_name)
+    # The stage's own parser names itself after argv[0] in usage and errors
+    sys.argv = [" ".join(["vceamless", args.command, stage]).rstrip(), *rest]
+    result = module.main(argv=rest)
+    return result if isinstance(result, int) else 0
@@ -0,0 +1,108 @@
+"""
+JSON encoding and decoding for bronze files, S3 bodies and state files.
+
+orjson is used when it is installed and the stdlib json module otherwise.
+Either way the output matches what the pipeline has always written:
+
+  dumps(v)               == json.dumps(v, ensure_ascii=False, separators=(",", ":")).encode()
+  dumps(v, indent=True)  == json.dumps(v, indent=2, ensure_ascii=False).encode()
+
+byte for byte, with two exceptions. Floats that print in exponent form
+come out as 1e-7 under orjson and 1e-07 under stdlib, which is the same
+value, so anything hashed (snapshots.canonical_json) stays on stdlib json.
+NaN and Infinity come out as null under orjson and as NaN under stdlib.
+
+dumps() returns bytes, so one encode serves both the local file and the S3
+put (see write_path()). Values orjson rejects, such as non-str keys or ints
+beyond 64 bits, are retried with the stdlib encoder.
+
+loads() accepts bytes or str and raises json.JSONDecodeError (which
+orjson's error subclasses) on bad input.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib codec is always available
+    orjson = None
+
+BACKENDS = ("auto", "orjson", "json")
+BACKEND = "orjson" if orjson is not None else "json"
+
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    _ORJSON_OPTIONS = {
+        (False, False): 0,
+        (True, False): orjson.OPT_INDENT_2,
+        (False, True): orjson.OPT_SORT_KEYS,
+        (True, True): orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS,
+    }
+
+_installed = orjson
+
+
+def set_backend(name: str) -> None:
+    """
+    Switch the process to "orjson" or "json" (stdlib); "auto" picks orjson
+    when it is installed.
+    """
+    global orjson, BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {name!r} (expected one of {', '.join(BACKENDS)})")
+    if name == "orjson" and _installed is None:
+        raise ValueError("JSON backend 'orjson' requested but orjson is not installed")
+    orjson = None if name == "json" else _installed
+    BACKEND = "orjson" if orjson is not None else "json"
+
+
+def _stdlib_dumps(value: Any, indent: bool, sort_keys: bool) -> bytes:
+    if indent:
+        text = json.dumps(value, indent=2, ensure_ascii=False, sort_keys=sort_keys)
+    else:
+        text = json.dumps(value, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+def dumps(value: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    UTF-8 JSON bytes; compact, or with the pipeline's 2-space indent.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=_ORJSON_OPTIONS[(indent, sort_keys)])
+        except TypeError:
+            pass
+    return _stdlib_dumps(value, indent, sort_keys)
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):  # json.loads takes str, bytes or bytearray only
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def load_path(path: Path) -> Any:
+    return loads(Path(path).read_bytes())
+
+
+def write_path(path: Path, value: Any, indent: bool = True, sort_keys: bool = False) -> bytes:
+    """
+    Encode once and write atomically (temp file + os.replace). Returns the
+    body so callers can send the same buffer to S3.
+    """
+    path = Path(path)
+    body = dumps(value, indent=indent, sort_keys=sort_keys)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+    return body
@@ -0,0 +1,262 @@
+"""
+Structured, leveled logging for the ingestion and ETL scripts.
+
+- Records go through a QueueHandler to a background QueueListener, so hot
+  loops only pay for enqueueing a record; formatting and stdout I/O happen on
+  the listener thread.
+- `--log-format json` (or VCEAMLESS_LOG_FORMAT=json, e.g. in containers) emits
+  one JSON object per line with any `extra={...}` fields merged in.
+- A per-call-site rate limit keeps repeated warnings (one per slug) from
+  flooding the output; suppressed counts are reported when the limit resets
+  and at shutdown.
+- `Progress` replaces per-item print lines with an aggregated line
+  (done/total, rate, ETA) at most every few seconds.
+- Per-record lines are logged at DEBUG and only shown with --debug-records;
+  sample record dumps are off unless --show-samples is given.
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+ROOT_LOGGER = "vceamless"
+
+DEFAULT_LEVEL = os.getenv("VCEAMLESS_LOG_LEVEL", "INFO")
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+DEFAULT_FORMAT = os.getenv("VCEAMLESS_LOG_FORMAT", "text")
+
+# At most this many records per (logger, message template) per window
+RATE_LIMIT_PER_WINDOW = 10
+RATE_LIMIT_WINDOW_S = 10.0
+
+PROGRESS_INTERVAL_S = 5.0
+
+# Attributes present on every LogRecord; anything else came from `extra`.
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_rate_filter: Optional["RateLimitFilter"] = None
+
+# Toggled by configure(); read by scripts through show_samples()
+_show_samples = False
+
+
+def _extra_fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _STANDARD_ATTRS and not k.startswith("_")}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        payload.update(_extra_fields(record))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)-5s [%(name)s] %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `limit` records per call site (logger, file, line)
+    every `window_s` seconds, then note how many were dropped. Keyed on the
+    call site rather than the message, since most messages are f-strings that
+    differ per slug.
+    """
+
+    def __init__(self, limit: int = RATE_LIMIT_PER_WINDOW, window_s: float = RATE_LIMIT_WINDOW_S) -> None:
+        super().__init__()
+        self.limit = limit
+        self.window_s = window_s
+        self._state: Dict[Tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or getattr(record, "_no_rate_limit", False):
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # window start, passed, dropped, last dropped message
+            state = self._state.setdefault(key, [now, 0, 0, None])
+            if now - state[0] >= self.window_s:
+                if state[2]:
+                    record.msg = f"{record.msg} (suppressed {state[2]} similar message(s))"
+                state[:] = [now, 0, 0, None]
+            if state[1] < self.limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            state[3] = record.getMessage()
+            return False
+
+    def flush_suppressed(self, handlers: Tuple[logging.Handler, ...]) -> None:
+        """
+        Report outstanding drop counts straight to `handlers` (the queue
+        listener is already stopped at this point).
+        """
+        with self._lock:
+            dropped = [(k, s[2], s[3]) for k, s in self._state.items() if s[2]]
+            self._state.clear()
+        for (name, pathname, lineno), n, msg in dropped:
+            record = logging.getLogger(name).makeRecord(
+                name, logging.INFO, pathname, lineno,
+                "suppressed %d similar message(s), last: %s", (n, msg), None,
+                extra={"_no_rate_limit": True},
+            )
+            for handler in handlers:
+                handler.handle(record)
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group("logging")
+    group.add_argument("--log-level", type=str.upper, choices=LOG_LEVELS, default=DEFAULT_LEVEL)
+    group.add_argument("--log-format", choices=("text", "json"), default=DEFAULT_FORMAT)
+    group.add_argument("--debug-records", action="store_true", help="Log one DEBUG line per record")
+    group.add_argument("--show-samples", action="store_true", help="Log sample output records")
+
+
+def configure(
+    level: str = DEFAULT_LEVEL,
+    fmt: str = DEFAULT_FORMAT,
+    debug_records: bool = False,
+    show_samples: bool = False,
+) -> None:
+    """
+    (Re)configure the vceamless logger tree with a buffered, async handler.
+    """
+    global _listener, _rate_filter, _show_samples
+    shutdown()
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    _rate_filter = RateLimitFilter()
+    stream.addFilter(_rate_filter)
+
+    q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(q, stream, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [logging.handlers.QueueHandler(q)]
+    root.propagate = False
+    root.setLevel(logging.DEBUG if debug_records else level.upper())
+    _show_samples = show_samples
+
+
+def configure_from_args(args: argparse.Namespace) -> None:
+    configure(args.log_level, args.log_format, args.debug_records, args.show_samples)
+
+
+def shutdown() -> None:
+    """
+    Drain the queue and stop the listener (also registered at exit).
+    """
+    global _listener
+    if _listener is None:
+        return
+    # Drain first, so the rate filter has seen every queued record
+    _listener.stop()
+    if _rate_filter is not None:
+        _rate_filter.flush_suppressed(_listener.handlers)
+    _listener = None
+    sys.stdout.flush()
+
+
+atexit.register(shutdown)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Logger under the vceamless tree, e.g. get_logger("extract_company_pages").
+    """
+    if _listener is None:
+        configure()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def show_samples() -> bool:
+    return _show_samples
+
+
+class Progress:
+    """
+    Aggregated progress for a loop: logs "N/total done, rate, ETA" at most
+    every `interval_s` seconds instead of one line per item.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        label: str,
+        total: Optional[int] = None,
+        interval_s: float = PROGRESS_INTERVAL_S,
+    ) -> None:
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.interval_s = interval_s
+        self.done = 0
+        self.counts: Dict[str, int] = {}
+        self._start = time.monotonic()
+        self._last = self._start
+        self._lock = threading.Lock()
+
+    def update(self, n: int = 1, outcome: Optional[str] = None) -> None:
+        with self._lock:
+            self.done += n
+            if outcome:
+                self.counts[outcome] = self.counts.get(outcome, 0) + n
+            now = time.monotonic()
+            if now - self._last < self.interval_s:
+                return
+            self._last = now
+        self._emit(final=False)
+
+    def finish(self) -> None:
+        self._emit(final=True)
+
+    def _emit(self, final: bool) -> None:
+        elapsed = time.monotonic() - self._start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        fields: Dict[str, Any] = {"done": self.done, "rate_per_s": round(rate, 2), "elapsed_s": round(elapsed, 1)}
+        fields.update(self.counts)
+        if self.total:
+            fields["total"] = self.total
+            pct = 100.0 * self.done / self.total
+            eta = (self.total - self.done) / rate if rate > 0 else None
+            fields["eta_s"] = round(eta, 1) if eta is not None else None
+            msg = f"{self.label}: {self.done}/{self.total} ({pct:.1f}%) {rate:.1f}/s"
+            if not final and eta is not None:
+                msg += f" ETA {eta:.0f}s"
+        else:
+            msg = f"{self.label}: {self.done} done {rate:.1f}/s"
+        if final:
+            msg += " [finished]"
+        fields["_no_rate_limit"] = True
+        self.logger.info(msg, extra=fields)
@@ -0,0 +1,278 @@
+"""
+Run metrics shared by the landing, extract and Salesforce ETL scripts.
+
+A script opens a run with `run_report("<script>")` and records into it:
+
+  with run_report("extract_company_pages") as m:
+      with m.stage("parse"):
+          ...
+      m.incr("bytes_written", n)
+
+`stage()` accumulates wall time per stage and also feeds a latency histogram
+with one observation per call, so wrapping a per-item block gives per-item
+latencies for free. Helpers that do not own the run (fetch/upload helpers)
+can record into the active run through `current()`.
+
+On exit the run report is written as JSON to data_staging/_runs/ and mirrored
+to s3://<RAW_BUCKET>/sf_ventures/_runs/.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from vceamless import jsoncodec, logs
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+RUNS_DIR = BASE_DIR / "data_staging" / "_runs"
+
+BUCKET = os.getenv("RAW_BUCKET", "vceamless-raw-web-031561760771")
+RUNS_S3_PREFIX = "sf_ventures/_runs"
+
+log = logs.get_logger("metrics")
+
+# Counters every report carries, even when a script never touches them, so
+# reports are comparable across scripts and over time.
+STANDARD_COUNTERS = (
+    "items",
+    "bytes_fetched",
+    "bytes_read",
+    "bytes_written",
+    "bytes_uploaded",
+    "cache_hits",
+    "retries",
+    "errors",
+)
+
+# Latency histogram bucket upper bounds, in seconds (last bucket is open-ended)
+LATENCY_BUCKETS = (
+    0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+    0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0,
+)
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram; memory does not grow with the item count.
+    """
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate a quantile by linear interpolation inside its bucket.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lo = LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                hi = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else (self.max or lo)
+                est = lo + (hi - lo) * ((rank - seen) / n)
+                return min(max(est, self.min or 0.0), self.max or est)
+            seen += n
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {}
+        for i, n in enumerate(self.counts):
+            if not n:
+                continue
+            label = f"le_{LATENCY_BUCKETS[i]}" if i < len(LATENCY_BUCKETS) else "inf"
+            buckets[label] = n
+        return {
+            "count": self.count,
+            "sum_s": round(self.total, 6),
+            "mean_s": round(self.total / self.count, 6) if self.count else None,
+            "min_s": self.min,
+            "max_s": self.max,
+            "p50_s": self.quantile(0.50),
+            "p95_s": self.quantile(0.95),
+            "p99_s": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class RunMetrics:
+    """
+    Metrics for a single script run. Safe to update from worker threads.
+    """
+
+    def __init__(self, script: str, ts: Optional[int] = None) -> None:
+        self.script = script
+        self.ts = ts if ts is not None else int(time.time())
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.status = "running"
+        self.error: Optional[str] = None
+
+        self.stage_wall: Dict[str, float] = {}
+        self.stage_calls: Dict[str, int] = {}
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {name: 0 for name in STANDARD_COUNTERS}
+        self.gauges: Dict[str, Any] = {}
+        self.extra: Dict[str, Any] = {}
+
+        self._lock = threading.Lock()
+        # Open stages per thread ident; readable from other threads so the
+        # sampling profiler can attribute stacks to the stage they ran in.
+        self._stacks: Dict[int, List[str]] = {}
+
+    # --- recording ---
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time a block as one call of stage `name`.
+        """
+        stack = self._stacks.setdefault(threading.get_ident(), [])
+        stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                self.stage_wall[name] = self.stage_wall.get(name, 0.0) + elapsed
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+                self.latency.setdefault(name, LatencyHistogram()).observe(elapsed)
+
+    def current_stage(self, thread_id: Optional[int] = None) -> Optional[str]:
+        stack = self._stacks.get(thread_id if thread_id is not None else threading.get_ident())
+        return stack[-1] if stack else None
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.latency.setdefault(name, LatencyHistogram()).observe(seconds)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_gauge(self, name: str, value: Any) -> None:
+        with self._lock:
+            self.gauges[name] = value
+
+    # --- reporting ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        finished = self.finished_at or time.time()
+        wall = finished - self.started_at
+        with self._lock:
+            stages = {
+                name: {
+                    "wall_s": round(self.stage_wall[name], 6),
+                    "calls": self.stage_calls[name],
+                    "share": round(self.stage_wall[name] / wall, 4) if wall else None,
+                }
+                for name in self.stage_wall
+            }
+            bottleneck = max(self.stage_wall, key=self.stage_wall.get) if self.stage_wall else None
+            items = self.counters.get("items", 0)
+            return {
+                "script": self.script,
+                "run_ts": self.ts,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "wall_s": round(wall, 6),
+                "status": self.status,
+                "error": self.error,
+                "items_per_s": round(items / wall, 3) if wall and items else None,
+                "bottleneck_stage": bottleneck,
+                "stages": stages,
+                "latency": {name: h.to_dict() for name, h in self.latency.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "extra": dict(self.extra),
+            }
+
+    def report_name(self) -> str:
+        return f"{self.ts}_{self.script}.json"
+
+    def write_report(self, runs_dir: Path = RUNS_DIR, upload: bool = True) -> Path:
+        """
+        Write the JSON run report locally and (best effort) mirror it to S3.
+        """
+        body = jsoncodec.dumps(self.to_dict(), indent=True)
+
+        runs_dir.mkdir(parents=True, exist_ok=True)
+        path = runs_dir / self.report_name()
+        path.write_bytes(body)
+        log.info(f"Wrote run report to {path}")
+
+        if upload:
+            key = f"{RUNS_S3_PREFIX}/{self.report_name()}"
+            try:
+                import boto3
+
+                boto3.client("s3").put_object(
+                    Bucket=BUCKET,
+                    Key=key,
+                    Body=body,
+                    ContentType="application/json",
+                )
+                log.info(f"Uploaded run report to s3://{BUCKET}/{key}")
+            except Exception as e:
+                log.warning(f"Failed to upload run report to S3: {e}")
+        return path
+
+
+_current: Optional[RunMetrics] = None
+
+
+def current() -> RunMetrics:
+    """
+    Return the active run, creating an ad hoc one when called outside a run
+    (e.g. from the benchmarks or an interactive session).
+    """
+    global _current
+    if _current is None:
+        _current = RunMetrics("adhoc")
+    return _current
+
+
+@contextmanager
+def run_report(script: str, ts: Optional[int] = None, upload: bool = True) -> Iterator[RunMetrics]:
+    """
+    Open a run for `script`, make it current, and write its report on exit
+    (including when the script fails, with status="error").
+    """
+    global _current
+    previous = _current
+    m = RunMetrics(script, ts=ts)
+    _current = m
+    try:
+        yield m
+        m.status = "ok"
+    except BaseException as e:
+        m.status = "error"
+        m.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        m.finished_at = time.time()
+        _current = previous
+        try:
+            m.write_report(upload=upload)
+        except Exception as e:
+            log.warning(f"Failed to write run report: {e}")
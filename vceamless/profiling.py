@@ -0,0 +1,294 @@
+"""
+Opt-in profiling for the pipeline entry points.
+
+Every main() in ingestion/ and salesforce/etl/ accepts:
+
+  --profile [MODES]   comma-separated subset of cprofile,tracemalloc,sample
+                      (bare --profile enables all three)
+  --profile-top N     number of entries in the text summaries (default 25)
+  --profile-interval  sampling interval in milliseconds (default 5)
+
+Artifacts are written next to the run report, sharing its <ts>_<script> stem:
+
+  data_staging/_runs/<ts>_<script>.cprofile.prof    pstats dump (snakeviz, pstats)
+  data_staging/_runs/<ts>_<script>.cprofile.txt     top-N by cumulative time
+  data_staging/_runs/<ts>_<script>.tracemalloc.txt  top-N allocation sites
+  data_staging/_runs/<ts>_<script>.folded           collapsed stacks, one root
+                                                    frame per pipeline stage
+                                                    (flamegraph.pl, speedscope)
+
+cprofile installs one profiler per thread (threading.setprofile covers the
+worker threads started inside the run, e.g. the download and parse pools) and
+merges them into a single pstats dump. Threads that were already running
+before the session starts are only seen by sample.
+
+The sampler attributes each stack to the metrics stage its thread was in, so
+one flame graph shows BeautifulSoup parsing, JSON encoding and boto3 calls
+side by side per stage.
+"""
+
+from __future__ import annotations
+
+import argparse
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from vceamless import logs
+from vceamless.metrics import RUNS_DIR, RunMetrics
+
+PROFILE_MODES = ("cprofile", "tracemalloc", "sample")
+
+DEFAULT_TOP_N = 25
+DEFAULT_INTERVAL_MS = 5.0
+
+# Frames kept per tracemalloc traceback
+TRACEMALLOC_FRAMES = 10
+
+log = logs.get_logger("profiling")
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the shared --profile options to an entry point's parser.
+    """
+    group = parser.add_argument_group("profiling")
+    group.add_argument(
+        "--profile",
+        nargs="?",
+        type=_modes_argument,
+        const=",".join(PROFILE_MODES),
+        default=None,
+        metavar="MODES",
+        help=f"Profile this run; comma-separated subset of {','.join(PROFILE_MODES)} (default: all)",
+    )
+    group.add_argument("--profile-top", type=int, default=DEFAULT_TOP_N, metavar="N")
+    group.add_argument("--profile-interval", type=float, default=DEFAULT_INTERVAL_MS, metavar="MS")
+
+
+def parse_modes(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    modes = [v.strip().lower() for v in value.split(",") if v.strip()]
+    for mode in modes:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+    return modes
+
+
+def _modes_argument(value: str) -> str:
+    """
+    argparse type for --profile, so a bad mode fails at parse time.
+    """
+    try:
+        return ",".join(parse_modes(value))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+class ThreadedProfiler:
+    """
+    cProfile for the calling thread plus every thread started while enabled.
+
+    cProfile.Profile.enable() only hooks the thread that calls it, so pool
+    workers would be missing from the dump. threading.setprofile() runs a
+    hook as each new thread starts; the hook gives that thread its own
+    profiler, and stats() merges them all.
+    """
+
+    def __init__(self) -> None:
+        self._main = cProfile.Profile()
+        self._threads: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def _start_thread(self, frame, event, arg) -> None:
+        # Called once, on the new thread's first profile event; enable()
+        # replaces this hook with the thread's own profiler.
+        profiler = cProfile.Profile()
+        with self._lock:
+            self._threads.append(profiler)
+        profiler.enable()
+
+    @property
+    def thread_count(self) -> int:
+        return 1 + len(self._threads)
+
+    def enable(self) -> None:
+        threading.setprofile(self._start_thread)
+        self._main.enable()
+
+    def disable(self) -> None:
+        self._main.disable()
+        threading.setprofile(None)
+
+    def stats(self, stream=None) -> pstats.Stats:
+        stats = pstats.Stats(self._main, stream=stream)
+        with self._lock:
+            for profiler in self._threads:
+                stats.add(profiler)
+        return stats
+
+
+class StackSampler:
+    """
+    Low-overhead wall-clock sampler.
+
+    A daemon thread snapshots every other thread's stack each interval and
+    counts collapsed stacks, rooted at the metrics stage the thread was in.
+    """
+
+    def __init__(self, m: RunMetrics, interval_s: float) -> None:
+        self.m = m
+        self.interval_s = interval_s
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="vceamless-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stage = self.m.current_stage(ident) or "(no stage)"
+                self.counts[";".join([stage] + frames[::-1])] += 1
+            self.samples += 1
+
+    def write_folded(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as f:
+            for stack, n in self.counts.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+def _write_cprofile(profiler: ThreadedProfiler, stem: Path, top_n: int) -> List[Path]:
+    prof_path = stem.with_name(stem.name + ".cprofile.prof")
+    txt_path = stem.with_name(stem.name + ".cprofile.txt")
+
+    buf = io.StringIO()
+    stats = profiler.stats(stream=buf)
+    stats.dump_stats(str(prof_path))
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    buf.write("\n")
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(top_n)
+    txt_path.write_text(buf.getvalue(), encoding="utf-8")
+    return [prof_path, txt_path]
+
+
+def _write_tracemalloc(snapshot: tracemalloc.Snapshot, peak: int, stem: Path, top_n: int) -> Path:
+    path = stem.with_name(stem.name + ".tracemalloc.txt")
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    ))
+    lines = [f"Peak traced memory: {peak / (1024 * 1024):.2f} MiB", "", f"Top {top_n} allocation sites (by size):"]
+    for i, stat in enumerate(snapshot.statistics("lineno")[:top_n], start=1):
+        frame = stat.traceback[0]
+        lines.append(
+            f"#{i:<3} {frame.filename}:{frame.lineno}  "
+            f"{stat.size / 1024:.1f} KiB in {stat.count} blocks"
+        )
+    lines += ["", f"Top {min(top_n, 10)} allocation tracebacks:"]
+    for stat in snapshot.statistics("traceback")[: min(top_n, 10)]:
+        lines.append(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks")
+        lines.extend(f"    {line}" for line in stat.traceback.format())
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return path
+
+
+@contextmanager
+def profile_session(
+    m: RunMetrics,
+    modes: Optional[str],
+    top_n: int = DEFAULT_TOP_N,
+    interval_ms: float = DEFAULT_INTERVAL_MS,
+    runs_dir: Path = RUNS_DIR,
+) -> Iterator[None]:
+    """
+    Profile the enclosed block with the requested modes (no-op when empty).
+
+    Artifact paths are recorded under m.extra["profile"] so the run report
+    points at them.
+    """
+    selected = parse_modes(modes)
+    if not selected:
+        yield
+        return
+
+    runs_dir.mkdir(parents=True, exist_ok=True)
+    stem = runs_dir / f"{m.ts}_{m.script}"
+
+    profiler: Optional[ThreadedProfiler] = None
+    sampler: Optional[StackSampler] = None
+
+    if "tracemalloc" in selected:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    if "sample" in selected:
+        sampler = StackSampler(m, interval_ms / 1000.0)
+        sampler.start()
+    if "cprofile" in selected:
+        profiler = ThreadedProfiler()
+        profiler.enable()
+
+    try:
+        yield
+    finally:
+        # Stop every collector before writing anything, so the artifact
+        # writing itself does not show up in the profiles.
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+        snapshot: Optional[tracemalloc.Snapshot] = None
+        peak = 0
+        if "tracemalloc" in selected:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        artifacts: Dict[str, List[str]] = {}
+        if profiler is not None:
+            artifacts["cprofile"] = [str(p) for p in _write_cprofile(profiler, stem, top_n)]
+            m.extra["profile_threads"] = profiler.thread_count
+        if sampler is not None:
+            folded = stem.with_name(stem.name + ".folded")
+            sampler.write_folded(folded)
+            artifacts["sample"] = [str(folded)]
+            m.extra["profile_samples"] = sampler.samples
+        if snapshot is not None:
+            artifacts["tracemalloc"] = [str(_write_tracemalloc(snapshot, peak, stem, top_n))]
+            m.extra["tracemalloc_peak_bytes"] = peak
+
+        m.extra["profile"] = artifacts
+        for mode, paths in artifacts.items():
+            for p in paths:
+                log.info(f"Wrote {mode} profile to {p}")
+
+
+def profile_from_args(m: RunMetrics, args: argparse.Namespace):
+    """
+    Shorthand for profile_session() driven by add_profile_arguments() options.
+    """
+    return profile_session(m, args.profile, top_n=args.profile_top, interval_ms=args.profile_interval)